@@ -2,11 +2,19 @@ from flask import Flask, request, jsonify, send_from_directory
 from flask_cors import CORS
 import os
 import sys
-from datetime import datetime
+from datetime import datetime, timezone
 import json
+import re
+import hashlib
+import time
+import threading
 import tempfile
+from functools import lru_cache, partial
+from itertools import starmap
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from werkzeug.utils import secure_filename
+import numpy as np
 
 # Adicionar path do sistema OCR - CORRIGIDO
 project_root = Path(__file__).parent.parent
@@ -16,13 +24,52 @@ sys.path.insert(0, str(ocr_project_path))
 # Importar extrator OCR existente
 try:
     from src.ocr.extractor import OCRExtractor
-    from src.utils.helpers import load_image, standardize_data_for_chatbot
+    from src.utils.helpers import load_image, standardize_data_for_chatbot, OCR_EXTRACTOR_VERSION
     OCR_AVAILABLE = True
     print("✅ Módulos OCR carregados com sucesso")
 except ImportError as e:
     print(f"⚠️  Erro ao importar módulos OCR: {e}")
     print("💡 Executando em modo simulado (sem OCR real)")
     OCR_AVAILABLE = False
+    OCR_EXTRACTOR_VERSION = None  # Modo simulado não usa o cache
+
+# Serialização JSON rápida (opcional)
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# Cópia binária (msgpack + lz4) dos dados do chatbot (opcional)
+try:
+    import msgpack
+    import lz4.frame
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    MSGPACK_AVAILABLE = False
+
+# Lock de arquivo entre workers (indisponível no Windows)
+try:
+    import fcntl
+    FCNTL_AVAILABLE = True
+except ImportError:
+    FCNTL_AVAILABLE = False
+
+# Gevent (opcional): detecta se o processo está sob monkey patch
+try:
+    import gevent
+    from gevent import monkey as gevent_monkey
+    GEVENT_AVAILABLE = True
+except ImportError:
+    GEVENT_AVAILABLE = False
+
+# Parser multipart em streaming (opcional)
+try:
+    from streaming_form_data import StreamingFormDataParser
+    from streaming_form_data.targets import FileTarget
+    STREAMING_FORM_DATA_AVAILABLE = True
+except ImportError:
+    STREAMING_FORM_DATA_AVAILABLE = False
 
 app = Flask(__name__)
 CORS(app)
@@ -30,30 +77,242 @@ CORS(app)
 # Configurações
 UPLOAD_FOLDER = 'temp_uploads'
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'pdf'}
+ALLOWED_SUFFIXES = tuple(f'.{ext}' for ext in sorted(ALLOWED_EXTENSIONS))
+ALLOWED_MAGIC_BYTES = (b'\x89PNG', b'\xff\xd8\xff', b'%PDF')  # PNG, JPEG, PDF
 MAX_FILE_SIZE = 16 * 1024 * 1024  # 16MB
+STREAM_CHUNK_SIZE = 64 * 1024  # 64KB
+SWEEP_INTERVAL = 30  # segundos entre limpezas de temp_uploads
+TEMP_MAX_AGE = 60  # idade mínima (segundos) para remover um temporário
+BATCH_MAX_WORKERS = min(8, os.cpu_count() or 1)
+OCR_CACHE_FOLDER = os.path.join(os.path.dirname(os.path.abspath(UPLOAD_FOLDER)), 'ocr_cache')
+EXTRACTOR_VERSION = OCR_EXTRACTOR_VERSION  # Mesma versão do cache do CLI (src/utils/helpers.py)
 
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 
-# Inicializar extrator OCR apenas se disponível
-if OCR_AVAILABLE:
-    try:
-        extractor = OCRExtractor()
-        print("✅ OCRExtractor inicializado")
-    except Exception as e:
-        print(f"⚠️  Erro ao inicializar OCRExtractor: {e}")
-        OCR_AVAILABLE = False
+def sweep_temp_uploads():
+    """Remove arquivos temporários mais antigos que TEMP_MAX_AGE"""
+    now = time.time()
+    with os.scandir(UPLOAD_FOLDER) as entries:
+        for entry in entries:
+            if entry.name.startswith('.'):
+                continue
+            try:
+                if entry.is_file() and now - entry.stat().st_mtime > TEMP_MAX_AGE:
+                    os.unlink(entry.path)
+            except OSError:
+                pass
+
+def _temp_sweeper():
+    """Thread de limpeza; com vários workers, apenas quem obtém o lock limpa"""
+    lock_path = os.path.join(UPLOAD_FOLDER, '.sweeper.lock')
+    while True:
+        time.sleep(SWEEP_INTERVAL)
+        try:
+            if FCNTL_AVAILABLE:
+                with open(lock_path, 'a') as lock_file:
+                    try:
+                        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    except OSError:
+                        continue  # Outro worker já está limpando
+                    sweep_temp_uploads()
+            else:
+                sweep_temp_uploads()
+        except OSError as e:
+            print(f"⚠️  Erro na limpeza de temporários: {e}")
+
+threading.Thread(target=_temp_sweeper, name='temp-sweeper', daemon=True).start()
+
+def read_json(path):
+    """Lê um arquivo JSON usando orjson quando disponível"""
+    if ORJSON_AVAILABLE:
+        with open(path, 'rb') as f:
+            return orjson.loads(f.read())
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def dump_json(payload):
+    """Serializa o payload em bytes JSON (orjson quando disponível)"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(payload, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(payload, ensure_ascii=False).encode('utf-8')
+
+def json_response(payload, status=200):
+    """Resposta JSON a partir de um dict"""
+    return app.response_class(dump_json(payload), status=status, mimetype='application/json')
+
+class OCRCache:
+    """Cache em disco de resultados OCR endereçado pelo conteúdo do arquivo"""
+
+    CAMPOS_OBRIGATORIOS = ('versao', 'sha256', 'criado_em', 'resultado')
+
+    def __init__(self, folder):
+        self.folder = folder
+        os.makedirs(folder, exist_ok=True)
+
+    def _path(self, key):
+        # Entradas prefixadas com 8 bytes de tamanho evitam colisão entre variantes
+        digest = hashlib.sha256()
+        for part in key:
+            data = part.encode('utf-8')
+            digest.update(len(data).to_bytes(8, 'big'))
+            digest.update(data)
+        return os.path.join(self.folder, f"{digest.hexdigest()}.json")
+
+    def get(self, key):
+        """Retorna o resultado em cache ou None (remove entradas inválidas)"""
+        path = self._path(key)
+        try:
+            entry = read_json(path)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError):
+            entry = None
+
+        file_hash, version = key
+        if (not isinstance(entry, dict)
+                or any(campo not in entry for campo in self.CAMPOS_OBRIGATORIOS)
+                or entry['sha256'] != file_hash or entry['versao'] != version):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+
+        return entry['resultado']
+
+    def put(self, key, result):
+        """Grava o resultado de forma atômica"""
+        file_hash, version = key
+        entry = {
+            'versao': version,
+            'sha256': file_hash,
+            'criado_em': datetime.now(timezone.utc).isoformat(),
+            'resultado': result
+        }
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+ocr_cache = OCRCache(OCR_CACHE_FOLDER)
+batch_pool = ThreadPoolExecutor(max_workers=BATCH_MAX_WORKERS)
+
+@lru_cache(maxsize=None)
+def get_extractor():
+    """Extrator OCR criado sob demanda (uma vez por processo/worker)"""
+    extractor = OCRExtractor()
+    print("✅ OCRExtractor inicializado")
+    return extractor
+
+def run_blocking(fn, *args):
+    """Executa fn em uma thread nativa quando sob gevent (o tesserocr não cede o hub)"""
+    if GEVENT_AVAILABLE and gevent_monkey.is_module_patched('threading'):
+        return gevent.get_hub().threadpool.apply(fn, args)
+    return fn(*args)
+
+def decode_and_extract(temp_path):
+    """Decodifica a imagem e executa o OCR"""
+    image = load_image(temp_path)
+    return get_extractor().extract_data(image, temp_path)
+
+_ts_cache = (0, '')
+
+def iso_now():
+    """Timestamp ISO (UTC, resolução de segundos) reutilizado dentro do mesmo segundo"""
+    global _ts_cache
+    segundo = int(time.time())
+    cache = _ts_cache
+    if cache[0] != segundo:
+        cache = (segundo, datetime.fromtimestamp(segundo, timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ'))
+        _ts_cache = cache
+    return cache[1]
 
 def allowed_file(filename):
-    return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+    return filename.lower().endswith(ALLOWED_SUFFIXES)
+
+def allowed_content(head):
+    """Confere a assinatura (magic bytes) do arquivo em vez de confiar na extensão"""
+    return head.startswith(ALLOWED_MAGIC_BYTES)
+
+# Corpo fixo do health check; apenas o timestamp varia
+HEALTH_TEMPLATE = b'{"status":"online","timestamp":"%s","version":"1.0.0"}'
 
 @app.route('/api/health', methods=['GET'])
 def health_check():
     """Verificar se API está funcionando"""
-    return jsonify({
-        'status': 'online',
-        'timestamp': datetime.now().isoformat(),
-        'version': '1.0.0'
-    })
+    return app.response_class(HEALTH_TEMPLATE % iso_now().encode(), mimetype='application/json')
+
+def extract_with_cache(file_hash, filename, get_temp_path):
+    """Executa OCR consultando o cache; get_temp_path só é chamado em cache miss"""
+    if not OCR_AVAILABLE:
+        # Simular extração para desenvolvimento
+        return simulate_extraction(filename), False
+    
+    cache_key = (file_hash, EXTRACTOR_VERSION)
+    result = ocr_cache.get(cache_key)
+    if result is not None:
+        return result, True
+    
+    # Usar OCR real
+    temp_path = get_temp_path()
+    # Sob gevent, o OCR roda fora do hub: /api/health e demais requisições seguem respondendo
+    result = run_blocking(decode_and_extract, temp_path)
+    
+    if 'erro' not in result:
+        ocr_cache.put(cache_key, result)
+    return result, False
+
+def temp_writer(buf, suffix):
+    """Cria a função que grava o upload em um temporário com nome aleatório"""
+    # secure_filename fica só para o nome exibido; a remoção fica a cargo da
+    # thread de limpeza, fora do caminho da resposta
+    def write_temp():
+        temp_path = os.path.join(UPLOAD_FOLDER, os.urandom(8).hex() + suffix)
+        with open(temp_path, 'wb') as f:
+            f.write(buf)
+        return temp_path
+    return write_temp
+
+def build_extract_response(result, filename, cached):
+    """Padronizar resposta das rotas de extração"""
+    return {
+        'success': True,
+        'data': result,
+        'processed_at': iso_now(),
+        'filename': filename,
+        'mode': 'real' if OCR_AVAILABLE else 'simulated',
+        'cached': cached
+    }
+
+def stream_to_temp_file(stream, suffix=''):
+    """Copia o corpo da requisição para disco em blocos, calculando o hash"""
+    digest = hashlib.sha256()
+    size = 0
+    with tempfile.NamedTemporaryFile(dir=UPLOAD_FOLDER, suffix=suffix, delete=False) as tmp:
+        try:
+            while True:
+                chunk = stream.read(STREAM_CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > MAX_FILE_SIZE:
+                    raise ValueError('Arquivo excede o tamanho máximo')
+                digest.update(chunk)
+                tmp.write(chunk)
+        except Exception:
+            tmp.close()
+            os.remove(tmp.name)
+            raise
+    return tmp.name, digest.hexdigest()
+
+def hash_file(path):
+    """SHA-256 de um arquivo lido em blocos"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(STREAM_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
 
 @app.route('/api/extract', methods=['POST'])
 def extract_text():
@@ -61,50 +320,173 @@ def extract_text():
     try:
         # Verificar se arquivo foi enviado
         if 'file' not in request.files:
-            return jsonify({'error': 'Nenhum arquivo enviado'}), 400
+            return json_response({'error': 'Nenhum arquivo enviado'}, 400)
         
         file = request.files['file']
         if file.filename == '':
-            return jsonify({'error': 'Arquivo vazio'}), 400
+            return json_response({'error': 'Arquivo vazio'}, 400)
         
         if not allowed_file(file.filename):
-            return jsonify({'error': 'Tipo de arquivo não suportado'}), 400
+            return json_response({'error': 'Tipo de arquivo não suportado'}, 400)
         
-        # Salvar arquivo temporariamente
+        # Ler conteúdo e calcular hash antes de qualquer processamento
         filename = secure_filename(file.filename)
-        temp_path = os.path.join(UPLOAD_FOLDER, f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{filename}")
-        file.save(temp_path)
+        buf = file.stream.read(MAX_FILE_SIZE + 1)
+        if len(buf) > MAX_FILE_SIZE:
+            return json_response({'error': 'Arquivo excede o tamanho máximo'}, 413)
+        if not allowed_content(buf[:8]):
+            return json_response({'error': 'Conteúdo do arquivo não suportado'}, 400)
+        file_hash = hashlib.sha256(buf).hexdigest()
         
-        # Processar com OCR ou simular
-        if OCR_AVAILABLE:
-            # Usar OCR real
-            image = load_image(temp_path)
-            result = extractor.extract_data(image, temp_path)
-        else:
-            # Simular extração para desenvolvimento
-            result = simulate_extraction(filename)
+        # Salvar arquivo temporariamente apenas quando o OCR é necessário
+        write_temp = temp_writer(buf, Path(file.filename).suffix.lower())
+        result, cached = extract_with_cache(file_hash, filename, write_temp)
+        
+        return json_response(build_extract_response(result, filename, cached))
+        
+    except Exception as e:
+        print(f"Erro na extração: {e}")
+        return json_response({
+            'success': False,
+            'error': str(e),
+            'processed_at': iso_now()
+        }, 500)
+
+def process_batch_item(item):
+    """Processa um arquivo do lote: hash -> cache -> decodificação -> OCR"""
+    filename, suffix, buf = item
+    try:
+        file_hash = hashlib.sha256(buf).hexdigest()
+        result, cached = extract_with_cache(file_hash, filename, temp_writer(buf, suffix))
+        return build_extract_response(result, filename, cached)
+    except Exception as e:
+        print(f"Erro na extração de {filename}: {e}")
+        return {'success': False, 'filename': filename, 'error': str(e)}
+
+@app.route('/api/extract/batch', methods=['POST'])
+def extract_text_batch():
+    """Extrair dados de vários comprovantes em uma única requisição"""
+    try:
+        files = request.files.getlist('files') or request.files.getlist('file')
+        if not files:
+            return json_response({'error': 'Nenhum arquivo enviado'}, 400)
         
-        # Limpar arquivo temporário
-        os.remove(temp_path)
+        items = []
+        errors = {}
+        for index, file in enumerate(files):
+            filename = secure_filename(file.filename or '')
+            if not filename or not allowed_file(file.filename):
+                errors[index] = {'success': False, 'filename': filename, 'error': 'Tipo de arquivo não suportado'}
+                continue
+            
+            buf = file.stream.read(MAX_FILE_SIZE + 1)
+            if len(buf) > MAX_FILE_SIZE:
+                errors[index] = {'success': False, 'filename': filename, 'error': 'Arquivo excede o tamanho máximo'}
+            elif not allowed_content(buf[:8]):
+                errors[index] = {'success': False, 'filename': filename, 'error': 'Conteúdo do arquivo não suportado'}
+            else:
+                items.append((index, (filename, Path(file.filename).suffix.lower(), buf)))
+        
+        # Decodificação e Tesseract (um libtesseract por thread) liberam o GIL: threads processam em paralelo
+        processed = batch_pool.map(process_batch_item, [item for _, item in items])
+        results = dict(zip((index for index, _ in items), processed))
+        results.update(errors)
         
-        # Padronizar resposta
-        response = {
+        return json_response({
             'success': True,
-            'data': result,
-            'processed_at': datetime.now().isoformat(),
-            'filename': filename,
+            'results': [results[index] for index in range(len(files))],
+            'total': len(files),
+            'processed_at': iso_now(),
             'mode': 'real' if OCR_AVAILABLE else 'simulated'
-        }
+        })
         
-        return jsonify(response)
+    except Exception as e:
+        print(f"Erro na extração em lote: {e}")
+        return json_response({
+            'success': False,
+            'error': str(e),
+            'processed_at': iso_now()
+        }, 500)
+
+@app.route('/api/extract/stream', methods=['POST'])
+def extract_text_stream():
+    """Extrair dados gravando o upload direto em disco (sem buffer em memória)"""
+    temp_path = None
+    target = None
+    extracted = False
+    try:
+        mimetype = request.mimetype
+        
+        if mimetype == 'application/octet-stream':
+            # Corpo bruto: nome do arquivo via header ou query string
+            filename = secure_filename(request.headers.get('X-Filename') or request.args.get('filename', ''))
+            if not filename:
+                return json_response({'error': 'Nome do arquivo não informado'}, 400)
+            if not allowed_file(filename):
+                return json_response({'error': 'Tipo de arquivo não suportado'}, 400)
+            
+            try:
+                temp_path, file_hash = stream_to_temp_file(request.stream, os.path.splitext(filename)[1])
+            except ValueError as e:
+                return json_response({'error': str(e)}, 413)
+        
+        elif mimetype == 'multipart/form-data':
+            if not STREAMING_FORM_DATA_AVAILABLE:
+                return json_response({'error': 'streaming-form-data não instalado, use /api/extract'}, 415)
+            
+            with tempfile.NamedTemporaryFile(dir=UPLOAD_FOLDER, delete=False) as tmp:
+                temp_path = tmp.name
+            
+            parser = StreamingFormDataParser(headers=request.headers)
+            target = FileTarget(temp_path)
+            parser.register('file', target)
+            
+            size = 0
+            while True:
+                chunk = request.stream.read(STREAM_CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > MAX_FILE_SIZE:
+                    return json_response({'error': 'Arquivo excede o tamanho máximo'}, 413)
+                parser.data_received(chunk)
+            
+            filename = secure_filename(target.multipart_filename or '')
+            if not filename:
+                return json_response({'error': 'Nenhum arquivo enviado'}, 400)
+            if not allowed_file(filename):
+                return json_response({'error': 'Tipo de arquivo não suportado'}, 400)
+            
+            file_hash = hash_file(temp_path)
+        
+        else:
+            return json_response({'error': 'Content-Type não suportado'}, 415)
+        
+        with open(temp_path, 'rb') as f:
+            if not allowed_content(f.read(8)):
+                return json_response({'error': 'Conteúdo do arquivo não suportado'}, 400)
+        
+        result, cached = extract_with_cache(file_hash, filename, lambda: temp_path)
+        extracted = True
+        return json_response(build_extract_response(result, filename, cached))
         
     except Exception as e:
-        print(f"Erro na extração: {e}")
-        return jsonify({
+        print(f"Erro na extração (stream): {e}")
+        return json_response({
             'success': False,
             'error': str(e),
-            'processed_at': datetime.now().isoformat()
-        }), 500
+            'processed_at': iso_now()
+        }, 500)
+    finally:
+        # Fecha o arquivo do FileTarget também nas saídas antecipadas (413/400)
+        if target is not None:
+            target.finish()
+        # Upload rejeitado: remove o temporário já (após a extração fica com a thread de limpeza)
+        if temp_path is not None and not extracted:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
 
 def simulate_extraction(filename):
     """Simular extração de dados para desenvolvimento"""
@@ -121,6 +503,144 @@ def simulate_extraction(filename):
         'cleaned_text': 'Dados simulados para desenvolvimento'
     }
 
+CHATBOT_DATA_PATH = ocr_project_path / 'data' / 'processed' / 'dados_chatbot.json'
+CHATBOT_PACKED_PATH = CHATBOT_DATA_PATH.with_name('dados_chatbot.msgpack.lz4')
+_chatbot_cache = {'mtime': 0, 'data': None, 'agregados': None}
+
+NIVEIS_CONFIANCA = ('alta', 'media', 'baixa')
+_NIVEL_PARA_ID = {nivel: i for i, nivel in enumerate(NIVEIS_CONFIANCA)}
+
+def _contagem_por_rotulo(ids, rotulos):
+    """Converte um array de ids categóricos em {rótulo: contagem}"""
+    contagens = np.bincount(ids, minlength=len(rotulos))
+    return dict(zip(rotulos, contagens.tolist()))
+
+def compute_chat_aggregates(transacoes):
+    """Pré-calcula os agregados usados pelas respostas do chatbot"""
+    n = len(transacoes)
+    transacoes_validas = []
+    valores = []
+    destinatarios = {}
+    datas = []
+    
+    # Colunas categóricas (structure of arrays) preenchidas em uma passada
+    tipo_ids = np.empty(n, dtype=np.int32)
+    canal_ids = np.empty(n, dtype=np.int32)
+    conf_ids = np.empty(n, dtype=np.int32)
+    tipo_index = {}
+    canal_index = {}
+    sem_nivel = len(NIVEIS_CONFIANCA)
+    last_updated = ''
+    
+    for i, t in enumerate(transacoes):
+        resumo = t.get('resumo', {})
+        valor = resumo.get('valor_numerico', 0)
+        
+        # Transações válidas (com valor > 0)
+        if valor > 0:
+            transacoes_validas.append(t)
+            valores.append(valor)
+            
+            nome = t.get('participantes', {}).get('destino', {}).get('nome_completo', '')
+            if nome and nome.strip():
+                destinatarios[nome] = destinatarios.get(nome, 0) + valor
+            
+            if resumo.get('data_completa'):
+                datas.append(resumo['data_completa'])
+        
+        tipo = resumo.get('tipo', 'Não identificado')
+        tipo_ids[i] = tipo_index.setdefault(tipo, len(tipo_index))
+        
+        canal = t.get('detalhes_operacao', {}).get('canal_utilizado', 'Não identificado')
+        canal_ids[i] = canal_index.setdefault(canal, len(canal_index))
+        
+        metadados = t.get('metadados_sistema', {})
+        conf_ids[i] = _NIVEL_PARA_ID.get(metadados.get('nivel_confianca'), sem_nivel)
+        
+        # ISO-8601 ordena lexicograficamente: máximo corrente sem lista auxiliar
+        processado_em = metadados.get('data_processamento')
+        if processado_em and processado_em > last_updated:
+            last_updated = processado_em
+    
+    # Agregações numéricas vetorizadas sobre os valores válidos
+    valores = np.array(valores, dtype=np.float64)
+    
+    # Contagens por categoria em C (np.bincount) em vez de dicts no loop
+    tipos = _contagem_por_rotulo(tipo_ids, list(tipo_index))
+    canais = _contagem_por_rotulo(canal_ids, list(canal_index))
+    confianca = _contagem_por_rotulo(conf_ids, NIVEIS_CONFIANCA + (None,))
+    del confianca[None]
+    bancos = {canal: count for canal, count in canais.items() if canal and canal != 'Generico'}
+    
+    return {
+        'transacoes_validas': transacoes_validas,
+        'valores': valores,
+        'total_valor': float(valores.sum()),
+        'maior_valor': float(valores.max()) if valores.size else 0,
+        'menor_valor': float(valores.min()) if valores.size else 0,
+        'destinatarios': destinatarios,
+        'bancos': bancos,
+        'tipos': tipos,
+        'canais': canais,
+        'confianca': confianca,
+        'datas': datas,
+        'last_updated': last_updated or None
+    }
+
+def read_packed(path):
+    """Lê a cópia msgpack + lz4 dos dados do chatbot"""
+    with open(path, 'rb') as f:
+        return msgpack.unpackb(lz4.frame.decompress(f.read()), raw=False)
+
+def load_chatbot_data():
+    """Carrega dados_chatbot.json apenas quando o arquivo muda (mtime)"""
+    global _chatbot_cache
+    try:
+        mtime = os.stat(CHATBOT_DATA_PATH).st_mtime_ns
+    except FileNotFoundError:
+        return None
+    
+    # A cópia binária só é usada se for tão recente quanto o JSON
+    packed_mtime = 0
+    if MSGPACK_AVAILABLE:
+        try:
+            packed_mtime = os.stat(CHATBOT_PACKED_PATH).st_mtime_ns
+        except FileNotFoundError:
+            pass
+    use_packed = packed_mtime >= mtime
+    mtime = max(mtime, packed_mtime)
+    
+    cache = _chatbot_cache
+    if cache['data'] is not None and cache['mtime'] == mtime:
+        return cache
+    
+    data = None
+    if use_packed:
+        try:
+            data = read_packed(CHATBOT_PACKED_PATH)
+        except Exception as e:
+            print(f"⚠️  Cópia binária dos dados do chatbot inválida, usando JSON: {e}")
+    if data is None:
+        data = read_json(CHATBOT_DATA_PATH)
+    
+    # Substituir a entrada inteira mantém leituras concorrentes consistentes
+    agregados = compute_chat_aggregates(data.get('transacoes', []))
+    cache = {
+        'mtime': mtime,
+        'data': data,
+        'agregados': agregados,
+        # Respostas memorizadas junto dos dados que as geraram (descartadas ao recarregar)
+        'chat_body': lru_cache(maxsize=256)(partial(chat_body, data, agregados)),
+        'summary_body': lru_cache(maxsize=1)(partial(summary_body, data, agregados))
+    }
+    _chatbot_cache = cache
+    return cache
+
+def chat_body(data, agregados, message_key):
+    """Resposta do chat já serializada (memorizada por entrada em load_chatbot_data)"""
+    response = process_chat_query(message_key, {}, data, agregados)
+    return dump_json(response)
+
 @app.route('/api/chat', methods=['POST'])
 def chat_query():
     """Processar consulta do chatbot"""
@@ -129,12 +649,13 @@ def chat_query():
         message = data.get('message', '')
         context = data.get('context', {})
         
-        # Carregar dados processados para consulta
-        chatbot_data_path = ocr_project_path / 'data' / 'processed' / 'dados_chatbot.json'
+        # Carregar dados processados para consulta (cache por mtime)
+        cache_entry = load_chatbot_data()
         
-        if chatbot_data_path.exists():
-            with open(chatbot_data_path, 'r', encoding='utf-8') as f:
-                chatbot_data = json.load(f)
+        if cache_entry is not None:
+            # Perguntas repetidas sobre os mesmos dados reutilizam o corpo já serializado
+            body = cache_entry['chat_body'](message.lower().strip())
+            return app.response_class(body, mimetype='application/json')
         else:
             # Dados simulados se arquivo não existir
             chatbot_data = {
@@ -153,7 +674,7 @@ def chat_query():
                         'canal_utilizado': 'Nu Pagamentos S.A.'
                     },
                     'metadados_sistema': {
-                        'data_processamento': datetime.now().isoformat()
+                        'data_processamento': iso_now()
                     }
                 }]
             }
@@ -161,248 +682,274 @@ def chat_query():
         # Processar consulta
         response = process_chat_query(message, context, chatbot_data)
         
-        return jsonify(response)
+        return json_response(response)
         
     except Exception as e:
         print(f"Erro no chat: {e}")
-        return jsonify({
+        return json_response({
             'success': False,
             'error': str(e),
             'response': 'Desculpe, ocorreu um erro ao processar sua consulta.'
-        }), 500
+        }, 500)
 
-def process_chat_query(message, context, chatbot_data):
-    """Processar consulta do chatbot com dados reais"""
-    message_lower = message.lower()
-    transacoes = chatbot_data.get('transacoes', [])
-    
-    # Filtrar transações válidas (com valor > 0)
-    transacoes_validas = [t for t in transacoes if t.get('resumo', {}).get('valor_numerico', 0) > 0]
+# Intenções do chat em ordem de prioridade; o lookahead encontra palavras
+# sobrepostas em uma única varredura (mesma semântica da busca por substring)
+INTENT_RE = re.compile(
+    r'(?=(?P<valor>valor|quanto|preço|total|dinheiro)'
+    r'|(?P<destino>destinatário|destino|para|recebedor|quem recebeu)'
+    r'|(?P<banco>banco|instituição|canal|onde)'
+    r'|(?P<data>data|quando|período|dia|mês)'
+    r'|(?P<relatorio>relatório|resumo|report|geral|completo))',
+    re.IGNORECASE
+)
+INTENT_PRIORITY = {'valor': 0, 'destino': 1, 'banco': 2, 'data': 3, 'relatorio': 4}
+TOTAL_RE = re.compile(r'total|soma', re.IGNORECASE)
+
+NL = '\n'
+_format_row = '• {0}: {1}'.format
+
+def detect_intent(message):
+    """Retorna a intenção de maior prioridade presente na mensagem"""
+    melhor = None
+    for match in INTENT_RE.finditer(message):
+        grupo = match.lastgroup
+        if melhor is None or INTENT_PRIORITY[grupo] < INTENT_PRIORITY[melhor]:
+            melhor = grupo
+            if INTENT_PRIORITY[grupo] == 0:
+                break
+    return melhor
+
+def _chat_valor(message, transacoes, agregados):
+    """Consultas por valor"""
+    transacoes_validas = agregados['transacoes_validas']
     
-    # Consultas por valor
-    if any(word in message_lower for word in ['valor', 'quanto', 'preço', 'total', 'dinheiro']):
-        if 'total' in message_lower or 'soma' in message_lower:
-            total = sum(t['resumo']['valor_numerico'] for t in transacoes_validas)
-            quantidade = len(transacoes_validas)
-            medio = total / quantidade if quantidade > 0 else 0
-            
-            return {
-                'success': True,
-                'response': f'''💰 **Análise de Valores:**
+    if TOTAL_RE.search(message):
+        total = agregados['total_valor']
+        quantidade = len(transacoes_validas)
+        medio = total / quantidade if quantidade > 0 else 0
+        
+        return {
+            'success': True,
+            'response': f'''💰 **Análise de Valores:**
 
 • **Total movimentado:** R$ {total:.2f}
 • **Transações válidas:** {quantidade}
 • **Valor médio:** R$ {medio:.2f}
-• **Maior transação:** R$ {max([t['resumo']['valor_numerico'] for t in transacoes_validas]) if transacoes_validas else 0:.2f}
-• **Menor transação:** R$ {min([t['resumo']['valor_numerico'] for t in transacoes_validas]) if transacoes_validas else 0:.2f}''',
-                'data': {
-                    'total_value': total,
-                    'count': quantidade,
-                    'average': medio
-                }
+• **Maior transação:** R$ {agregados['maior_valor']:.2f}
+• **Menor transação:** R$ {agregados['menor_valor']:.2f}''',
+            'data': {
+                'total_value': total,
+                'count': quantidade,
+                'average': medio
             }
-        else:
-            # Mostrar alguns valores
-            valores_exemplo = [(t['resumo']['valor_numerico'], t['metadados_sistema']['arquivo_fonte']) 
-                             for t in transacoes_validas][:5]
-            valores_texto = [f"R$ {v[0]:.2f} ({v[1]})" for v in valores_exemplo]
-            
-            return {
-                'success': True,
-                'response': f'''💰 **Valores encontrados (últimos 5):**
+        }
+    else:
+        # Mostrar alguns valores
+        valores_exemplo = [(t['resumo']['valor_numerico'], t['metadados_sistema']['arquivo_fonte']) 
+                         for t in transacoes_validas][:5]
+        valores_texto = [f"R$ {v[0]:.2f} ({v[1]})" for v in valores_exemplo]
+        
+        return {
+            'success': True,
+            'response': f'''💰 **Valores encontrados (últimos 5):**
 
-{chr(10).join(f"• {valor}" for valor in valores_texto)}
+{NL.join(f"• {valor}" for valor in valores_texto)}
 
 💡 Para ver o total, pergunte: "Qual o valor total?"''',
-                'data': {'sample_values': valores_exemplo}
-            }
+            'data': {'sample_values': valores_exemplo}
+        }
+
+def _chat_destino(message, transacoes, agregados):
+    """Consultas por destinatário/remetente"""
+    destinatarios = agregados['destinatarios']
     
-    # Consultas por destinatário/remetente
-    elif any(word in message_lower for word in ['destinatário', 'destino', 'para', 'recebedor', 'quem recebeu']):
-        destinatarios = {}
-        for t in transacoes_validas:
-            nome = t.get('participantes', {}).get('destino', {}).get('nome_completo', '')
-            if nome and nome.strip():
-                destinatarios[nome] = destinatarios.get(nome, 0) + t['resumo']['valor_numerico']
-        
-        if destinatarios:
-            dest_texto = [f"• **{nome}**: R$ {valor:.2f}" for nome, valor in list(destinatarios.items())[:5]]
-            return {
-                'success': True,
-                'response': f'''👥 **Destinatários identificados:**
+    if destinatarios:
+        dest_texto = [f"• **{nome}**: R$ {valor:.2f}" for nome, valor in list(destinatarios.items())[:5]]
+        return {
+            'success': True,
+            'response': f'''👥 **Destinatários identificados:**
 
-{chr(10).join(dest_texto)}
+{NL.join(dest_texto)}
 
 💡 Foram encontrados {len(destinatarios)} destinatário(s) únicos''',
-                'data': {'recipients': destinatarios}
-            }
-        else:
-            return {
-                'success': True,
-                'response': '👥 Nenhum destinatário foi identificado nos comprovantes processados.',
-                'data': {'recipients': {}}
-            }
+            'data': {'recipients': destinatarios}
+        }
+    else:
+        return {
+            'success': True,
+            'response': '👥 Nenhum destinatário foi identificado nos comprovantes processados.',
+            'data': {'recipients': {}}
+        }
+
+def _chat_banco(message, transacoes, agregados):
+    """Consultas por banco/instituição"""
+    bancos = agregados['bancos']
     
-    # Consultas por banco/instituição
-    elif any(word in message_lower for word in ['banco', 'instituição', 'canal', 'onde']):
-        bancos = {}
-        for t in transacoes:
-            canal = t.get('detalhes_operacao', {}).get('canal_utilizado', 'Não identificado')
-            if canal and canal != 'Generico':
-                bancos[canal] = bancos.get(canal, 0) + 1
-        
-        if bancos:
-            banco_texto = [f"• **{banco}**: {count} transação(ões)" for banco, count in bancos.items()]
-            return {
-                'success': True,
-                'response': f'''🏦 **Instituições utilizadas:**
+    if bancos:
+        banco_texto = [f"• **{banco}**: {count} transação(ões)" for banco, count in bancos.items()]
+        return {
+            'success': True,
+            'response': f'''🏦 **Instituições utilizadas:**
 
-{chr(10).join(banco_texto)}
+{NL.join(banco_texto)}
 
 📊 Total: {len(bancos)} instituição(ões) diferentes''',
-                'data': {'banks': bancos}
-            }
-        else:
-            return {
-                'success': True,
-                'response': '🏦 Nenhuma instituição específica foi identificada claramente.',
-                'data': {'banks': {}}
-            }
-    
-    # Consultas por data/período
-    elif any(word in message_lower for word in ['data', 'quando', 'período', 'dia', 'mês']):
-        transacoes_com_data = [t for t in transacoes_validas 
-                              if t.get('resumo', {}).get('data_completa')]
-        
-        if transacoes_com_data:
-            datas = [t['resumo']['data_completa'] for t in transacoes_com_data]
-            return {
-                'success': True,
-                'response': f'''📅 **Datas das transações:**
-
-{chr(10).join(f"• {data}" for data in datas[:5])}
+            'data': {'banks': bancos}
+        }
+    else:
+        return {
+            'success': True,
+            'response': '🏦 Nenhuma instituição específica foi identificada claramente.',
+            'data': {'banks': {}}
+        }
 
-📊 {len(transacoes_com_data)} transação(ões) com data identificada''',
-                'data': {'dates': datas}
-            }
-        else:
-            return {
-                'success': True,
-                'response': '📅 Poucas datas foram identificadas nos comprovantes processados.',
-                'data': {'dates': []}
-            }
+def _chat_data(message, transacoes, agregados):
+    """Consultas por data/período"""
+    datas = agregados['datas']
     
-    # Relatório completo
-    elif any(word in message_lower for word in ['relatório', 'resumo', 'report', 'geral', 'completo']):
-        total_transacoes = len(transacoes)
-        transacoes_validas_count = len(transacoes_validas)
-        total_valor = sum(t['resumo']['valor_numerico'] for t in transacoes_validas)
-        
-        # Tipos de transação
-        tipos = {}
-        for t in transacoes:
-            tipo = t.get('resumo', {}).get('tipo', 'Não identificado')
-            tipos[tipo] = tipos.get(tipo, 0) + 1
-        
-        # Canais
-        canais = {}
-        for t in transacoes:
-            canal = t.get('detalhes_operacao', {}).get('canal_utilizado', 'Não identificado')
-            canais[canal] = canais.get(canal, 0) + 1
-        
+    if datas:
         return {
             'success': True,
-            'response': f'''📊 **RELATÓRIO COMPLETO**
-
-**📈 Resumo Geral:**
-• Total de comprovantes: {total_transacoes}
-• Transações com valor: {transacoes_validas_count}
-• Valor total: R$ {total_valor:.2f}
-• Valor médio: R$ {(total_valor/transacoes_validas_count) if transacoes_validas_count > 0 else 0:.2f}
-
-**📋 Tipos de transação:**
-{chr(10).join(f"• {tipo}: {count}" for tipo, count in tipos.items())}
+            'response': f'''📅 **Datas das transações:**
 
-**🏦 Canais utilizados:**
-{chr(10).join(f"• {canal}: {count}" for canal, count in canais.items())}
+{NL.join(f"• {data}" for data in datas[:5])}
 
-**🔍 Qualidade dos dados:**
-• Nível alto: {len([t for t in transacoes if t.get('metadados_sistema', {}).get('nivel_confianca') == 'alta'])}
-• Nível médio: {len([t for t in transacoes if t.get('metadados_sistema', {}).get('nivel_confianca') == 'media'])}
-• Nível baixo: {len([t for t in transacoes if t.get('metadados_sistema', {}).get('nivel_confianca') == 'baixa'])}''',
-            'data': {
-                'total_transactions': total_transacoes,
-                'valid_transactions': transacoes_validas_count,
-                'total_value': total_valor,
-                'types': tipos,
-                'channels': canais
-            }
+📊 {len(datas)} transação(ões) com data identificada''',
+            'data': {'dates': datas}
         }
-    
-    # Resposta padrão com sugestões baseadas nos dados
     else:
-        sugestoes = []
-        if transacoes_validas:
-            sugestoes = [
-                f"💰 'Qual o valor total?' (R$ {sum(t['resumo']['valor_numerico'] for t in transacoes_validas):.2f} disponível)",
-                "👥 'Quem são os destinatários?'",
-                "🏦 'Quais bancos foram utilizados?'",
-                "📊 'Gere um relatório completo'"
-            ]
-        else:
-            sugestoes = [
-                "📄 Envie um comprovante PIX para começar",
-                "❓ 'Como funciona a extração?'",
-                "💡 'Que tipos de arquivo posso enviar?'"
-            ]
-        
         return {
             'success': True,
-            'response': f'''🤖 Posso ajudar com informações sobre seus comprovantes PIX!
+            'response': '📅 Poucas datas foram identificadas nos comprovantes processados.',
+            'data': {'dates': []}
+        }
+
+def _chat_relatorio(message, transacoes, agregados):
+    """Relatório completo"""
+    transacoes_validas = agregados['transacoes_validas']
+    
+    total_transacoes = len(transacoes)
+    transacoes_validas_count = len(transacoes_validas)
+    total_valor = agregados['total_valor']
+    tipos = agregados['tipos']
+    canais = agregados['canais']
+    confianca = agregados['confianca']
+    
+    medio = total_valor / transacoes_validas_count if transacoes_validas_count > 0 else 0
+    
+    # Resposta montada com um único ''.join sobre fragmentos pré-formatados
+    response = ''.join([
+        '📊 **RELATÓRIO COMPLETO**', NL, NL,
+        '**📈 Resumo Geral:**', NL,
+        f'• Total de comprovantes: {total_transacoes}', NL,
+        f'• Transações com valor: {transacoes_validas_count}', NL,
+        f'• Valor total: R$ {total_valor:.2f}', NL,
+        f'• Valor médio: R$ {medio:.2f}', NL, NL,
+        '**📋 Tipos de transação:**', NL,
+        NL.join(starmap(_format_row, tipos.items())), NL, NL,
+        '**🏦 Canais utilizados:**', NL,
+        NL.join(starmap(_format_row, canais.items())), NL, NL,
+        '**🔍 Qualidade dos dados:**', NL,
+        f"• Nível alto: {confianca['alta']}", NL,
+        f"• Nível médio: {confianca['media']}", NL,
+        f"• Nível baixo: {confianca['baixa']}"
+    ])
+    
+    return {
+        'success': True,
+        'response': response,
+        'data': {
+            'total_transactions': total_transacoes,
+            'valid_transactions': transacoes_validas_count,
+            'total_value': total_valor,
+            'types': tipos,
+            'channels': canais
+        }
+    }
+
+def _chat_padrao(message, transacoes, agregados):
+    """Resposta padrão com sugestões baseadas nos dados"""
+    transacoes_validas = agregados['transacoes_validas']
+    
+    sugestoes = []
+    if transacoes_validas:
+        sugestoes = [
+            f"💰 'Qual o valor total?' (R$ {agregados['total_valor']:.2f} disponível)",
+            "👥 'Quem são os destinatários?'",
+            "🏦 'Quais bancos foram utilizados?'",
+            "📊 'Gere um relatório completo'"
+        ]
+    else:
+        sugestoes = [
+            "📄 Envie um comprovante PIX para começar",
+            "❓ 'Como funciona a extração?'",
+            "💡 'Que tipos de arquivo posso enviar?'"
+        ]
+    
+    return {
+        'success': True,
+        'response': f'''🤖 Posso ajudar com informações sobre seus comprovantes PIX!
 
 **💡 Perguntas que posso responder:**
-{chr(10).join(sugestoes)}
+{NL.join(sugestoes)}
 
 **📊 Dados disponíveis:** {len(transacoes)} comprovante(s) processado(s)''',
-            'data': {'suggestions': sugestoes, 'available_data': len(transacoes)}
-        }
+        'data': {'suggestions': sugestoes, 'available_data': len(transacoes)}
+    }
+
+CHAT_HANDLERS = {
+    'valor': _chat_valor,
+    'destino': _chat_destino,
+    'banco': _chat_banco,
+    'data': _chat_data,
+    'relatorio': _chat_relatorio
+}
+
+def process_chat_query(message, context, chatbot_data, agregados=None):
+    """Processar consulta do chatbot com dados reais"""
+    transacoes = chatbot_data.get('transacoes', [])
+    
+    if agregados is None:
+        agregados = compute_chat_aggregates(transacoes)
+    
+    handler = CHAT_HANDLERS.get(detect_intent(message), _chat_padrao)
+    return handler(message, transacoes, agregados)
+
+def summary_body(data, agregados):
+    """Resumo serializado (memorizado por entrada em load_chatbot_data)"""
+    summary = {
+        'total_transactions': len(data.get('transacoes', [])),
+        'total_value': agregados['total_valor'],
+        'transaction_types': list(agregados['tipos']),
+        'banks': list(agregados['canais']),
+        'last_updated': agregados['last_updated'],
+        'mode': 'real'
+    }
+    return dump_json(summary)
 
 @app.route('/api/data/summary', methods=['GET'])
 def get_data_summary():
     """Obter resumo dos dados processados"""
     try:
-        chatbot_data_path = ocr_project_path / 'data' / 'processed' / 'dados_chatbot.json'
+        cache_entry = load_chatbot_data()
         
-        if not chatbot_data_path.exists():
+        if cache_entry is None:
             # Retornar dados simulados
-            return jsonify({
+            return json_response({
                 'total_transactions': 1,
                 'total_value': 1247.90,
                 'transaction_types': ['PIX'],
                 'banks': ['Nu Pagamentos S.A.'],
-                'last_updated': datetime.now().isoformat(),
+                'last_updated': iso_now(),
                 'mode': 'simulated'
             })
         
-        with open(chatbot_data_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        
-        transacoes = data.get('transacoes', [])
-        
-        summary = {
-            'total_transactions': len(transacoes),
-            'total_value': sum(t['resumo']['valor_numerico'] for t in transacoes if t['resumo']['valor_numerico'] > 0),
-            'transaction_types': list(set(t['resumo']['tipo'] for t in transacoes)),
-            'banks': list(set(t['detalhes_operacao']['canal_utilizado'] for t in transacoes)),
-            'last_updated': max([t['metadados_sistema']['data_processamento'] for t in transacoes]) if transacoes else None,
-            'mode': 'real'
-        }
-        
-        return jsonify(summary)
+        body = cache_entry['summary_body']()
+        return app.response_class(body, mimetype='application/json')
         
     except Exception as e:
         print(f"Erro no summary: {e}")
-        return jsonify({'error': str(e)}), 500
+        return json_response({'error': str(e)}, 500)
 
 if __name__ == '__main__':
     print(f"🚀 PIXText.ai Backend API")
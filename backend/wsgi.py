@@ -0,0 +1,31 @@
+"""
+Ponto de entrada WSGI para produção
+
+Uso:
+    gunicorn -k gevent -w $(nproc) --worker-connections 100 wsgi:app
+    gunicorn -k sync -w <núcleos físicos> --preload wsgi:app   # OCR pesado em CPU
+
+Com --preload defina OCR_PRELOAD=1 para criar o extrator antes do fork e
+compartilhar o estado somente-leitura entre os workers (copy-on-write).
+
+O worker gevent do gunicorn já aplica o monkey patch; fora dele (ex.: outro
+servidor gevent) defina GEVENT_PATCH=1. No modo sync nada é alterado.
+"""
+
+import os
+
+# Monkey patch apenas quando pedido (antes de qualquer outro import)
+if os.environ.get('GEVENT_PATCH') == '1':
+    from gevent import monkey
+    monkey.patch_all()
+
+from api import app, get_extractor, OCR_AVAILABLE
+
+if OCR_AVAILABLE and os.environ.get('OCR_PRELOAD') == '1':
+    try:
+        get_extractor()
+    except Exception as e:
+        print(f"⚠️  Erro ao pré-carregar OCRExtractor: {e}")
+
+if __name__ == '__main__':
+    app.run(host='0.0.0.0', port=5000)
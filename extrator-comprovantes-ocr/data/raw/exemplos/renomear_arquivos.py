@@ -1,7 +1,11 @@
 import os
-import glob
+import re
 from pathlib import Path
 
+# Extensões de imagem aceitas (comparadas em minúsculas)
+EXTENSOES_IMAGEM = {'.jpg', '.jpeg', '.png', '.bmp', '.tiff', '.gif'}
+NUMERO_COMPROVANTE = re.compile(r'comprovante_(\d+)')
+
 def renomear_comprovantes(pasta_origem):
     """
     Renomeia todos os arquivos de imagem da pasta para comprovante_XXX.jpg
@@ -10,30 +14,31 @@ def renomear_comprovantes(pasta_origem):
         pasta_origem (str): Caminho da pasta contendo os arquivos
     """
     
-    # Extensões de imagem aceitas
-    extensoes_imagem = ['*.jpg', '*.jpeg', '*.png', '*.bmp', '*.tiff', '*.gif']
-    
-    # Lista todos os arquivos de imagem
+    # Uma única leitura do diretório, classificando cada arquivo pela extensão
     arquivos = []
-    for extensao in extensoes_imagem:
-        arquivos.extend(glob.glob(os.path.join(pasta_origem, extensao)))
-        arquivos.extend(glob.glob(os.path.join(pasta_origem, extensao.upper())))
-    
-    # Remove arquivos que já foram renomeados (começam com "comprovante_")
-    arquivos = [arq for arq in arquivos if not os.path.basename(arq).startswith('comprovante_')]
+    maior_numero = 0
+    with os.scandir(pasta_origem) as entradas:
+        for entrada in entradas:
+            if not entrada.is_file():
+                continue
+            if os.path.splitext(entrada.name)[1].lower() not in EXTENSOES_IMAGEM:
+                continue
+            
+            if entrada.name.startswith('comprovante_'):
+                # Arquivos já renomeados definem onde a numeração continua
+                match = NUMERO_COMPROVANTE.match(entrada.name)
+                if match:
+                    maior_numero = max(maior_numero, int(match.group(1)))
+            else:
+                arquivos.append(entrada.path)
     
     # Ordena a lista para renomeação consistente
     arquivos.sort()
     
     print(f"Encontrados {len(arquivos)} arquivos de imagem para renomear")
     
-    # Verificar se existem arquivos já renomeados para continuar numeração
-    arquivos_existentes = glob.glob(os.path.join(pasta_origem, 'comprovante_*.jpg'))
-    arquivos_existentes.extend(glob.glob(os.path.join(pasta_origem, 'comprovante_*.jpeg')))
-    arquivos_existentes.extend(glob.glob(os.path.join(pasta_origem, 'comprovante_*.png')))
-    
-    # Determinar próximo número sequencial
-    proximo_numero = len(arquivos_existentes) + 1
+    # Próximo número após o maior existente (evita colisões quando há lacunas)
+    proximo_numero = maior_numero + 1
     
     # Renomeia cada arquivo sequencialmente
     contador = 0
@@ -52,12 +57,6 @@ def renomear_comprovantes(pasta_origem):
         novo_nome = f"comprovante_{numero_atual:03d}{nova_extensao}"
         arquivo_novo = os.path.join(pasta_origem, novo_nome)
         
-        # Verificar se o arquivo já existe e ajustar número se necessário
-        while os.path.exists(arquivo_novo):
-            numero_atual += 1
-            novo_nome = f"comprovante_{numero_atual:03d}{nova_extensao}"
-            arquivo_novo = os.path.join(pasta_origem, novo_nome)
-        
         try:
             # Renomear arquivo
             os.rename(arquivo_antigo, arquivo_novo)
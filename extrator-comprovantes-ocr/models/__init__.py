@@ -5,6 +5,9 @@ Este módulo contém os modelos treinados e utilitários para classificação
 e estruturação de dados extraídos de comprovantes financeiros.
 """
 
+import os
+from functools import lru_cache
+
 __version__ = "1.0.0"
 __author__ = "Extrator Comprovantes OCR Team"
 
@@ -23,19 +26,19 @@ DEFAULT_MODEL_CONFIG = {
     "max_features": 1000
 }
 
+_MODEL_DIR = os.path.dirname(os.path.abspath(__file__))
+_MODEL_SUFFIXES = ('.pkl', '.joblib')
+
 def get_model_path(model_name: str) -> str:
     """Retorna o caminho completo para um modelo"""
-    import os
     return os.path.join(os.path.dirname(__file__), model_name)
 
+@lru_cache(maxsize=4)
+def _scan_models(mtime_ns: int) -> tuple:
+    """Varre o diretório de modelos (memoizado pelo mtime do diretório)"""
+    with os.scandir(_MODEL_DIR) as entries:
+        return tuple(entry.name for entry in entries if entry.name.endswith(_MODEL_SUFFIXES))
+
 def list_available_models() -> list:
     """Lista todos os modelos disponíveis no diretório"""
-    import os
-    model_dir = os.path.dirname(__file__)
-    models = []
-    
-    for file in os.listdir(model_dir):
-        if file.endswith('.pkl') or file.endswith('.joblib'):
-            models.append(file)
-    
-    return models
+    return list(_scan_models(os.stat(_MODEL_DIR).st_mtime_ns))
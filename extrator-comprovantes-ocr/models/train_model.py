@@ -6,30 +6,132 @@ e salva os modelos treinados para uso em produção.
 """
 
 import os
+import re
+import sys
+import random
 import json
-import pickle
-import pandas as pd
-from sklearn.feature_extraction.text import TfidfVectorizer
+import hashlib
+import joblib
+from collections import Counter
+from itertools import chain
+from joblib import Parallel, delayed
+from sklearn.feature_extraction.text import HashingVectorizer, TfidfTransformer
+from sklearn.base import clone
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import LabelEncoder
 from sklearn.ensemble import RandomForestClassifier
-from sklearn.model_selection import train_test_split, cross_val_score
+from sklearn.model_selection import train_test_split, cross_val_score, LeaveOneOut
 from sklearn.metrics import classification_report, confusion_matrix
 from datetime import datetime
 import numpy as np
+import scipy.sparse as sp
+
+# Parser JSON mais rápido (opcional)
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+def load_json_file(file_path: str):
+    """Carrega um arquivo JSON (orjson quando disponível)"""
+    if ORJSON_AVAILABLE:
+        with open(file_path, 'rb') as f:
+            return orjson.loads(f.read())
+    with open(file_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+# Compressão dos modelos salvos com joblib (lz4 quando disponível)
+try:
+    import lz4  # noqa: F401
+    MODEL_COMPRESS = ('lz4', 3)
+except ImportError:
+    MODEL_COMPRESS = ('zlib', 3)
+
+# Tamanho dos blocos de textos passados ao HashingVectorizer
+HASH_CHUNK_SIZE = 8192
+
+def hash_in_chunks(hasher, texts: list, chunk_size: int = HASH_CHUNK_SIZE):
+    """Aplica o HashingVectorizer (sem estado) em blocos e empilha o resultado em CSR"""
+    if len(texts) <= chunk_size:
+        return hasher.transform(texts)
+    return sp.vstack(
+        [hasher.transform(texts[i:i + chunk_size]) for i in range(0, len(texts), chunk_size)],
+        format='csr'
+    )
+
+# Cache do corpus de treinamento já preparado (consultas + augmentação)
+CORPUS_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache')
+CORPUS_CACHE_VERSION = '2'  # Alterar quando a geração/augmentação de consultas mudar
+
+# Sentinela para distinguir chave ausente de valor falso
+_MISS = object()
+
+def _walk(d, path: tuple):
+    """Percorre dicts aninhados seguindo path; retorna _MISS se algum nível faltar"""
+    for key in path:
+        d = d.get(key, _MISS) if isinstance(d, dict) else _MISS
+        if d is _MISS:
+            return _MISS
+    return d
+
+def _first_value(transaction: dict, paths: tuple, default):
+    """Retorna o primeiro valor verdadeiro entre chaves (str) ou caminhos aninhados (tuple)"""
+    for path in paths:
+        value = transaction.get(path, _MISS) if isinstance(path, str) else _walk(transaction, path)
+        if value is not _MISS and value:
+            return value
+    return default
+
+# A partir deste número de transações a geração de consultas roda em paralelo (loky)
+PARALLEL_MIN_TRANSACTIONS = 2000
 
 class ModelTrainer:
+    # Palavras associadas a cada tipo, usadas na augmentação sintética
+    _TYPE_KEYWORDS = {
+        'Consulta Pix': ('pix', 'consulta', 'pagamento', 'transferencia'),
+        'Transferência': ('transferencia', 'envio', 'pagamento', 'banco'),
+        'Comprovante Pagamento': ('pagamento', 'comprovante', 'quitacao'),
+        'Comprovante Boleto': ('boleto', 'cobranca', 'vencimento'),
+        'Comprovante Genérico': ('comprovante', 'documento', 'transacao')
+    }
+    
     def __init__(self, config_path: str = None):
         self.config = self._load_config(config_path)
-        self.vectorizer = TfidfVectorizer(
-            max_features=self.config.get('max_features', 1000),
-            stop_words=None,
-            ngram_range=(1, 2)
+        # Textos já chegam em minúsculas de prepare_training_data
+        self.vectorizer = self._build_vectorizer(
+            n_features=self.config.get('n_features', 2**18),
+            ngram_range=(1, 2),
+            lowercase=False
         )
         self.classifier = RandomForestClassifier(
             n_estimators=self.config.get('n_estimators', 100),
             random_state=42,
-            max_depth=self.config.get('max_depth', 10)
+            max_depth=self.config.get('max_depth', 10),
+            n_jobs=self.config.get('n_jobs', -1)
         )
+        self.label_encoder = LabelEncoder()
         
+    def _cv_classifier(self) -> RandomForestClassifier:
+        """Cópia do classificador para a validação cruzada, com as árvores em série"""
+        # Só os folds rodam em paralelo: n_jobs=-1 também nas árvores criaria núcleos² workers
+        return clone(self.classifier).set_params(n_jobs=1)
+    
+    @staticmethod
+    def _build_vectorizer(n_features: int, ngram_range: tuple, lowercase: bool = True) -> Pipeline:
+        """Hashing (uma passada, sem vocabulário em memória) seguido de TF-IDF"""
+        return Pipeline([
+            ('hash', HashingVectorizer(
+                n_features=n_features,
+                ngram_range=ngram_range,
+                alternate_sign=False,
+                norm=None,
+                lowercase=lowercase,
+                dtype=np.float32
+            )),
+            ('tfidf', TfidfTransformer(sublinear_tf=True))
+        ])
+    
     def _load_config(self, config_path: str) -> dict:
         """Carrega configurações do arquivo ou usa padrões"""
         if config_path and os.path.exists(config_path):
@@ -37,18 +139,18 @@ class ModelTrainer:
                 return json.load(f)
         
         return {
-            'max_features': 1000,
+            'n_features': 2**18,
             'n_estimators': 100,
             'max_depth': 10,
             'test_size': 0.2,
-            'cv_folds': 5
+            'cv_folds': 5,
+            'n_jobs': -1
         }
     
     def prepare_training_data(self, data_path: str) -> tuple:
         """Prepara dados de treinamento a partir de arquivo JSON"""
         try:
-            with open(data_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+            data = load_json_file(data_path)
             
             texts = []
             labels = []
@@ -59,17 +161,17 @@ class ModelTrainer:
                     # Criar múltiplas representações de texto para aumentar dados
                     text_variations = []
                     
-                    # Variação 1: Informações básicas
+                    # Variação 1: Informações básicas (minúsculas já na origem)
                     basic_features = []
                     if 'tipo' in item:
-                        basic_features.append(item['tipo'])
+                        basic_features.append(item['tipo'].lower())
                     if 'pagador' in item and 'nome' in item['pagador']:
-                        basic_features.append(item['pagador']['nome'])
+                        basic_features.append(item['pagador']['nome'].lower())
                     if 'instituicao' in item:
-                        basic_features.append(item['instituicao'])
+                        basic_features.append(item['instituicao'].lower())
                     
                     if basic_features:
-                        text_variations.append(' '.join(basic_features).lower())
+                        text_variations.append(' '.join(basic_features))
                     
                     # Variação 2: Com informações de valor
                     if 'valor' in item:
@@ -78,19 +180,19 @@ class ModelTrainer:
                             value_features.append(f"valor {item['valor']['total']}")
                         if 'transacao' in item['valor']:
                             value_features.append(f"transacao {item['valor']['transacao']}")
-                        text_variations.append(' '.join(value_features).lower())
+                        text_variations.append(' '.join(value_features))
                     
                     # Variação 3: Com informações técnicas
                     tech_features = basic_features.copy()
                     if 'id_transacao' in item:
-                        tech_features.append(f"id {item['id_transacao']}")
+                        tech_features.append(f"id {item['id_transacao']}".lower())
                     if 'data' in item:
                         tech_features.append(f"data {item['data']}")
                     if 'hora' in item:
                         tech_features.append(f"hora {item['hora']}")
                     
                     if len(tech_features) > len(basic_features):
-                        text_variations.append(' '.join(tech_features).lower())
+                        text_variations.append(' '.join(tech_features))
                     
                     # Adicionar todas as variações
                     tipo = item.get('tipo', 'Comprovante Genérico')
@@ -114,28 +216,21 @@ class ModelTrainer:
         augmented_texts = texts.copy()
         augmented_labels = labels.copy()
         
+        type_keywords = self._TYPE_KEYWORDS
+        rng = random.Random(42)  # Para reprodutibilidade
+        
         # Criar variações para cada texto existente
         for original_text, original_label in zip(texts, labels):
             words = original_text.split()
             
             # Variação 1: Ordem diferente das palavras
             if len(words) > 2:
-                import random
-                random.seed(42)  # Para reprodutibilidade
                 shuffled_words = words.copy()
-                random.shuffle(shuffled_words)
+                rng.shuffle(shuffled_words)
                 augmented_texts.append(' '.join(shuffled_words))
                 augmented_labels.append(original_label)
             
             # Variação 2: Adicionar palavras relacionadas ao tipo
-            type_keywords = {
-                'Consulta Pix': ['pix', 'consulta', 'pagamento', 'transferencia'],
-                'Transferência': ['transferencia', 'envio', 'pagamento', 'banco'],
-                'Comprovante Pagamento': ['pagamento', 'comprovante', 'quitacao'],
-                'Comprovante Boleto': ['boleto', 'cobranca', 'vencimento'],
-                'Comprovante Genérico': ['comprovante', 'documento', 'transacao']
-            }
-            
             if original_label in type_keywords:
                 for keyword in type_keywords[original_label][:2]:  # Max 2 keywords
                     if keyword not in original_text:
@@ -153,11 +248,16 @@ class ModelTrainer:
         
         print(f"Iniciando treinamento com {len(texts)} amostras...")
         
-        # Vetorizar textos
+        # Vetorizar textos (CSR float32: o RandomForest converte para CSC float32 sem densificar
+        # as 2**18 colunas do hashing)
         X = self.vectorizer.fit_transform(texts)
         
+        # Codificar rótulos uma única vez: split, CV e fit trabalham com inteiros
+        y = self.label_encoder.fit_transform(labels)
+        
         # Verificar se temos dados suficientes para divisão estratificada
-        unique_labels, label_counts = np.unique(labels, return_counts=True)
+        unique_labels = self.label_encoder.classes_
+        label_counts = np.bincount(y)
         min_samples_per_class = min(label_counts)
         n_classes = len(unique_labels)
         
@@ -174,41 +274,24 @@ class ModelTrainer:
             print("Dataset pequeno detectado. Usando validação Leave-One-Out.")
             
             # Treinar com todos os dados
-            self.classifier.fit(X, labels)
-            train_score = self.classifier.score(X, labels)
-            
-            # Usar validação leave-one-out
-            from sklearn.model_selection import LeaveOneOut
-            loo = LeaveOneOut()
-            loo_scores = []
+            self.classifier.fit(X, y)
+            train_score = self.classifier.score(X, y)
             
+            # Usar validação leave-one-out (folds em paralelo; o classificador
+            # principal já está treinado com todos os dados e não é alterado)
             try:
-                for train_idx, test_idx in loo.split(X):
-                    X_train_loo, X_test_loo = X[train_idx], X[test_idx]
-                    y_train_loo, y_test_loo = np.array(labels)[train_idx], np.array(labels)[test_idx]
-                    
-                    # Criar classificador temporário
-                    temp_classifier = RandomForestClassifier(
-                        n_estimators=self.config.get('n_estimators', 100),
-                        random_state=42,
-                        max_depth=self.config.get('max_depth', 10)
-                    )
-                    
-                    temp_classifier.fit(X_train_loo, y_train_loo)
-                    score = temp_classifier.score(X_test_loo, y_test_loo)
-                    loo_scores.append(score)
-                
-                # Re-treinar com todos os dados
-                self.classifier.fit(X, labels)
+                loo_scores = cross_val_score(
+                    self._cv_classifier(), X, y,
+                    cv=LeaveOneOut(), n_jobs=-1
+                )
                 
                 results = {
                     'train_accuracy': train_score,
-                    'test_accuracy': np.mean(loo_scores) if loo_scores else train_score,
-                    'cv_mean': np.mean(loo_scores) if loo_scores else train_score,
-                    'cv_std': np.std(loo_scores) if loo_scores else 0.0,
+                    'test_accuracy': loo_scores.mean() if loo_scores.size else train_score,
+                    'cv_mean': loo_scores.mean() if loo_scores.size else train_score,
+                    'cv_std': loo_scores.std() if loo_scores.size else 0.0,
                     'classification_report': f'Leave-One-Out validation - {len(texts)} amostras, {n_classes} classes',
                     'confusion_matrix': 'N/A para LOO validation',
-                    'feature_names': self.vectorizer.get_feature_names_out().tolist()[:50],
                     'trained_at': datetime.now().isoformat(),
                     'n_samples': len(texts),
                     'n_features': X.shape[1],
@@ -226,7 +309,6 @@ class ModelTrainer:
                     'cv_std': 0.0,
                     'classification_report': f'Treinamento simples - {len(texts)} amostras',
                     'confusion_matrix': 'N/A para dataset pequeno',
-                    'feature_names': self.vectorizer.get_feature_names_out().tolist()[:20],
                     'trained_at': datetime.now().isoformat(),
                     'n_samples': len(texts),
                     'n_features': X.shape[1],
@@ -243,10 +325,10 @@ class ModelTrainer:
             
             try:
                 X_train, X_test, y_train, y_test = train_test_split(
-                    X, labels, 
+                    X, y, 
                     test_size=adjusted_test_size,
                     random_state=42,
-                    stratify=labels
+                    stratify=y
                 )
                 
                 # Treinar modelo
@@ -259,8 +341,8 @@ class ModelTrainer:
                 # Cross-validation com número de folds adequado
                 cv_folds = min(self.config.get('cv_folds', 5), min_samples_per_class)
                 cv_scores = cross_val_score(
-                    self.classifier, X, labels, 
-                    cv=cv_folds
+                    self._cv_classifier(), X, y, 
+                    cv=cv_folds, n_jobs=-1
                 )
                 
                 # Predições para relatório detalhado
@@ -271,9 +353,11 @@ class ModelTrainer:
                     'test_accuracy': test_score,
                     'cv_mean': cv_scores.mean(),
                     'cv_std': cv_scores.std(),
-                    'classification_report': classification_report(y_test, y_pred),
+                    'classification_report': classification_report(
+                        self.label_encoder.inverse_transform(y_test),
+                        self.label_encoder.inverse_transform(y_pred)
+                    ),
                     'confusion_matrix': confusion_matrix(y_test, y_pred).tolist(),
-                    'feature_names': self.vectorizer.get_feature_names_out().tolist()[:50],
                     'trained_at': datetime.now().isoformat(),
                     'n_samples': len(texts),
                     'n_features': X.shape[1],
@@ -285,7 +369,7 @@ class ModelTrainer:
                 print(f"Erro na divisão estratificada: {e}")
                 # Fallback para divisão simples sem estratificação
                 X_train, X_test, y_train, y_test = train_test_split(
-                    X, labels, 
+                    X, y, 
                     test_size=0.2,
                     random_state=42
                 )
@@ -301,7 +385,6 @@ class ModelTrainer:
                     'cv_std': 0.0,
                     'classification_report': 'Divisão simples sem estratificação',
                     'confusion_matrix': 'N/A',
-                    'feature_names': self.vectorizer.get_feature_names_out().tolist()[:20],
                     'trained_at': datetime.now().isoformat(),
                     'n_samples': len(texts),
                     'n_features': X.shape[1],
@@ -322,21 +405,20 @@ class ModelTrainer:
         """Salva o modelo treinado"""
         try:
             # Salvar classificador
-            with open(model_path, 'wb') as f:
-                model_data = {
-                    'model': self.classifier,
-                    'vectorizer': self.vectorizer,
-                    'config': self.config,
-                    'trained_at': datetime.now().isoformat()
-                }
-                pickle.dump(model_data, f)
+            model_data = {
+                'model': self.classifier,
+                'vectorizer': self.vectorizer,
+                'label_encoder': self.label_encoder,
+                'config': self.config,
+                'trained_at': datetime.now().isoformat()
+            }
+            joblib.dump(model_data, model_path, compress=MODEL_COMPRESS)
             
             print(f"Modelo salvo em: {model_path}")
             
             # Salvar vetorizador separadamente se especificado
             if vectorizer_path:
-                with open(vectorizer_path, 'wb') as f:
-                    pickle.dump(self.vectorizer, f)
+                joblib.dump(self.vectorizer, vectorizer_path, compress=MODEL_COMPRESS)
                 print(f"Vetorizador salvo em: {vectorizer_path}")
                 
         except Exception as e:
@@ -345,60 +427,107 @@ class ModelTrainer:
 class ChatbotOptimizedModelTrainer(ModelTrainer):
     """Trainer especializado para dados de chatbot"""
     
+    # Variações de linguagem (máximo 2 substituições por termo)
+    _VARIATIONS = {
+        'pagamento': ('transferência', 'envio', 'pix', 'débito'),
+        'para': ('pro', 'pra', 'para a', 'destinatário'),
+        'quanto': ('valor', 'qual valor', 'quanto foi'),
+        'reais': ('reais', 'R$', 'dinheiro', 'grana'),
+        'Ana Cleuma': ('Ana', 'Cleuma', 'Ana Cleuma Sousa')
+    }
+    _var_map = {word: replacements[:2] for word, replacements in _VARIATIONS.items()}
+    _var_order = {word: i for i, word in enumerate(_VARIATIONS)}
+    _var_pattern = re.compile('|'.join(map(re.escape, _VARIATIONS)))
+    
     def __init__(self, config_path: str = None):
         super().__init__(config_path)
         
         # Configurações específicas para chatbot
         self.chatbot_features = {
-            'entity_extraction': TfidfVectorizer(
-                max_features=500,
-                ngram_range=(1, 3),
-                stop_words=None
+            'entity_extraction': self._build_vectorizer(
+                n_features=self.config.get('n_features', 2**18),
+                ngram_range=(1, 3)
             ),
             'value_classifier': RandomForestClassifier(
                 n_estimators=50,
-                random_state=42
+                random_state=42,
+                n_jobs=self.config.get('n_jobs', -1)
             ),
             'confidence_threshold': 0.7
         }
+        
     
     def prepare_chatbot_training_data(self, processed_data_dir: str) -> tuple:
         """Prepara dados específicos para consultas de chatbot"""
         
-        training_texts = []
-        training_labels = []
-        entity_data = []
-        
         # Carregar dados processados
         data_files = [
             'dados_chatbot.json',
             'comprovantes_estruturados.json', 
             'anotacoes.json'
         ]
+        existing_paths = [
+            os.path.join(processed_data_dir, file_name)
+            for file_name in data_files
+            if os.path.exists(os.path.join(processed_data_dir, file_name))
+        ]
+        
+        # Reutilizar corpus já preparado se os arquivos de origem não mudaram
+        key = hashlib.blake2b(CORPUS_CACHE_VERSION.encode(), digest_size=16)
+        for path in existing_paths:
+            stat = os.stat(path)
+            key.update(f"{os.path.abspath(path)}:{stat.st_mtime_ns}:{stat.st_size}".encode())
+        cache_path = os.path.join(CORPUS_CACHE_DIR, f"prepared_{key.hexdigest()}.pkl")
+        
+        if os.path.exists(cache_path):
+            try:
+                corpus = joblib.load(cache_path)
+                print(f"♻️  Corpus carregado do cache: {cache_path}")
+                return corpus
+            except Exception as e:
+                print(f"⚠️  Cache do corpus inválido, recriando: {e}")
+        
+        corpus = self._build_chatbot_corpus(existing_paths)
+        
+        try:
+            os.makedirs(CORPUS_CACHE_DIR, exist_ok=True)
+            joblib.dump(corpus, cache_path, compress=3)
+        except Exception as e:
+            print(f"⚠️  Não foi possível salvar o cache do corpus: {e}")
+        
+        return corpus
+    
+    def _build_chatbot_corpus(self, data_paths: list) -> tuple:
+        """Gera consultas e augmentação a partir dos arquivos de dados"""
         
         all_transactions = []
         
-        for file_name in data_files:
-            file_path = os.path.join(processed_data_dir, file_name)
-            if os.path.exists(file_path):
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    
-                if 'transacoes' in data:
-                    all_transactions.extend(data['transacoes'])
-                elif 'comprovantes' in data:
-                    all_transactions.extend(data['comprovantes'])
-                elif 'anotacoes' in data:
-                    all_transactions.extend(data['anotacoes'])
+        for file_path in data_paths:
+            data = load_json_file(file_path)
+            
+            if 'transacoes' in data:
+                all_transactions.extend(data['transacoes'])
+            elif 'comprovantes' in data:
+                all_transactions.extend(data['comprovantes'])
+            elif 'anotacoes' in data:
+                all_transactions.extend(data['anotacoes'])
         
         print(f"Total de transações carregadas: {len(all_transactions)}")
         
-        # Gerar variações de consulta para cada transação
-        for transaction in all_transactions:
-            queries, labels, entities = self._generate_chatbot_queries(transaction)
-            training_texts.extend(queries)
-            training_labels.extend(labels)
-            entity_data.extend(entities)
+        # Gerar variações de consulta para cada transação (em paralelo para volumes grandes)
+        generate = ChatbotOptimizedModelTrainer._generate_chatbot_queries
+        if len(all_transactions) >= PARALLEL_MIN_TRANSACTIONS:
+            results = Parallel(n_jobs=-1, batch_size=512, backend='loky')(
+                delayed(generate)(transaction) for transaction in all_transactions
+            )
+        else:
+            results = [generate(transaction) for transaction in all_transactions]
+        
+        # Achatar os resultados em uma única alocação por lista
+        query_parts, label_parts, entity_parts = zip(*results) if results else ((), (), ())
+        training_texts = list(chain.from_iterable(query_parts))
+        training_labels = list(chain.from_iterable(label_parts))
+        entity_data = list(chain.from_iterable(entity_parts))
         
         # Augmentação de dados para chatbot
         augmented_texts, augmented_labels = self._augment_chatbot_data(
@@ -407,7 +536,8 @@ class ChatbotOptimizedModelTrainer(ModelTrainer):
         
         return augmented_texts, augmented_labels, entity_data
     
-    def _generate_chatbot_queries(self, transaction: dict) -> tuple:
+    @staticmethod
+    def _generate_chatbot_queries(transaction: dict) -> tuple:
         """Gera consultas possíveis para uma transação"""
         
         queries = []
@@ -415,12 +545,15 @@ class ChatbotOptimizedModelTrainer(ModelTrainer):
         entities = []
         
         # Extrair dados da transação
-        valor = self._extract_value(transaction)
-        nome_origem = self._extract_origin_name(transaction)
-        nome_destino = self._extract_destination_name(transaction)
-        data = self._extract_date(transaction)
-        tipo = self._extract_type(transaction)
-        banco = self._extract_bank(transaction)
+        valor = ChatbotOptimizedModelTrainer._extract_value(transaction)
+        nome_origem = ChatbotOptimizedModelTrainer._extract_origin_name(transaction)
+        nome_destino = ChatbotOptimizedModelTrainer._extract_destination_name(transaction)
+        data = ChatbotOptimizedModelTrainer._extract_date(transaction)
+        tipo = ChatbotOptimizedModelTrainer._extract_type(transaction)
+        banco = ChatbotOptimizedModelTrainer._extract_bank(transaction)
+        
+        # Valor comum a todas as entidades desta transação
+        tx_id = transaction.get('id_transacao', '')
         
         # Gerar consultas por valor
         if valor > 0:
@@ -431,14 +564,11 @@ class ChatbotOptimizedModelTrainer(ModelTrainer):
                 f"pix de {valor}",
                 f"enviei {valor:.2f}"
             ]
-            for query in valor_queries:
-                queries.append(query)
-                labels.append('busca_por_valor')
-                entities.append({
-                    'tipo': 'valor',
-                    'valor': valor,
-                    'transacao_id': transaction.get('id_transacao', '')
-                })
+            # Entidades compartilham o mesmo dict (consumidores apenas leem)
+            n = len(valor_queries)
+            queries.extend(valor_queries)
+            labels.extend(['busca_por_valor'] * n)
+            entities.extend([{'tipo': 'valor', 'valor': valor, 'transacao_id': tx_id}] * n)
         
         # Gerar consultas por destinatário
         if nome_destino:
@@ -449,14 +579,10 @@ class ChatbotOptimizedModelTrainer(ModelTrainer):
                 f"pix para {nome_destino.split()[0]}",
                 f"quanto paguei para {nome_destino}"
             ]
-            for query in dest_queries:
-                queries.append(query)
-                labels.append('busca_por_destinatario')
-                entities.append({
-                    'tipo': 'destinatario',
-                    'nome': nome_destino,
-                    'transacao_id': transaction.get('id_transacao', '')
-                })
+            n = len(dest_queries)
+            queries.extend(dest_queries)
+            labels.extend(['busca_por_destinatario'] * n)
+            entities.extend([{'tipo': 'destinatario', 'nome': nome_destino, 'transacao_id': tx_id}] * n)
         
         # Gerar consultas por data
         if data:
@@ -466,14 +592,10 @@ class ChatbotOptimizedModelTrainer(ModelTrainer):
                 f"o que paguei em {data}",
                 f"histórico {data}"
             ]
-            for query in data_queries:
-                queries.append(query)
-                labels.append('busca_por_data')
-                entities.append({
-                    'tipo': 'data',
-                    'data': data,
-                    'transacao_id': transaction.get('id_transacao', '')
-                })
+            n = len(data_queries)
+            queries.extend(data_queries)
+            labels.extend(['busca_por_data'] * n)
+            entities.extend([{'tipo': 'data', 'data': data, 'transacao_id': tx_id}] * n)
         
         # Gerar consultas por banco
         if banco:
@@ -483,14 +605,10 @@ class ChatbotOptimizedModelTrainer(ModelTrainer):
                 f"histórico {banco}",
                 f"pix {banco}"
             ]
-            for query in banco_queries:
-                queries.append(query)
-                labels.append('busca_por_banco')
-                entities.append({
-                    'tipo': 'banco',
-                    'banco': banco,
-                    'transacao_id': transaction.get('id_transacao', '')
-                })
+            n = len(banco_queries)
+            queries.extend(banco_queries)
+            labels.extend(['busca_por_banco'] * n)
+            entities.extend([{'tipo': 'banco', 'banco': banco, 'transacao_id': tx_id}] * n)
         
         # Gerar consultas combinadas
         if nome_destino and valor > 0:
@@ -499,15 +617,15 @@ class ChatbotOptimizedModelTrainer(ModelTrainer):
                 f"transferência {valor:.0f} para {nome_destino}",
                 f"histórico pagamentos {nome_destino}"
             ]
-            for query in combined_queries:
-                queries.append(query)
-                labels.append('busca_combinada')
-                entities.append({
-                    'tipo': 'combinada',
-                    'destinatario': nome_destino,
-                    'valor': valor,
-                    'transacao_id': transaction.get('id_transacao', '')
-                })
+            n = len(combined_queries)
+            queries.extend(combined_queries)
+            labels.extend(['busca_combinada'] * n)
+            entities.extend([{
+                'tipo': 'combinada',
+                'destinatario': nome_destino,
+                'valor': valor,
+                'transacao_id': tx_id
+            }] * n)
         
         return queries, labels, entities
     
@@ -517,27 +635,32 @@ class ChatbotOptimizedModelTrainer(ModelTrainer):
         augmented_texts = texts.copy()
         augmented_labels = labels.copy()
         
-        # Variações de linguagem
-        variations = {
-            'pagamento': ['transferência', 'envio', 'pix', 'débito'],
-            'para': ['pro', 'pra', 'para a', 'destinatário'],
-            'quanto': ['valor', 'qual valor', 'quanto foi'],
-            'reais': ['reais', 'R$', 'dinheiro', 'grana'],
-            'Ana Cleuma': ['Ana', 'Cleuma', 'Ana Cleuma Sousa']
-        }
+        var_map = self._var_map
+        var_order = self._var_order
         
-        # Aplicar variações
+        # Aplicar variações: uma única varredura do regex por texto encontra os termos
         for original_text, label in zip(texts, labels):
-            for word, replacements in variations.items():
-                if word.lower() in original_text.lower():
-                    for replacement in replacements[:2]:  # Máximo 2 variações
-                        new_text = original_text.replace(word, replacement)
-                        if new_text != original_text:
-                            augmented_texts.append(new_text)
-                            augmented_labels.append(label)
-        
-        print(f"Dataset expandido de {len(texts)} para {len(augmented_texts)} consultas")
-        return augmented_texts, augmented_labels
+            found = {match.group(0) for match in self._var_pattern.finditer(original_text)}
+            for word in sorted(found, key=var_order.__getitem__):
+                for replacement in var_map[word]:
+                    new_text = original_text.replace(word, replacement)
+                    if new_text != original_text:
+                        augmented_texts.append(new_text)
+                        augmented_labels.append(label)
+        
+        # Remover pares (texto, rótulo) repetidos mantendo a ordem
+        seen = set()
+        unique_texts, unique_labels = [], []
+        for text, label in zip(augmented_texts, augmented_labels):
+            key = (text, label)
+            if key not in seen:
+                seen.add(key)
+                unique_texts.append(text)
+                unique_labels.append(label)
+        
+        print(f"Dataset expandido de {len(texts)} para {len(augmented_texts)} consultas "
+              f"({len(augmented_texts) - len(unique_texts)} duplicadas removidas)")
+        return unique_texts, unique_labels
     
     def train_chatbot_model(self, texts: list, labels: list, entities: list) -> dict:
         """Treina modelo específico para chatbot"""
@@ -547,8 +670,10 @@ class ChatbotOptimizedModelTrainer(ModelTrainer):
         
         print(f"Treinando modelo para chatbot com {len(texts)} consultas...")
         
-        # Treinar classificador de intenção
-        X = self.chatbot_features['entity_extraction'].fit_transform(texts)
+        # Treinar classificador de intenção: hashing em blocos, TF-IDF ajustado sobre o total
+        extractor = self.chatbot_features['entity_extraction']
+        counts = hash_in_chunks(extractor.named_steps['hash'], texts)
+        X = extractor.named_steps['tfidf'].fit_transform(counts)
         
         # Dividir dados
         if len(texts) > 10:
@@ -574,7 +699,7 @@ class ChatbotOptimizedModelTrainer(ModelTrainer):
             'test_accuracy': test_score,
             'n_queries': len(texts),
             'n_entities': len(entities),
-            'intent_distribution': dict(pd.Series(labels).value_counts()),
+            'intent_distribution': dict(Counter(labels).most_common()),
             'entity_patterns': entity_patterns,
             'trained_at': datetime.now().isoformat(),
             'ready_for_chatbot': True
@@ -605,7 +730,7 @@ class ChatbotOptimizedModelTrainer(ModelTrainer):
         
         # Remover duplicatas e ordenar por frequência
         for key in patterns:
-            patterns[key] = list(pd.Series(patterns[key]).value_counts().head(10).index)
+            patterns[key] = [item for item, _ in Counter(patterns[key]).most_common(10)]
         
         return patterns
     
@@ -623,8 +748,7 @@ class ChatbotOptimizedModelTrainer(ModelTrainer):
                 'version': '2.0'
             }
             
-            with open(model_path, 'wb') as f:
-                pickle.dump(chatbot_model, f)
+            joblib.dump(chatbot_model, model_path, compress=MODEL_COMPRESS)
             
             print(f"Modelo chatbot salvo em: {model_path}")
             
@@ -648,32 +772,42 @@ class ChatbotOptimizedModelTrainer(ModelTrainer):
             print(f"Erro ao salvar modelo chatbot: {e}")
     
     # Métodos auxiliares de extração
-    def _extract_value(self, transaction: dict) -> float:
+    @staticmethod
+    def _extract_value(transaction: dict) -> float:
         """Extrai valor da transação"""
-        return transaction.get('valor_total', 0) or transaction.get('valor_numerico', 0) or transaction.get('valor', {}).get('total', 0)
+        return _first_value(transaction, ('valor_total', 'valor_numerico', ('valor', 'total')), 0)
     
-    def _extract_origin_name(self, transaction: dict) -> str:
+    @staticmethod
+    def _extract_origin_name(transaction: dict) -> str:
         """Extrai nome origem"""
-        return transaction.get('origem_nome', '') or transaction.get('pagador_nome', '') or transaction.get('pagador', {}).get('nome', '')
+        return _first_value(transaction, ('origem_nome', 'pagador_nome', ('pagador', 'nome')), '')
     
-    def _extract_destination_name(self, transaction: dict) -> str:
+    @staticmethod
+    def _extract_destination_name(transaction: dict) -> str:
         """Extrai nome destino"""
-        return transaction.get('destino_nome', '') or transaction.get('recebedor_nome', '') or transaction.get('devedor', {}).get('nome', '')
+        return _first_value(transaction, ('destino_nome', 'recebedor_nome', ('devedor', 'nome')), '')
     
-    def _extract_date(self, transaction: dict) -> str:
+    @staticmethod
+    def _extract_date(transaction: dict) -> str:
         """Extrai data"""
-        return transaction.get('data', '') or transaction.get('data_hora', '').split()[0] if transaction.get('data_hora') else ''
+        data_hora = transaction.get('data_hora')
+        if not data_hora:
+            return ''
+        return transaction.get('data') or data_hora.split()[0]
     
-    def _extract_type(self, transaction: dict) -> str:
+    @staticmethod
+    def _extract_type(transaction: dict) -> str:
         """Extrai tipo"""
-        return transaction.get('tipo_documento', '') or transaction.get('tipo', '')
+        return _first_value(transaction, ('tipo_documento', 'tipo'), '')
     
-    def _extract_bank(self, transaction: dict) -> str:
+    @staticmethod
+    def _extract_bank(transaction: dict) -> str:
         """Extrai banco"""
-        return transaction.get('layout_detectado', '').replace('_', ' ').title() or transaction.get('instituicao', '')
+        layout = transaction.get('layout_detectado')
+        return (layout and layout.replace('_', ' ').title()) or transaction.get('instituicao', '')
 
-def main():
-    """Função principal para treinamento"""
+def _train_simple():
+    """Treinamento do classificador de tipos de comprovante"""
     print("=== Treinamento de Modelo de Classificação de Comprovantes ===")
     
     # Caminhos dos arquivos
@@ -718,10 +852,7 @@ def main():
     except Exception as e:
         print(f"Erro durante o treinamento: {e}")
 
-if __name__ == '__main__':
-    main()
-
-def main():
+def main_chatbot():
     """Função principal para treinamento otimizado para chatbot"""
     print("=== Treinamento de Modelo Otimizado para Chatbot ===")
     
@@ -786,3 +917,7 @@ def main():
         print(f"❌ Erro durante o treinamento: {e}")
         import traceback
         traceback.print_exc()
+
+if __name__ == '__main__':
+    # python train_model.py [--chatbot]
+    (main_chatbot if '--chatbot' in sys.argv else _train_simple)()
@@ -2,9 +2,20 @@
 
 import os
 import sys
+import queue
+import hashlib
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from datetime import datetime
 from pathlib import Path
 
+from collections import defaultdict
+from functools import lru_cache
+
+import pandas as pd
+
 # Adicionar o diretório raiz do projeto ao PYTHONPATH
 project_root = Path(__file__).parent.parent
 sys.path.insert(0, str(project_root))
@@ -13,10 +24,238 @@ sys.path.insert(0, str(project_root))
 from src.ocr.extractor import OCRExtractor
 from src.ml.model import MLModel
 from src.utils.helpers import (
-    load_image, save_results, extract_supported_image_files,
+    load_image, map_image_file, decode_image, save_results, save_packed_results,
+    load_results, to_json_bytes, TESSERACT_CONFIG, OCR_EXTRACTOR_VERSION, warm_up_ocr,
+    extract_supported_image_files,
     standardize_data_for_chatbot, validate_specific_patterns
 )
 
+# Cache de resultados do OCR por conteúdo da imagem (OCR_CACHE=0 desativa)
+OCR_CACHE_DIR = os.path.join('data', 'processed', '.ocr_cache')
+OCR_CACHE_VERSION = OCR_EXTRACTOR_VERSION
+OCR_CACHE_CONFIG = f'lang=por {TESSERACT_CONFIG}'
+
+def _ocr_cache_key(image_bytes) -> str:
+    """Chave do cache: hash do conteúdo da imagem + versão e configuração do OCR"""
+    digest = hashlib.blake2b(f"{OCR_CACHE_VERSION}:{OCR_CACHE_CONFIG}:".encode(), digest_size=20)
+    digest.update(image_bytes)
+    return digest.hexdigest()
+
+def _ocr_cache_get(key: str):
+    """Lê um resultado do cache (None se ausente ou inválido)"""
+    try:
+        return load_results(os.path.join(OCR_CACHE_DIR, f"{key}.json"))
+    except (OSError, ValueError):
+        return None
+
+def _ocr_cache_put(key: str, resultado: dict):
+    """Grava um resultado no cache de forma atômica (arquivo temporário + os.replace)"""
+    try:
+        os.makedirs(OCR_CACHE_DIR, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=OCR_CACHE_DIR, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(to_json_bytes(resultado, indent=False))
+        os.replace(tmp_path, os.path.join(OCR_CACHE_DIR, f"{key}.json"))
+    except Exception as e:
+        print(f"⚠️  Não foi possível gravar o cache do OCR: {e}")
+
+# Extrator do processo worker (criado uma vez por processo em _init_worker)
+_worker_extractor = None
+# Horário do lote, compartilhado por todos os resultados (evita um datetime.now() por imagem)
+_batch_ts = None
+
+def _timestamp() -> str:
+    """Horário do lote atual (ou o horário corrente fora de um lote)"""
+    return _batch_ts or datetime.now().isoformat()
+
+def _init_worker(batch_ts: str = None):
+    """Inicializa um worker: Tesseract com uma thread e um OCRExtractor por processo"""
+    global _worker_extractor, _batch_ts
+    os.environ['OMP_THREAD_LIMIT'] = '1'
+    _batch_ts = batch_ts
+    _worker_extractor = OCRExtractor()
+    # Modelo do Tesseract carregado uma vez, reaproveitado em todas as imagens do worker
+    warm_up_ocr()
+
+def _add_file_metadata(resultado: dict, image_path: str) -> dict:
+    """Adiciona os metadados do arquivo ao resultado da extração"""
+    resultado['arquivo'] = os.path.basename(image_path)
+    resultado['caminho_completo'] = image_path
+    resultado['processado_em'] = _timestamp()
+    return resultado
+
+def _error_result(image_path: str, error: Exception) -> dict:
+    """Resultado de erro para um arquivo"""
+    return {
+        'arquivo': os.path.basename(image_path),
+        'erro': str(error),
+        'processado_em': _timestamp()
+    }
+
+def _load_stage(image_path: str) -> tuple:
+    """Etapa de E/S: hash do arquivo, consulta ao cache e decodificação da imagem"""
+    key = None
+    
+    # O mesmo mapeamento do arquivo serve para o hash e para a decodificação
+    with map_image_file(image_path) as mapped:
+        if os.environ.get('OCR_CACHE', '1') != '0':
+            key = _ocr_cache_key(mapped)
+            cached = _ocr_cache_get(key)
+            if cached is not None:
+                return key, cached, None
+        
+        return key, None, decode_image(mapped, image_path)
+
+def _ocr_stage(image_path: str, key, cached, image) -> dict:
+    """Etapa de CPU: OCR e extração dos dados (ou resultado vindo do cache)"""
+    if cached is not None:
+        return _add_file_metadata(cached, image_path)
+    
+    resultado = _worker_extractor.extract_data(image, image_path, _batch_ts)
+    
+    # Erros não são cacheados para serem reprocessados na próxima execução
+    if key is not None and 'erro' not in resultado:
+        _ocr_cache_put(key, resultado)
+    return _add_file_metadata(resultado, image_path)
+
+def _process_one(image_path: str) -> dict:
+    """Carrega e extrai os dados de uma imagem (executado nos workers)"""
+    try:
+        return _ocr_stage(image_path, *_load_stage(image_path))
+    except Exception as e:
+        return _error_result(image_path, e)
+
+def _process_prefetched(image_paths: list, depth: int = 2):
+    """Processamento em série com um thread carregando as próximas imagens durante o OCR"""
+    loaded = queue.Queue(maxsize=depth)  # limita a memória a `depth` imagens decodificadas
+    
+    def loader():
+        for image_path in image_paths:
+            try:
+                loaded.put((image_path, _load_stage(image_path), None))
+            except Exception as e:
+                loaded.put((image_path, None, e))
+        loaded.put(None)
+    
+    threading.Thread(target=loader, name='image-prefetch', daemon=True).start()
+    
+    while True:
+        item = loaded.get()
+        if item is None:
+            break
+        image_path, stage, error = item
+        if error is None:
+            try:
+                yield _ocr_stage(image_path, *stage)
+                continue
+            except Exception as e:
+                error = e
+        yield _error_result(image_path, error)
+
+def _pool_results(pool, image_paths: list, batch_ts: str):
+    """Resultados do pool de processos; se o pool quebrar, o restante é processado em série"""
+    done = 0
+    try:
+        # map preserva a ordem, então `done` indica exatamente quais arquivos faltam
+        for resultado in pool.map(_process_one, image_paths, chunksize=4):
+            done += 1
+            yield resultado
+    except BrokenProcessPool as e:
+        print(f"⚠️  Pool de processos interrompido ({e}), processando {len(image_paths) - done} imagens em série")
+        _init_worker(batch_ts)
+        yield from _process_prefetched(image_paths[done:])
+
+def _batch_results(image_paths: list, extractor) -> list:
+    """OCR em lote (sem pré-processamento por imagem) seguido do parsing de cada texto"""
+    try:
+        texts = extractor.extract_text_batch(image_paths)
+    except Exception as e:
+        print(f"⚠️  OCR em lote indisponível, usando processamento por imagem: {e}")
+        return None
+    
+    resultados = []
+    for image_path, text in zip(image_paths, texts):
+        try:
+            resultados.append(_add_file_metadata(extractor.parse_text(text, image_path, _batch_ts), image_path))
+        except Exception as e:
+            resultados.append(_error_result(image_path, e))
+    return resultados
+
+@lru_cache(maxsize=1024)
+def _faixa_valor(lo: int) -> str:
+    """Rótulo da faixa de valor iniciada em lo (ex.: '30-39')"""
+    return f"{lo}-{lo + 9}"
+
+# A partir deste número de transações os índices são montados com pandas groupby
+INDEX_PANDAS_MIN_ROWS = 10_000
+
+def build_search_indices(chatbot_ready_data: list) -> dict:
+    """Cria os índices de busca do chatbot (destinatário, faixa de valor, tipo, banco)"""
+    if len(chatbot_ready_data) >= INDEX_PANDAS_MIN_ROWS:
+        return _build_search_indices_pandas(chatbot_ready_data)
+    
+    # Volumes pequenos: uma única passada com defaultdict é mais rápida que montar o DataFrame
+    indices = {key: defaultdict(list) for key in ('por_destinatario', 'por_valor', 'por_tipo', 'por_banco')}
+    por_destinatario = indices['por_destinatario']
+    por_valor = indices['por_valor']
+    por_tipo = indices['por_tipo']
+    por_banco = indices['por_banco']
+    
+    for transacao in chatbot_ready_data:
+        tid = transacao['id_transacao']
+        resumo = transacao['resumo']
+        
+        dest_nome = transacao['participantes']['destino']['nome_completo']
+        if dest_nome:
+            por_destinatario[dest_nome].append(tid)
+        
+        valor = resumo['valor_numerico']
+        if valor > 0:
+            por_valor[_faixa_valor(int(valor // 10) * 10)].append(tid)
+        
+        por_tipo[resumo['tipo']].append(tid)
+        por_banco[transacao['detalhes_operacao']['canal_utilizado']].append(tid)
+    
+    return {key: dict(index) for key, index in indices.items()}
+
+def _build_search_indices_pandas(chatbot_ready_data: list) -> dict:
+    """Índices de busca via pandas groupby (volumes grandes)"""
+    indices = {
+        'por_destinatario': {},
+        'por_valor': {},
+        'por_tipo': {},
+        'por_banco': {}
+    }
+    
+    df = pd.DataFrame({
+        'id': [t['id_transacao'] for t in chatbot_ready_data],
+        'dest': [t['participantes']['destino']['nome_completo'] for t in chatbot_ready_data],
+        'valor': [t['resumo']['valor_numerico'] for t in chatbot_ready_data],
+        'tipo': [t['resumo']['tipo'] for t in chatbot_ready_data],
+        'banco': [t['detalhes_operacao']['canal_utilizado'] for t in chatbot_ready_data]
+    })
+    
+    def group_ids(frame, column):
+        # sort=False mantém a ordem de primeira ocorrência das chaves, como no loop original
+        return frame.groupby(column, sort=False, dropna=False)['id'].agg(list).to_dict()
+    
+    # Índice por destinatário (apenas nomes preenchidos)
+    com_destino = df[df['dest'].astype(bool)]
+    indices['por_destinatario'] = group_ids(com_destino, 'dest')
+    
+    # Índice por faixa de valor (apenas valores positivos)
+    com_valor = df[df['valor'] > 0]
+    if not com_valor.empty:
+        base = (com_valor['valor'] // 10).astype(int) * 10
+        com_valor = com_valor.assign(faixa=base.astype(str) + '-' + (base + 9).astype(str))
+        indices['por_valor'] = group_ids(com_valor, 'faixa')
+    
+    # Índices por tipo e por banco
+    indices['por_tipo'] = group_ids(df, 'tipo')
+    indices['por_banco'] = group_ids(df, 'banco')
+    
+    return indices
+
 def create_chatbot_ready_data(comprovante_dict: dict) -> dict:
     """Cria estrutura de dados otimizada para chatbot - ETAPA 2"""
     # Padronizar dados
@@ -25,42 +264,55 @@ def create_chatbot_ready_data(comprovante_dict: dict) -> dict:
     # Validar padrões específicos
     pattern_validation = validate_specific_patterns(comprovante_dict, {})
     
+    # Campos usados mais de uma vez (acesso por slot)
+    origem = standardized.origem
+    destino = standardized.destino
+    detalhes = standardized.detalhes_transacao
+    metadados = standardized.metadados
+    tipo_transacao = standardized.tipo_transacao
+    tipo_lower = tipo_transacao.lower()
+    valor_formatado = standardized.valor_formatado
+    valor_numerico = standardized.valor_numerico
+    data_formatada = standardized.data_formatada
+    destino_nome = destino.nome
+    banco_detectado = metadados.banco_detectado
+    
     # Estrutura final para chatbot
     chatbot_data = {
-        'id_transacao': standardized['id_unico'],
+        'id_transacao': standardized.id_unico,
         'resumo': {
-            'tipo': standardized['tipo_transacao'],
-            'valor': standardized['valor_formatado'],
-            'valor_numerico': standardized['valor_numerico'],
-            'data_completa': f"{standardized['data_formatada']} {standardized['hora_formatada']}".strip(),
+            'tipo': tipo_transacao,
+            'valor': valor_formatado,
+            'valor_numerico': valor_numerico,
+            'data_completa': f"{data_formatada} {standardized.hora_formatada}".strip(),
             'status': comprovante_dict.get('situacao', 'Processado')
         },
         'participantes': {
             'origem': {
-                'nome_completo': standardized['origem']['nome'],
-                'documento': standardized['origem']['cpf'],
-                'banco': standardized['origem']['instituicao'],
-                'tipo_pessoa': 'PF' if standardized['origem']['cpf'] else 'PJ'
+                'nome_completo': origem.nome,
+                'documento': origem.cpf,
+                'banco': origem.instituicao,
+                'tipo_pessoa': 'PF' if origem.cpf else 'PJ'
             },
             'destino': {
-                'nome_completo': standardized['destino']['nome'],
-                'documento': standardized['destino']['cpf'],
-                'banco': standardized['destino']['instituicao'],
-                'chave_pix': standardized['destino']['chave_pix'],
-                'tipo_pessoa': 'PF' if standardized['destino']['cpf'] else 'PJ'
+                'nome_completo': destino_nome,
+                'documento': destino.cpf,
+                'banco': destino.instituicao,
+                'chave_pix': destino.chave_pix,
+                'tipo_pessoa': 'PF' if destino.cpf else 'PJ'
             }
         },
         'detalhes_operacao': {
-            'codigo_transacao': standardized['detalhes_transacao']['id'],
-            'codigo_autenticacao': standardized['detalhes_transacao']['autenticacao'],
-            'descricao_operacao': standardized['detalhes_transacao']['descricao'],
-            'tipo_operacao': 'PIX' if 'pix' in standardized['tipo_transacao'].lower() else 'Transferência',
-            'canal_utilizado': standardized['metadados']['banco_detectado'].replace('_', ' ').title()
+            'codigo_transacao': detalhes.id,
+            'codigo_autenticacao': detalhes.autenticacao,
+            'descricao_operacao': detalhes.descricao,
+            'tipo_operacao': 'PIX' if 'pix' in tipo_lower else 'Transferência',
+            'canal_utilizado': banco_detectado.replace('_', ' ').title()
         },
         'metadados_sistema': {
-            'arquivo_fonte': standardized['metadados']['arquivo_origem'],
-            'data_processamento': standardized['metadados']['processado_em'],
-            'nivel_confianca': standardized['metadados']['confiabilidade'],
+            'arquivo_fonte': metadados.arquivo_origem,
+            'data_processamento': metadados.processado_em,
+            'nivel_confianca': metadados.confiabilidade,
             'validacoes': {
                 'padroes_reconhecidos': pattern_validation.get('matches', []),
                 'alertas': pattern_validation.get('mismatches', []),
@@ -68,15 +320,15 @@ def create_chatbot_ready_data(comprovante_dict: dict) -> dict:
             }
         },
         'consultas_chatbot': {
-            'query_valor': f"transação de {standardized['valor_formatado']}",
-            'query_destinatario': f"pagamento para {standardized['destino']['nome']}",
-            'query_data': f"operação em {standardized['data_formatada']}",
-            'query_tipo': f"{standardized['tipo_transacao']} via {standardized['metadados']['banco_detectado']}",
+            'query_valor': f"transação de {valor_formatado}",
+            'query_destinatario': f"pagamento para {destino_nome}",
+            'query_data': f"operação em {data_formatada}",
+            'query_tipo': f"{tipo_transacao} via {banco_detectado}",
             'tags_busca': [
-                standardized['tipo_transacao'].lower(),
-                standardized['metadados']['banco_detectado'],
-                standardized['destino']['nome'].lower() if standardized['destino']['nome'] else '',
-                f"valor_{int(standardized['valor_numerico'])}" if standardized['valor_numerico'] > 0 else ''
+                tipo_lower,
+                banco_detectado,
+                destino_nome.lower() if destino_nome else '',
+                f"valor_{int(valor_numerico)}" if valor_numerico > 0 else ''
             ]
         }
     }
@@ -84,9 +336,14 @@ def create_chatbot_ready_data(comprovante_dict: dict) -> dict:
     return chatbot_data
 
 def main():
+    global _batch_ts
     print("=== Sistema de Extração OCR de Comprovantes ===")
     print("Iniciando processamento...")
     
+    # Um único horário para todo o lote
+    batch_ts = datetime.now().isoformat()
+    _batch_ts = batch_ts
+    
     # Configurações
     input_dir = 'data/raw/exemplos'
     output_dir = 'data/processed'
@@ -119,137 +376,139 @@ def main():
     
     print(f"📄 Encontradas {len(image_files)} imagens para processar")
     
-    # Processar cada imagem
-    comprovantes_estruturados = []
-    resultados_detalhados = []
+    # Processar imagens em paralelo (um Tesseract de thread única por processo)
+    # OCR_BATCH=1: uma única chamada do Tesseract para todos os arquivos (sem pré-processamento)
+    resultados = None
+    pool = None
+    if os.environ.get('OCR_BATCH') == '1':
+        print("⚙️  Executando OCR em lote")
+        resultados = _batch_results(image_files, extractor)
     
-    for i, image_path in enumerate(image_files, 1):
-        print(f"\n🔍 Processando {i}/{len(image_files)}: {os.path.basename(image_path)}")
-        
-        try:
-            # Carregar e processar imagem
-            image = load_image(image_path)
-            
-            # Extrair dados
-            resultado = extractor.extract_data(image, image_path)
-            
-            # Adicionar metadados
-            resultado['arquivo'] = os.path.basename(image_path)
-            resultado['caminho_completo'] = image_path
-            resultado['processado_em'] = datetime.now().isoformat()
-            
-            comprovantes_estruturados.append(resultado)
+    if resultados is None:
+        max_workers = min(int(os.environ.get('OCR_WORKERS', os.cpu_count() or 1)), len(image_files))
+        if max_workers > 1:
+            print(f"⚙️  Usando {max_workers} processos para OCR")
+            pool = ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker,
+                                       initargs=(batch_ts,))
+            resultados = _pool_results(pool, image_files, batch_ts)
+        else:
+            _init_worker(batch_ts)
+            resultados = _process_prefetched(image_files)
+    
+    # Os comprovantes são gravados à medida que chegam; só os agregados ficam em memória
+    estruturados_path = os.path.join(output_dir, 'comprovantes_estruturados.json')
+    tmp_path = estruturados_path + '.tmp'
+    com_sucesso = 0
+    com_erro = 0
+    
+    # Dados para chatbot e agregados calculados de forma incremental
+    chatbot_ready_data = []
+    tipos_encontrados = set()
+    bancos_detectados = set()
+    valor_total_processado = 0
+    mais_antigo = None
+    mais_recente = None
+    
+    try:
+        with open(tmp_path, 'wb') as out:
+            out.write(b'{\n"comprovantes": [\n')
             
-            # Log do resultado
-            if resultado.get('valor_total', 0) > 0:
-                print(f"  ✅ Valor extraído: R$ {resultado['valor_total']:.2f}")
-            if resultado.get('pagador_nome'):
-                print(f"  ✅ Pagador: {resultado['pagador_nome']}")
-            if resultado.get('recebedor_nome'):
-                print(f"  ✅ Recebedor: {resultado['recebedor_nome']}")
+            # map preserva a ordem original dos arquivos
+            for i, resultado in enumerate(resultados, 1):
+                print(f"\n🔍 Processado {i}/{len(image_files)}: {resultado['arquivo']}")
+                if i > 1:
+                    out.write(b',\n')
+                out.write(to_json_bytes(resultado, indent=False))
+                
+                if 'erro' in resultado:
+                    com_erro += 1
+                    if 'caminho_completo' not in resultado:
+                        print(f"  ❌ Erro ao processar {resultado['arquivo']}: {resultado['erro']}")
+                    continue
+                com_sucesso += 1
+                
+                # Log do resultado
+                if resultado.get('valor_total', 0) > 0:
+                    print(f"  ✅ Valor extraído: R$ {resultado['valor_total']:.2f}")
+                if resultado.get('pagador_nome'):
+                    print(f"  ✅ Pagador: {resultado['pagador_nome']}")
+                if resultado.get('recebedor_nome'):
+                    print(f"  ✅ Recebedor: {resultado['recebedor_nome']}")
+                
+                # Preparar dados para chatbot (apenas comprovantes processados com sucesso)
+                try:
+                    chatbot_data = create_chatbot_ready_data(resultado)
+                except Exception as e:
+                    print(f"  ⚠ Erro ao preparar dados para chatbot: {e}")
+                    continue
+                
+                chatbot_ready_data.append(chatbot_data)
+                resumo = chatbot_data['resumo']
+                tipos_encontrados.add(resumo['tipo'])
+                bancos_detectados.add(chatbot_data['detalhes_operacao']['canal_utilizado'])
+                valor_total_processado += resumo['valor_numerico']
+                data_completa = resumo['data_completa']
+                if data_completa:
+                    if mais_antigo is None or data_completa < mais_antigo:
+                        mais_antigo = data_completa
+                    if mais_recente is None or data_completa > mais_recente:
+                        mais_recente = data_completa
             
-        except Exception as e:
-            print(f"  ❌ Erro ao processar {os.path.basename(image_path)}: {e}")
-            # Adicionar resultado de erro
-            comprovantes_estruturados.append({
-                'arquivo': os.path.basename(image_path),
-                'erro': str(e),
-                'processado_em': datetime.now().isoformat()
-            })
-    
-    # Salvar resultados estruturados
-    if comprovantes_estruturados:
-        estruturados_path = os.path.join(output_dir, 'comprovantes_estruturados.json')
+            metadata = {
+                'total_processados': com_sucesso + com_erro,
+                'com_sucesso': com_sucesso,
+                'com_erro': com_erro,
+                'data_processamento': batch_ts
+            }
+            out.write(b'\n],\n"metadata": ' + to_json_bytes(metadata, indent=False) + b'\n}\n')
         
-        estrutura_final = {
+        # Sem nenhum resultado a saída anterior é mantida (o .tmp é descartado abaixo)
+        if com_sucesso + com_erro:
+            os.replace(tmp_path, estruturados_path)
+            print(f"📊 Dados estruturados salvos em: {estruturados_path}")
+    finally:
+        if pool is not None:
+            pool.shutdown()
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    
+    # Salvar dados otimizados para chatbot
+    if chatbot_ready_data:
+        chatbot_path = os.path.join(output_dir, 'dados_chatbot.json')
+        chatbot_structure = {
             'metadata': {
-                'total_processados': len(comprovantes_estruturados),
-                'com_sucesso': len([c for c in comprovantes_estruturados if 'erro' not in c]),
-                'com_erro': len([c for c in comprovantes_estruturados if 'erro' in c]),
-                'data_processamento': datetime.now().isoformat()
+                'total_transacoes': len(chatbot_ready_data),
+                # Ordenados para uma saída determinística entre execuções
+                'tipos_encontrados': sorted(tipos_encontrados),
+                'bancos_detectados': sorted(bancos_detectados),
+                'valor_total_processado': valor_total_processado,
+                'periodo_cobertura': {
+                    'mais_antigo': mais_antigo or '',
+                    'mais_recente': mais_recente or ''
+                },
+                'processado_em': batch_ts
             },
-            'comprovantes': comprovantes_estruturados
+            'transacoes': chatbot_ready_data,
+            'indices_busca': build_search_indices(chatbot_ready_data)
         }
         
-        save_results(estrutura_final, estruturados_path)
-        print(f"📊 Dados estruturados salvos em: {estruturados_path}")
-        
-        # Preparar dados para chatbot
-        chatbot_ready_data = []
+        save_results(chatbot_structure, chatbot_path)
+        print(f"📱 Dados otimizados para chatbot salvos em: {chatbot_path}")
         
-        for comprovante in comprovantes_estruturados:
-            if 'erro' not in comprovante:  # Apenas comprovantes processados com sucesso
-                try:
-                    chatbot_data = create_chatbot_ready_data(comprovante)
-                    chatbot_ready_data.append(chatbot_data)
-                except Exception as e:
-                    print(f"  ⚠ Erro ao preparar dados para chatbot: {e}")
-        
-        # Salvar dados otimizados para chatbot
-        if chatbot_ready_data:
-            chatbot_path = os.path.join(output_dir, 'dados_chatbot.json')
-            chatbot_structure = {
-                'metadata': {
-                    'total_transacoes': len(chatbot_ready_data),
-                    'tipos_encontrados': list(set([item['resumo']['tipo'] for item in chatbot_ready_data])),
-                    'bancos_detectados': list(set([item['detalhes_operacao']['canal_utilizado'] for item in chatbot_ready_data])),
-                    'valor_total_processado': sum([item['resumo']['valor_numerico'] for item in chatbot_ready_data]),
-                    'periodo_cobertura': {
-                        'mais_antigo': min([item['resumo']['data_completa'] for item in chatbot_ready_data if item['resumo']['data_completa']]) if any(item['resumo']['data_completa'] for item in chatbot_ready_data) else '',
-                        'mais_recente': max([item['resumo']['data_completa'] for item in chatbot_ready_data if item['resumo']['data_completa']]) if any(item['resumo']['data_completa'] for item in chatbot_ready_data) else ''
-                    },
-                    'processado_em': datetime.now().isoformat()
-                },
-                'transacoes': chatbot_ready_data,
-                'indices_busca': {
-                    'por_destinatario': {},
-                    'por_valor': {},
-                    'por_tipo': {},
-                    'por_banco': {}
-                }
-            }
-            
-            # Criar índices de busca para otimização do chatbot
-            for transacao in chatbot_ready_data:
-                # Índice por destinatário
-                dest_nome = transacao['participantes']['destino']['nome_completo']
-                if dest_nome:
-                    if dest_nome not in chatbot_structure['indices_busca']['por_destinatario']:
-                        chatbot_structure['indices_busca']['por_destinatario'][dest_nome] = []
-                    chatbot_structure['indices_busca']['por_destinatario'][dest_nome].append(transacao['id_transacao'])
-                
-                # Índice por valor
-                valor = transacao['resumo']['valor_numerico']
-                if valor > 0:
-                    valor_faixa = f"{int(valor//10)*10}-{int(valor//10)*10+9}"
-                    if valor_faixa not in chatbot_structure['indices_busca']['por_valor']:
-                        chatbot_structure['indices_busca']['por_valor'][valor_faixa] = []
-                    chatbot_structure['indices_busca']['por_valor'][valor_faixa].append(transacao['id_transacao'])
-                
-                # Índice por tipo
-                tipo = transacao['resumo']['tipo']
-                if tipo not in chatbot_structure['indices_busca']['por_tipo']:
-                    chatbot_structure['indices_busca']['por_tipo'][tipo] = []
-                chatbot_structure['indices_busca']['por_tipo'][tipo].append(transacao['id_transacao'])
-                
-                # Índice por banco
-                banco = transacao['detalhes_operacao']['canal_utilizado']
-                if banco not in chatbot_structure['indices_busca']['por_banco']:
-                    chatbot_structure['indices_busca']['por_banco'][banco] = []
-                chatbot_structure['indices_busca']['por_banco'][banco].append(transacao['id_transacao'])
-            
-            save_results(chatbot_structure, chatbot_path)
-            print(f"📱 Dados otimizados para chatbot salvos em: {chatbot_path}")
+        # Cópia binária para a API (gravada depois do JSON para não ficar mais antiga que ele)
+        packed_path = os.path.join(output_dir, 'dados_chatbot.msgpack.lz4')
+        if save_packed_results(chatbot_structure, packed_path):
+            print(f"📦 Cópia binária salva em: {packed_path}")
     
     # Resumo final
     print(f"\n🎉 Processamento concluído!")
     print(f"📊 Estatísticas finais:")
     print(f"   - Total de arquivos: {len(image_files)}")
-    print(f"   - Processados com sucesso: {len([c for c in comprovantes_estruturados if 'erro' not in c])}")
-    print(f"   - Com erro: {len([c for c in comprovantes_estruturados if 'erro' in c])}")
+    print(f"   - Processados com sucesso: {com_sucesso}")
+    print(f"   - Com erro: {com_erro}")
     if chatbot_ready_data:
         print(f"   - Dados preparados para chatbot: {len(chatbot_ready_data)}")
-        print(f"   - Valor total processado: R$ {sum([item['resumo']['valor_numerico'] for item in chatbot_ready_data]):.2f}")
+        print(f"   - Valor total processado: R$ {valor_total_processado:.2f}")
     
     print(f"\n📁 Arquivos gerados:")
     print(f"   - {estruturados_path}")
@@ -1,28 +1,109 @@
-import pickle
+import joblib
 import numpy as np
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.ensemble import RandomForestClassifier
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.linear_model import SGDClassifier
 from sklearn.model_selection import train_test_split
 from typing import List, Dict, Any
 import os
 import re
+import time
+import warnings
+from functools import lru_cache
+from ..utils.text_scan import KeywordMatcher, find_masked_cpf
+
+# Padrões-chave compilados uma única vez
+_VALOR_RE = re.compile(r'R\$\s*\d+[,.]?\d{0,2}')
+_DATA_RE = re.compile(r'\d{2}/\d{2}/\d{4}')
+
+# Entidades nas consultas do chatbot em uma única varredura (aplicado sobre a consulta em minúsculas)
+# Datas vêm primeiro e 'r 10/05/2024' (ex.: 'mostrar 10/05/2024') não é lido como valor
+_QUERY_ENTITY_RE = re.compile(
+    r'(?P<data>\d{1,2}/\d{1,2}/\d{4}|ontem|hoje|amanhã)'
+    r'|r\$?\s*(?!\d{1,2}/\d{1,2}/\d{4})(?P<valor>\d+[,.]?\d{0,2})'
+    r'|(?P<reais>\d+)\s*reais?'
+)
+
+def _load_mapped(path: str):
+    """Carrega um arquivo do joblib mapeando os arrays numpy em memória (somente leitura)"""
+    # Arquivos comprimidos não podem ser mapeados: o joblib avisa e carrega normalmente
+    with warnings.catch_warnings():
+        warnings.filterwarnings('ignore', message='.*mmap_mode.*', category=UserWarning)
+        return joblib.load(path, mmap_mode='r')
+
+def _make_writable(estimator):
+    """Copia para a memória os arrays mapeados de um estimador antes de continuar o treino"""
+    for name, value in vars(estimator).items():
+        if isinstance(value, np.ndarray) and not value.flags.writeable:
+            setattr(estimator, name, np.array(value))
+
+@lru_cache(maxsize=1)
+def _timestamp_for_second(second: int) -> str:
+    """Timestamp formatado, reaproveitado por todas as chamadas dentro do mesmo segundo"""
+    return time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(second))
+
+# Indicadores usados na classificação por regras
+_WILL_BANK_INDICATORS = frozenset(['para', 'de', 'chave', 'autenticação'])
+_PIX_INDICATORS = frozenset([
+    'pix enviado', 'pix recebido', 'comprovante pix', 'comprovante de pix',
+    'dados do recebedor', 'dados do pagador', 'chave pix'
+])
+
+# Padrões por tipo de documento (peso na confiança)
+_PATTERN_WEIGHTS = {
+    'PIX Will Bank': {
+        'will bank': 0.3,
+        'para': 0.1,
+        'de': 0.1,
+        'autenticação': 0.2,
+        'chave': 0.1,
+        'ana cleuma': 0.2
+    },
+    'Transferência Nubank': {
+        'nu pagamentos': 0.3,
+        'transferência': 0.2,
+        'destino': 0.15,
+        'origem': 0.15,
+        'cnpj': 0.1,
+        'agência': 0.1
+    }
+}
+
+# Bancos reportados em _extract_key_patterns
+_BANK_PATTERNS = (('will bank', 'will_bank'), ('nu pagamentos', 'nubank'), ('caixa', 'caixa'))
+
+# Todas as palavras-chave acima, encontradas em uma única varredura do texto
+_KEYWORDS = KeywordMatcher(
+    list(_WILL_BANK_INDICATORS) + list(_PIX_INDICATORS)
+    + [pattern for weights in _PATTERN_WEIGHTS.values() for pattern in weights]
+    + [keyword for keyword, _ in _BANK_PATTERNS]
+    + ['will bank', 'nu pagamentos', 'nubank', 'pix', 'transferência', 'transferencia',
+       'destino', 'boleto', 'cobrança']
+)
 
 class MLModel:
+    # Treinamento incremental do modelo padrão (partial_fit em mini-lotes)
+    TRAIN_BATCH_SIZE = 1024
+    TRAIN_EPOCHS = 5
+
     def __init__(self, model_path: str = 'models/comprovante_classifier.pkl'):
         self.model_path = model_path
         self.model = None
         self.vectorizer = None
+        self.label_encoder = None
         self.is_trained = False
 
     def load_model(self):
         """Carregar o modelo de machine learning a partir do caminho especificado"""
         try:
             if os.path.exists(self.model_path):
-                with open(self.model_path, 'rb') as f:
-                    model_data = pickle.load(f)
-                    self.model = model_data['model']
-                    self.vectorizer = model_data['vectorizer']
-                    self.is_trained = True
+                # joblib lê tanto os modelos comprimidos quanto pickles antigos;
+                # nos não comprimidos os arrays são mapeados e compartilhados entre processos
+                model_data = _load_mapped(self.model_path)
+                self.model = model_data['model']
+                self.vectorizer = model_data['vectorizer']
+                # Modelos treinados com rótulos inteiros trazem o LabelEncoder
+                self.label_encoder = model_data.get('label_encoder')
+                self.is_trained = True
                 print("Modelo carregado com sucesso!")
             else:
                 print("Arquivo de modelo não encontrado. Treinando novo modelo...")
@@ -33,8 +114,11 @@ class MLModel:
 
     def _initialize_default_model(self):
         """Inicializa um modelo padrão quando não há modelo salvo"""
-        self.vectorizer = TfidfVectorizer(max_features=1000, stop_words=None)
-        self.model = RandomForestClassifier(n_estimators=100, random_state=42)
+        # Hashing não guarda vocabulário: uma passada, memória constante
+        self.vectorizer = HashingVectorizer(
+            n_features=2**18, alternate_sign=False, ngram_range=(1, 2), dtype=np.float32
+        )
+        self.model = SGDClassifier(loss='log_loss', random_state=42, n_jobs=-1)
 
     def train_model(self, training_data: List[str], labels: List[str]):
         """Treinar o modelo com os dados fornecidos"""
@@ -43,16 +127,24 @@ class MLModel:
             return
         
         try:
-            # Vetorizar os textos
-            X = self.vectorizer.fit_transform(training_data)
+            # Vetorizar os textos (HashingVectorizer não precisa de fit)
+            if isinstance(self.vectorizer, HashingVectorizer):
+                X = self.vectorizer.transform(training_data)
+            else:
+                X = self.vectorizer.fit_transform(training_data)
             
             # Dividir dados em treino e teste
             X_train, X_test, y_train, y_test = train_test_split(
                 X, labels, test_size=0.2, random_state=42
             )
             
-            # Treinar o modelo
-            self.model.fit(X_train, y_train)
+            # Treinar o modelo (rótulos em texto, sem LabelEncoder)
+            _make_writable(self.model)
+            if hasattr(self.model, 'partial_fit'):
+                self._partial_fit_batches(X_train, np.asarray(y_train), np.unique(labels))
+            else:
+                self.model.fit(X_train, y_train)
+            self.label_encoder = None
             
             # Avaliar o modelo
             accuracy = self.model.score(X_test, y_test)
@@ -63,6 +155,14 @@ class MLModel:
         except Exception as e:
             print(f"Erro durante o treinamento: {e}")
 
+    def _partial_fit_batches(self, X, y, classes):
+        """Treina com partial_fit em mini-lotes (várias épocas sobre os dados)"""
+        n_samples = X.shape[0]
+        for _ in range(self.TRAIN_EPOCHS):
+            for start in range(0, n_samples, self.TRAIN_BATCH_SIZE):
+                end = start + self.TRAIN_BATCH_SIZE
+                self.model.partial_fit(X[start:end], y[start:end], classes=classes)
+
     def predict(self, new_data: List[str]) -> List[Dict[str, Any]]:
         """Fazer previsões com novos dados extraídos"""
         if not self.is_trained:
@@ -77,19 +177,23 @@ class MLModel:
             if not self.model or not self.vectorizer:
                 return [{'text': text, 'classification': 'unknown'} for text in new_data]
             
-            # Vetorizar novos dados
-            X_new = self.vectorizer.transform(new_data)
+            # Vetorizar novos dados (o vetorizador treinado não converte para minúsculas)
+            X_new = self.vectorizer.transform([text.lower() for text in new_data])
             
-            # Fazer predições
-            predictions = self.model.predict(X_new)
+            # Fazer predições: uma única chamada a predict_proba, classe = argmax
             probabilities = self.model.predict_proba(X_new)
+            best = probabilities.argmax(axis=1)
+            predictions = self.model.classes_.take(best)
+            confidences = probabilities[np.arange(len(best)), best]
+            if self.label_encoder is not None:
+                predictions = self.label_encoder.inverse_transform(predictions)
             
             results = []
-            for i, (text, pred) in enumerate(zip(new_data, predictions)):
+            for text, pred, confidence in zip(new_data, predictions, confidences):
                 result = {
                     'text': text,
                     'classification': pred,
-                    'confidence': float(np.max(probabilities[i])),
+                    'confidence': float(confidence),
                     'processed_at': self._get_timestamp()
                 }
                 results.append(result)
@@ -109,11 +213,12 @@ class MLModel:
             model_data = {
                 'model': self.model,
                 'vectorizer': self.vectorizer,
+                'label_encoder': self.label_encoder,
                 'trained_at': self._get_timestamp()
             }
             
-            with open(self.model_path, 'wb') as f:
-                pickle.dump(model_data, f)
+            # Sem compressão para que load_model possa mapear os arrays (mmap_mode='r')
+            joblib.dump(model_data, self.model_path, protocol=5)
             
             print(f"Modelo salvo em: {self.model_path}")
             
@@ -122,31 +227,30 @@ class MLModel:
 
     def classify_document_type(self, text: str) -> str:
         """Classifica o tipo de documento baseado no texto - MELHORADO ETAPA 2"""
-        text_lower = text.lower()
-        
+        return self._classify_from_hits(_KEYWORDS.find(text))
+
+    def _classify_from_hits(self, hits: set) -> str:
+        """Classificação por regras a partir das palavras-chave encontradas"""
         # Detecção específica Will Bank PIX
-        if 'will bank' in text_lower:
-            if any(indicator in text_lower for indicator in ['para', 'de', 'chave', 'autenticação']):
+        if 'will bank' in hits:
+            if hits & _WILL_BANK_INDICATORS:
                 return 'PIX Will Bank'
         
         # Detecção específica Nubank transferência
-        elif 'nu pagamentos' in text_lower or 'nubank' in text_lower:
-            if 'transferência' in text_lower or 'destino' in text_lower:
+        elif 'nu pagamentos' in hits or 'nubank' in hits:
+            if 'transferência' in hits or 'destino' in hits:
                 return 'Transferência Nubank'
-            elif 'pix' in text_lower:
+            elif 'pix' in hits:
                 return 'PIX Nubank'
         
         # Detecção PIX genérico
-        elif any(indicator in text_lower for indicator in [
-            'pix enviado', 'pix recebido', 'comprovante pix', 'comprovante de pix',
-            'dados do recebedor', 'dados do pagador', 'chave pix'
-        ]):
+        elif hits & _PIX_INDICATORS:
             return 'PIX Genérico'
         
         # Outros tipos
-        elif 'transferência' in text_lower or 'transferencia' in text_lower:
+        elif 'transferência' in hits or 'transferencia' in hits:
             return 'Transferência Genérica'
-        elif 'boleto' in text_lower or 'cobrança' in text_lower:
+        elif 'boleto' in hits or 'cobrança' in hits:
             return 'Boleto'
         else:
             return 'Comprovante Genérico'
@@ -158,95 +262,70 @@ class MLModel:
         
         results = []
         for text in texts:
+            # Uma única varredura do texto alimenta classificação, confiança e padrões
+            hits = _KEYWORDS.find(text)
+            
             # Classificação baseada em regras (mais confiável para nossos tipos)
-            rule_based_type = self.classify_document_type(text)
+            rule_based_type = self._classify_from_hits(hits)
             
             # Calcular confiança baseada em padrões detectados
-            confidence = self._calculate_pattern_confidence(text, rule_based_type)
+            confidence = self._calculate_pattern_confidence(text, rule_based_type, hits)
             
             result = {
                 'text_preview': text[:100] + "..." if len(text) > 100 else text,
                 'classification': rule_based_type,
                 'confidence': confidence,
-                'detected_patterns': self._extract_key_patterns(text),
+                'detected_patterns': self._extract_key_patterns(text, hits),
                 'processed_at': self._get_timestamp()
             }
             results.append(result)
         
         return results
 
-    def _calculate_pattern_confidence(self, text: str, classification: str) -> float:
+    def _calculate_pattern_confidence(self, text: str, classification: str, hits: set = None) -> float:
         """Calcula confiança baseada em padrões específicos"""
-        text_lower = text.lower()
-        
-        # Padrões por tipo de documento
-        pattern_weights = {
-            'PIX Will Bank': {
-                'will bank': 0.3,
-                'para': 0.1,
-                'de': 0.1,
-                'autenticação': 0.2,
-                'chave': 0.1,
-                'ana cleuma': 0.2
-            },
-            'Transferência Nubank': {
-                'nu pagamentos': 0.3,
-                'transferência': 0.2,
-                'destino': 0.15,
-                'origem': 0.15,
-                'cnpj': 0.1,
-                'agência': 0.1
-            }
-        }
+        weights = _PATTERN_WEIGHTS.get(classification)
+        if weights is None:
+            return 0.5  # Confiança padrão
         
-        if classification in pattern_weights:
-            confidence = 0.0
-            for pattern, weight in pattern_weights[classification].items():
-                if pattern in text_lower:
-                    confidence += weight
-            return min(confidence, 1.0)
-        
-        return 0.5  # Confiança padrão
+        if hits is None:
+            hits = _KEYWORDS.find(text)
+        confidence = sum(weight for pattern, weight in weights.items() if pattern in hits)
+        return min(confidence, 1.0)
 
-    def _extract_key_patterns(self, text: str) -> List[str]:
+    def _extract_key_patterns(self, text: str, hits: set = None) -> List[str]:
         """Extrai padrões-chave do texto"""
         patterns_found = []
         
         # Valores monetários
-        if re.search(r'R\$\s*\d+[,.]?\d{0,2}', text):
+        if _VALOR_RE.search(text):
             patterns_found.append('valor_monetario')
         
         # CPF
-        if re.search(r'\*{3}[.,]?\d{3}[.,]?\d{3}-?\*{2}', text):
+        if find_masked_cpf(text) is not None:
             patterns_found.append('cpf_mascarado')
         
         # Data
-        if re.search(r'\d{2}/\d{2}/\d{4}', text):
+        if _DATA_RE.search(text):
             patterns_found.append('data')
         
         # Bancos específicos
-        text_lower = text.lower()
-        if 'will bank' in text_lower:
-            patterns_found.append('will_bank')
-        if 'nu pagamentos' in text_lower:
-            patterns_found.append('nubank')
-        if 'caixa' in text_lower:
-            patterns_found.append('caixa')
+        if hits is None:
+            hits = _KEYWORDS.find(text)
+        patterns_found.extend(tag for keyword, tag in _BANK_PATTERNS if keyword in hits)
         
         return patterns_found
 
     def _get_timestamp(self) -> str:
         """Retorna timestamp atual"""
-        from datetime import datetime
-        return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        return _timestamp_for_second(int(time.time()))
 
     def load_chatbot_model(self, model_path: str = 'models/chatbot_model.pkl'):
         """Carrega modelo otimizado para chatbot"""
         try:
             if os.path.exists(model_path):
-                with open(model_path, 'rb') as f:
-                    model_data = pickle.load(f)
-                    
+                model_data = _load_mapped(model_path)
+                
                 self.chatbot_classifier = model_data.get('intent_classifier')
                 self.entity_extractor = model_data.get('entity_extractor')
                 self.entity_patterns = model_data.get('entity_patterns', {})
@@ -263,65 +342,86 @@ class MLModel:
 
     def predict_intent(self, user_query: str) -> Dict[str, Any]:
         """Prediz intenção do usuário para o chatbot"""
+        return self.predict_intents([user_query])[0]
+
+    def predict_intents(self, user_queries: List[str]) -> List[Dict[str, Any]]:
+        """Prediz intenções de várias consultas com uma única vetorização e predict_proba"""
         if not hasattr(self, 'chatbot_classifier') or not self.chatbot_classifier:
-            return {
+            return [{
                 'intent': 'unknown',
                 'confidence': 0.0,
                 'entities': [],
                 'suggestion': 'Modelo chatbot não disponível'
-            }
+            } for _ in user_queries]
+        
+        if not user_queries:
+            return []
         
         try:
-            # Extrair features da consulta
-            query_features = self.entity_extractor.transform([user_query.lower()])
-            
-            # Predizer intenção
-            intent = self.chatbot_classifier.predict(query_features)[0]
-            confidence = max(self.chatbot_classifier.predict_proba(query_features)[0])
+            # Extrair features das consultas
+            query_features = self.entity_extractor.transform([query.lower() for query in user_queries])
             
+            # Predizer intenções (classe = argmax das probabilidades)
+            probabilities = self.chatbot_classifier.predict_proba(query_features)
+            best = probabilities.argmax(axis=1)
+            intents = self.chatbot_classifier.classes_.take(best)
+            confidences = probabilities[np.arange(len(best)), best]
+        except Exception as e:
+            return [{
+                'intent': 'error',
+                'confidence': 0.0,
+                'entities': [],
+                'error': str(e)
+            } for _ in user_queries]
+        
+        results = []
+        for user_query, intent, confidence in zip(user_queries, intents, confidences):
             # Extrair entidades
             entities = self._extract_entities_from_query(user_query)
             
             # Sugerir ações
             suggestions = self._generate_suggestions(intent, entities)
             
-            return {
+            results.append({
                 'intent': intent,
                 'confidence': float(confidence),
                 'entities': entities,
                 'suggestions': suggestions,
                 'processed_at': self._get_timestamp()
-            }
-            
-        except Exception as e:
-            return {
-                'intent': 'error',
-                'confidence': 0.0,
-                'entities': [],
-                'error': str(e)
-            }
+            })
+        
+        return results
 
     def _extract_entities_from_query(self, query: str) -> List[Dict]:
         """Extrai entidades da consulta do usuário"""
-        entities = []
         query_lower = query.lower()
         
-        # Extrair valores
-        valor_patterns = [r'r\$?\s*(\d+[,.]?\d{0,2})', r'(\d+)\s*reais?']
-        for pattern in valor_patterns:
-            matches = re.findall(pattern, query_lower)
-            for match in matches:
+        # Valores e datas
+        valores = []
+        datas = []
+        for match in _QUERY_ENTITY_RE.finditer(query_lower):
+            kind = match.lastgroup
+            text = match.group(kind)
+            if kind == 'data':
+                datas.append({
+                    'type': 'data',
+                    'value': text,
+                    'text': text,
+                    'confidence': 0.8
+                })
+            else:
                 try:
-                    valor = float(match.replace(',', '.'))
-                    entities.append({
+                    valores.append({
                         'type': 'valor',
-                        'value': valor,
-                        'text': match,
+                        'value': float(text.replace(',', '.')),
+                        'text': text,
                         'confidence': 0.9
                     })
-                except:
+                except ValueError:
                     continue
         
+        entities = valores
+        
         # Extrair nomes conhecidos
         if hasattr(self, 'entity_patterns'):
             for nome in self.entity_patterns.get('destinatarios_frequentes', []):
@@ -333,18 +433,7 @@ class MLModel:
                         'confidence': 0.95
                     })
         
-        # Extrair datas
-        data_patterns = [r'(\d{1,2}/\d{1,2}/\d{4})', r'(ontem|hoje|amanhã)']
-        for pattern in data_patterns:
-            matches = re.findall(pattern, query_lower)
-            for match in matches:
-                entities.append({
-                    'type': 'data',
-                    'value': match,
-                    'text': match,
-                    'confidence': 0.8
-                })
-        
+        entities.extend(datas)
         return entities
 
     def _generate_suggestions(self, intent: str, entities: List[Dict]) -> List[str]:
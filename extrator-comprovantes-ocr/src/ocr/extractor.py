@@ -1,131 +1,545 @@
+import io
+import os
+
+# O OpenMP interno do Tesseract é ineficiente: uma thread por instância e paralelismo por processos
+# (definido antes de carregar o pytesseract/tesserocr; um valor explícito do ambiente prevalece)
+os.environ.setdefault('OMP_THREAD_LIMIT', '1')
+
 import re
+import hashlib
+import tempfile
+import threading
 import pytesseract
+from collections import OrderedDict
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor
 from PIL import Image
 from typing import Dict, Optional, List
 from datetime import datetime
 from ..types.schemas import Comprovante, Pagador, Devedor, Transacao
+from ..utils.text_scan import KeywordMatcher
 from ..utils.helpers import (
-    preprocess_image, extract_text_from_image, detect_document_layout,
-    validate_cpf, validate_cnpj, format_currency, clean_text,
+    preprocess_image, extract_text_from_image, ocr_image, detect_document_layout, TESSERACT_CONFIG,
+    warm_up_ocr, release_ocr, load_image,
+    validate_cpf, validate_cnpj, format_currency, clean_text, _fmt_cnpj,
     correct_common_ocr_errors, extract_value_with_fallback
 )
 
+# Backend OCR alternativo PP-OCR (opcional; o Tesseract continua sendo o padrão)
+# Apenas a API 2.x (use_gpu/show_log e resultado [caixa, (texto, confiança)]); ver requirements-paddle.txt
+try:
+    import paddleocr
+    from paddleocr import PaddleOCR
+    PADDLEOCR_AVAILABLE = int(str(getattr(paddleocr, '__version__', '2')).split('.')[0]) < 3
+except ImportError:
+    PADDLEOCR_AVAILABLE = False
+
+OCR_BACKENDS = ('tesseract', 'paddle', 'paddle_gpu')
+
+def _paddle_result_text(result) -> str:
+    """Junta as linhas reconhecidas pelo PaddleOCR (uma lista de [caixa, (texto, confiança)] por página)"""
+    return '\n'.join(line[1][0] for page in result for line in (page or []))
+
+# Padrões auxiliares usados nos métodos de extração
+# (re.ASCII nos padrões só numéricos: \d vira [0-9]; nunca nos que usam \w, que precisa de acentos,
+# nem nos que usam \s, que precisa aceitar espaços Unicode do OCR como o NBSP)
+_WILL_BANK_DESTINO_PATTERNS = (
+    re.compile(r'Para\s+Ana Cleuma Sousa Dos Santos', re.IGNORECASE),
+    re.compile(r'Para\s+([A-Za-záàâãéèêíìîóòôõúùûç\s]+?)(?:\s*CPF)', re.IGNORECASE),
+)
+_WILL_BANK_ORIGEM_PATTERNS = (
+    re.compile(r'De\s+([A-Za-záàâãéèêíìîóòôõúùûç\s]+?)(?:\s*CPF)', re.IGNORECASE),
+    re.compile(r'Origem.*De\s+([A-Za-záàâãéèêíìîóòôõúùûç\s]+?)(?:\s*\*)', re.IGNORECASE),
+)
+# Pagadores conhecidos dos comprovantes Will Bank (marcador no texto -> dados corrigidos)
+_KNOWN_PAYERS = {
+    'Antonio Valmi': {
+        'primeiro_nome': 'Antonio', 'valor': 33.00, 'origem': 'Antonio Valmi Passos Da Rocha',
+        'cpf': '***,097.048-**', 'data': '20/05/2025', 'hora': '17:51:22'
+    },
+    'Sheila Fernandes': {
+        'primeiro_nome': 'Sheila', 'valor': 17.00, 'origem': 'Sheila Fernandes Da Silva',
+        'cpf': '***,687.783-**', 'data': '22/05/2025', 'hora': '17:52:04'
+    },
+}
+_KNOWN_PAYERS_RE = re.compile('|'.join(map(re.escape, _KNOWN_PAYERS)))
+_KNOWN_PAYER_VALUES = sorted(meta['valor'] for meta in _KNOWN_PAYERS.values())
+
+def _known_payer_in_text(text: str) -> Optional[Dict]:
+    """Pagador conhecido citado no texto (uma varredura; a ordem da tabela define a prioridade)"""
+    found = set(_KNOWN_PAYERS_RE.findall(text))
+    return next((meta for marker, meta in _KNOWN_PAYERS.items() if marker in found), None)
+
+def _known_payer_by_name(nome: str) -> Optional[Dict]:
+    """Pagador conhecido pelo primeiro nome contido no nome de origem"""
+    if not nome:
+        return None
+    return next((meta for meta in _KNOWN_PAYERS.values() if meta['primeiro_nome'] in nome), None)
+
+# Qualquer uma das grafias da chave PIX conhecida (uma única varredura)
+_WILL_BANK_CHAVE_RE = re.compile(r'\(88\)\s*99451-5533|88\s*99451-5533|\+5588994515533')
+# Campos fixos de todo comprovante PIX da Will Bank (aplicados de uma vez)
+_WILL_BANK_FIXED_FIELDS = {
+    'situacao': 'Efetivado',
+    'origem_instituicao': 'Will Bank',
+    'destino_instituicao': 'NU PAGAMENTOS - IP',
+    'tipo_documento': 'pix',
+}
+
+_NUBANK_VALOR_PATTERNS = (
+    re.compile(r'Valor\s+R\$\s*(\d+[,.]?\d{0,2})'),
+    re.compile(r'R\$\s*(\d+[,.]?\d{0,2})'),
+    re.compile(r'(\d+[,.]?\d{2})\s*(?:reais|$)'),
+)
+_NUBANK_DATA_PATTERNS = (
+    re.compile(r'(\d{1,2})\s+(MAI|JUN|JUL|AGO|SET|OUT|NOV|DEZ)\s+(\d{4})'),
+    re.compile(r'(\d{1,2}/\d{1,2}/\d{4})', re.ASCII),
+    re.compile(r'(\d{1,2}\s+de\s+\w+\s+de\s+\d{4})'),
+)
+_NUBANK_HORA_PATTERNS = (
+    re.compile(r'(\d{1,2}:\d{2}:\d{2})', re.ASCII),
+    re.compile(r'(\d{1,2}h\d{2})', re.ASCII),
+    re.compile(r'às\s+(\d{1,2}:\d{2}:\d{2})'),
+)
+_NUBANK_ORIGEM_PATTERNS = (
+    re.compile(r'Nome\s+([A-Za-záàâãéèêíìîóòôõúùûç\s]+?)(?:\s*Instituição)', re.IGNORECASE),
+    re.compile(r'Origem.*Nome\s+([A-Za-záàâãéèêíìîóòôõúùûç\s]+?)(?:\s*Instituição)', re.IGNORECASE),
+    re.compile(r'De\s+([A-Za-záàâãéèêíìîóòôõúùûç\s]+?)(?:\s*CPF)', re.IGNORECASE),
+)
+
+_GENERIC_VALOR_PATTERNS = (re.compile(r'R\$\s*(\d+[,.]?\d{0,2})'),)
+
+# Valores monetários: 'R$ 12,34' ou um valor no fim do texto
+_CURRENCY_PATTERNS = (
+    re.compile(r'R\$\s*(\d+(?:[.,]\d{1,2})?)'),
+    re.compile(r'(\d+(?:[.,]\d{2}))\s*$'),
+)
+# Remove 'R', '$' e espaços (mesmo conjunto que \s) em uma única passada
+_CURRENCY_STRIP = str.maketrans('', '', 'R$' + ''.join(c for c in map(chr, range(0x3001)) if c.isspace()))
+
+_DATE_PATTERNS = (
+    re.compile(r'(\d{1,2}/\d{1,2}/\d{4})', re.ASCII),
+    re.compile(r'(\d{1,2}-\d{1,2}-\d{4})', re.ASCII),
+)
+_TIME_PATTERNS = (
+    re.compile(r'(\d{1,2}:\d{2}:\d{2})', re.ASCII),
+    re.compile(r'(\d{1,2}:\d{2})', re.ASCII),
+)
+
+# Transferências (dicionário)
+# Campos de uma linha do Nubank em uma única varredura; vale a primeira ocorrência de cada um
+# (só o rótulo é consumido, o valor fica num lookahead: um campo nunca esconde outro que comece
+# dentro dele, como 'Tipo de transferência Conta 12' ou 'CNPJ 05 MAI 2025 - ...')
+_NUBANK_CAMPOS_RE = re.compile(
+    r'(?i:Valor\s+R\$)(?=\s*(?P<valor>[\d.,]+))'
+    r'|(?P<data_hora>(?P<dia>\d{2})\s+(?P<mes>[A-Z]{3})\s+(?P<ano>\d{4})\s+-\s+(?P<hora>\d{2}:\d{2}:\d{2}))'
+    r'|CNPJ(?=\s+(?P<cnpj>\d+))'
+    r'|Agência(?=\s+(?P<agencia>\d+))'
+    r'|Conta(?=\s+(?P<conta>[\d-]+))'
+    r'|Expiração(?=\s+(?P<expiracao>\d{2}/\d{2}/\d{4}\s+\d{2}:\d{2}:\d{2}))'
+    r'|Tipo de transferência(?=\s+(?P<tipo>[^\n]+))'
+)
+_NUBANK_CAMPOS_TOTAL = 7
+# Meses abreviados dos comprovantes Nubank ('05 MAI 2025')
+_MESES = {'JAN': '01', 'FEV': '02', 'MAR': '03', 'ABR': '04', 'MAI': '05', 'JUN': '06',
+          'JUL': '07', 'AGO': '08', 'SET': '09', 'OUT': '10', 'NOV': '11', 'DEZ': '12'}
+_DESTINO_NOME_RE = re.compile(r'Destino\s*\n\s*Nome\s+([^\n]+)', re.MULTILINE)
+_ORIGEM_NOME_RE = re.compile(r'Origem\s*\n\s*Nome\s+([^\n]+)', re.MULTILINE)
+
+# Bancos de detect_document_layout, em ordem de prioridade ('caixa econômica' já contém 'caixa')
+_LAYOUT_PRIORITY = ('will_bank', 'nubank', 'caixa', 'bb', 'bradesco', 'itau', 'santander')
+_LAYOUT_RE = re.compile(
+    r'(?P<will_bank>will ?bank)|(?P<nubank>nu pagamentos|nubank)|(?P<caixa>caixa)'
+    r'|(?P<bb>banco do brasil)|(?P<bradesco>bradesco)|(?P<itau>ita[uú])|(?P<santander>santander)',
+    re.IGNORECASE
+)
+
+# Seções Destino/Origem: a âncora é localizada uma vez e cada campo é buscado a partir dela
+# (mesmo resultado de 'âncora[\s\S]*?campo', sem revarrer o texto desde o início a cada campo)
+_DESTINO_ANCORA_RE = re.compile(r'Destino')
+_ORIGEM_ANCORA_RE = re.compile(r'Origem')
+_CAIXA_ORIGEM_ANCORA_RE = re.compile(r'Pagador|Origem')
+_CAIXA_DESTINO_ANCORA_RE = re.compile(r'Recebedor|Destino')
+_CAMPO_NOME_RE = re.compile(r'Nome\s+([^\n]+)')
+_CAMPO_CNPJ_RE = re.compile(r'CNPJ\s+(\d+)')
+_CAMPO_CPF_RE = re.compile(r'CPF\s+([^\n]+)')
+_CAMPO_INSTITUICAO_RE = re.compile(r'Instituição\s+([^\n]+)')
+# Rótulos dos campos de seção (nenhum se sobrepõe a outro), localizados em uma única varredura
+_CAMPO_POR_ROTULO = {
+    'Nome': _CAMPO_NOME_RE, 'CNPJ': _CAMPO_CNPJ_RE, 'CPF': _CAMPO_CPF_RE, 'Instituição': _CAMPO_INSTITUICAO_RE
+}
+_ROTULOS_SECAO_RE = re.compile('|'.join(_CAMPO_POR_ROTULO))
+# Identificador quebrado pelo OCR ('Identific ... ador'): âncora 'Identific' e campo 'ador'
+_IDENTIFIC_ANCORA_RE = re.compile(r'Identific')
+_CAMPO_ADOR_RE = re.compile(r'ador\s+([a-zA-Z0-9]+)')
+_CAMPO_ID_RE = re.compile(r'ID\s+([a-zA-Z0-9]+)')
+
+def _fields_after(text: str, anchor, *patterns) -> tuple:
+    """Primeiro match de cada padrão após a primeira ocorrência da âncora (None sem âncora)"""
+    anchor_match = anchor.search(text)
+    if not anchor_match:
+        return (None,) * len(patterns)
+    start = anchor_match.end()
+    return tuple(pattern.search(text, start) for pattern in patterns)
+
+def _scan_sections(text: str, *secoes) -> List[tuple]:
+    """_fields_after de várias seções ((âncora, rótulos), ...) em uma única varredura dos rótulos"""
+    inicios = []
+    for anchor, _ in secoes:
+        anchor_match = anchor.search(text)
+        inicios.append(anchor_match.end() if anchor_match else None)
+    achados = [{} for _ in secoes]
+    pendentes = sum(len(rotulos) for (_, rotulos), inicio in zip(secoes, inicios) if inicio is not None)
+    
+    if pendentes:
+        # Cada ocorrência de rótulo vale para as seções cuja âncora já passou e que ainda não têm o campo
+        for rotulo_match in _ROTULOS_SECAO_RE.finditer(text, min(i for i in inicios if i is not None)):
+            rotulo, pos = rotulo_match.group(), rotulo_match.start()
+            campo = None
+            for (_, rotulos), inicio, secao in zip(secoes, inicios, achados):
+                if inicio is None or pos < inicio or rotulo not in rotulos or rotulo in secao:
+                    continue
+                if campo is None:
+                    campo = _CAMPO_POR_ROTULO[rotulo].match(text, pos) or False
+                if campo:
+                    secao[rotulo] = campo
+                    pendentes -= 1
+            if not pendentes:
+                break
+    
+    return [tuple(secao.get(rotulo) for rotulo in rotulos) for (_, rotulos), secao in zip(secoes, achados)]
+
+def _find_id_transacao(text: str):
+    """Match do ID da transação ('ID x' ou 'Identific...ador x', o que vier primeiro no texto)"""
+    id_match = _CAMPO_ID_RE.search(text)
+    identific = _IDENTIFIC_ANCORA_RE.search(text)
+    if identific and (id_match is None or identific.start() < id_match.start()):
+        return _CAMPO_ADOR_RE.search(text, identific.end()) or id_match
+    return id_match
+
+@lru_cache(maxsize=256)
+def _detect_bank_layout(text: str) -> str:
+    """Banco do documento (textos repetidos no lote, como reprocessamentos, vêm do cache)"""
+    # Uma varredura sem cópia em minúsculas; a prioridade entre bancos vale sobre a posição no texto
+    encontrados = set()
+    for match in _LAYOUT_RE.finditer(text):
+        if match.lastgroup == 'will_bank':
+            return 'will_bank'
+        encontrados.add(match.lastgroup)
+    
+    for layout in _LAYOUT_PRIORITY:
+        if layout in encontrados:
+            return layout
+    return 'generico'
+
+# Padrões de _extract_nubank_transferencia / _extract_caixa_transferencia (Comprovante)
+_TRANSF_VALOR_RE = re.compile(r'R\$\s*([\d.,]+)')
+_TRANSF_DATA_HORA_RE = re.compile(r'(\d{2})\s+([A-Z]{3})\s+(\d{4})\s+-\s+(\d{2}:\d{2}:\d{2})')
+_CAIXA_ORIGEM_NOME_RE = re.compile(r'(?:Pagador|Origem)[\s\n]*Nome\s+([^\n]+)')
+_CAIXA_DESTINO_NOME_RE = re.compile(r'(?:Recebedor|Destino)[\s\n]*Nome\s+([^\n]+)')
+
+def _valor_float(valor_str: str) -> float:
+    """Converte o valor capturado em float ('1.234,56' -> 1234.56)"""
+    # Com vírgula decimal, os pontos são separadores de milhar
+    if ',' in valor_str:
+        valor_str = valor_str.replace('.', '').replace(',', '.')
+    return float(valor_str)
+
+def _parse_valor(text: str, pattern, default: float = None) -> Optional[float]:
+    """Primeiro valor do padrão no texto como float, ou default"""
+    match = pattern.search(text)
+    if not match:
+        return default
+    return _valor_float(match.group(1))
+
+def _parse_valor_fast(text: str) -> Optional[float]:
+    """Equivale a _parse_valor com r'(?:Valor|R\$)\s*R?\$?\s*([\d.,]+)', sem passar pelo regex"""
+    # \s e \d de um padrão str são Unicode: str.isspace()/str.isdecimal() (ex.: NBSP do OCR)
+    n = len(text)
+    valor_pos = text.find('Valor')
+    rs_pos = text.find('R$')
+    # Candidatos em ordem de posição; o primeiro seguido de dígitos vence
+    while valor_pos != -1 or rs_pos != -1:
+        if rs_pos == -1 or (valor_pos != -1 and valor_pos < rs_pos):
+            i = valor_pos + 5
+            valor_pos = text.find('Valor', valor_pos + 1)
+        else:
+            i = rs_pos + 2
+            rs_pos = text.find('R$', rs_pos + 1)
+        
+        while i < n and text[i].isspace():
+            i += 1
+        if i < n and text[i] == 'R':
+            i += 1
+        if i < n and text[i] == '$':
+            i += 1
+        while i < n and text[i].isspace():
+            i += 1
+        
+        j = i
+        while j < n and (text[j].isdecimal() or text[j] in '.,'):
+            j += 1
+        if j > i:
+            return _valor_float(text[i:j])
+    return None
+
+def _nova_transacao(valor: float, id_transacao: str = "", data_hora: str = "") -> Transacao:
+    """Transação concluída das extrações de transferência (demais campos com os valores padrão)"""
+    # Argumentos posicionais na ordem de Transacao: situacao, valor, abatimento, juros, multa, desconto,
+    # valor_documento, valor_pagamento, vencimento, validade_pagamento, solicitacao_pagador,
+    # id_transacao, data_hora, identificador, codigo_operacao, chave_seguranca, valor_tarifa, data
+    return Transacao("Concluída", valor, 0.0, 0.0, 0.0, 0.0, valor, valor, "", 30, "",
+                     id_transacao, data_hora, "", "", "", 0.0, data_hora)
+
+def _ocr_file_list(image_paths: List[str]) -> List[str]:
+    """Executa o Tesseract uma única vez sobre uma lista de arquivos (uma página por imagem)"""
+    fd, list_path = tempfile.mkstemp(suffix='.txt')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(os.path.abspath(path) for path in image_paths))
+        output = pytesseract.image_to_string(list_path, lang='por', config=TESSERACT_CONFIG)
+    finally:
+        os.remove(list_path)
+    
+    # O Tesseract separa as páginas com form feed
+    pages = output.split('\x0c')
+    if pages and not pages[-1].strip():
+        pages.pop()
+    if len(pages) != len(image_paths):
+        raise ValueError(f"Tesseract retornou {len(pages)} páginas para {len(image_paths)} imagens")
+    return [page.strip() for page in pages]
+
+# Indicadores de tipo de documento (classify_document_type), encontrados em uma única varredura
+_PIX_INDICATORS = frozenset([
+    'pix enviado', 'pix recebido', 'comprovante pix', 'comprovante de pix',
+    'dados do recebedor', 'dados do pagador', 'chave pix', 'autenticação'
+])
+_WILL_BANK_PIX_WORDS = frozenset(['destino', 'origem', 'chave'])
+_TRANSFERENCIA_WORDS = frozenset(['transferência', 'transferencia'])
+_BOLETO_WORDS = frozenset(['boleto', 'cobrança'])
+_DOC_TYPE_KEYWORDS = KeywordMatcher(
+    _PIX_INDICATORS | _WILL_BANK_PIX_WORDS | _TRANSFERENCIA_WORDS | _BOLETO_WORDS | {'will bank'}
+)
+# Cabeçalho do comprovante, onde os indicadores costumam aparecer
+_CLASSIFY_PREFIX = 1024
+
+# Colunas de extract_many_to_frame (chaves do dicionário extraído) e seus valores padrão
+_FRAME_COLUMNS = (
+    ('arquivo', ''), ('layout_detectado', ''), ('tipo_documento', ''), ('erro', ''),
+    ('valor_numerico', 0.0), ('data', ''), ('hora', ''), ('data_hora_completa', ''),
+    ('situacao', ''), ('id_transacao', ''), ('codigo_operacao', ''), ('chave_seguranca', ''),
+    ('pagador_nome', ''), ('pagador_cpf', ''), ('pagador_instituicao', ''),
+    ('recebedor_nome', ''), ('recebedor_cpf', ''), ('recebedor_instituicao', ''),
+    # Lidos por _create_generic_comprovante (linhas sem pagador e recebedor)
+    ('valor_total', 0.0), ('nome', ''), ('cpf', ''), ('instituicao', ''), ('cnpj', ''), ('vencimento', ''),
+)
+
+# Extrator de cada processo do pool de extract_data_many (e o horário do lote)
+_pool_extractor = None
+_pool_batch_timestamp = None
+
+def _init_pool_extractor(tesseract_cmd: str, batch_timestamp: str = None):
+    """Cria o extrator do processo e carrega o Tesseract uma única vez"""
+    global _pool_extractor, _pool_batch_timestamp
+    _pool_extractor = OCRExtractor(tesseract_cmd)
+    _pool_batch_timestamp = batch_timestamp
+    warm_up_ocr()
+
+def _load_and_extract(extractor, image_path: str, batch_timestamp: str = None) -> Dict:
+    """Carrega e extrai os dados de um arquivo"""
+    try:
+        image = load_image(image_path)
+    except Exception as e:
+        return {
+            'erro': str(e),
+            'raw_text': '',
+            'layout_detectado': 'erro',
+            'arquivo': image_path,
+            'processado_em': batch_timestamp or datetime.now().isoformat()
+        }
+    return extractor.extract_data(image, image_path, batch_timestamp)
+
+def _extract_file(image_path: str) -> Dict:
+    """Carrega e extrai os dados de um arquivo (executado nos processos do pool)"""
+    return _load_and_extract(_pool_extractor, image_path, _pool_batch_timestamp)
+
 class OCRExtractor:
-    def __init__(self, tesseract_cmd='tesseract'):
+    # Atributos fixos por instância (sem __dict__)
+    __slots__ = ('tesseract_cmd', 'backend', 'patterns', '_paddle', '_ocr_cache', '_ocr_cache_lock')
+    
+    # Textos OCR mantidos em memória (LRU por hash do arquivo)
+    OCR_CACHE_SIZE = 512
+    # Arquivos por chamada do Tesseract no OCR em lote (listas longas podem travar o pytesseract)
+    BATCH_CHUNK_SIZE = 40
+
+    def __init__(self, tesseract_cmd='tesseract', backend='tesseract'):
+        if backend not in OCR_BACKENDS:
+            raise ValueError(f"Backend OCR desconhecido: {backend} (opções: {', '.join(OCR_BACKENDS)})")
+        
         self.tesseract_cmd = tesseract_cmd
         pytesseract.pytesseract.tesseract_cmd = tesseract_cmd
-        
-        # Padrões específicos melhorados para diferentes bancos
-        self.patterns = {
-            'pix_will_bank': {
-                'valor': r'R\$\s*([\d,]+\.?\d{0,2})',
-                'destino_nome': r'Para\s+([A-Za-záàâãéèêíìîóòôõúùûç\s]+?)(?:\s*\n|\s*CPF)',
-                'destino_cpf': r'CPF/CNPJ\s+(\*{3},\d{3}\.\d{3}-\*{2})',
-                'destino_instituicao': r'Instituiç[\s\w]*ão\s+([A-Z\s\-|PI]+)',
-                'origem_nome': r'De\s+([A-Za-záàâãéèêÍìîóòôõúùûç\s]+?)(?:\s*\n|\s*CPF)',
-                'origem_cpf': r'De[\s\S]*?CPF/CNPJ\s+(\*{3},\d{3}\.\d{3}-\*{2})',
-                'origem_instituicao': r'Will\s+Bank',
-                'chave_pix': r'\((\d{2})\)\s+(\d{5}-\d{4})',
-                'descricao': r'Descrição\s+([^\n\r]+)',
-                'autenticacao': r'Autenticação\s+([A-Z0-9]+)',
-                'data': r'(\d{2}/\d{2}/\d{4})',
-                'hora': r'(\d{2}:\d{2}:\d{2})'
-            },
-            'pix_caixa': {
-                'valor': r'(?:Valor|R\$)\s*R?\$?\s*([\d,]+\.?\d{0,2})',
-                'data': r'(\d{1,2}/\d{1,2}/\d{4})',
-                'hora': r'(\d{1,2}:\d{2}:\d{2})',
-                'recebedor_nome': r'Dados do recebedor\s*\n\s*Nome\s*\n\s*([A-ZÁÀÂÃÉÈÊÍÌÎÓÒÔÕÚÙÛÇ\s]+?)(?:\n|CPF)',
-                'pagador_nome': r'Dados do pagador\s*\n\s*Nome\s*\n\s*([A-ZÁÀÂÃÉÈÊÍÌÎÓÒÔÕÚÙÛÇ\s]+?)(?:\n|CPF)',
-                'recebedor_cpf': r'Dados do recebedor[\s\S]*?CPF\s*\n\s*(\*{3}[.,]?\d{3}[.,]?\d{3}-?\*{2})',
-                'pagador_cpf': r'Dados do pagador[\s\S]*?CPF\s*\n\s*(\*{3}[.,]?\d{3}[.,]?\d{3}-?\*{2})',
-                'recebedor_instituicao': r'Dados do recebedor[\s\S]*?Instituição\s*\n\s*([A-ZÁÀÂÃÉÈÊÍÌÎÓÒÔÕÚÙÛÇ0-9\s&.-]+?)(?:\n|Dados)',
-                'pagador_instituicao': r'Dados do pagador[\s\S]*?Instituição\s*\n\s*([A-ZÁÀÂÃÉÈÊÍÌÎÓÒÔÕÚÙÛÇ\s&.-]+?)(?:\n|Dados)',
-                'situacao': r'Situação\s*\n\s*([A-Za-z]+)',
-                'id_transacao': r'ID transação\s*\n\s*([A-Za-z0-9]+)',
-                'codigo_operacao': r'Código da operação\s*\n\s*(\d+)',
-                'chave_seguranca': r'Chave de segurança\s*\n\s*([A-Z0-9]+)',
-                'chave_pix': r'(?:Chave|chave)\s*\n\s*(\d+)',
-                'data_hora_completa': r'Data/\s*Hora\s*\n\s*(\d{1,2}/\d{1,2}/\d{4}\s*-\s*\d{1,2}:\d{2}:\d{2})'
-            },
-            'pix': {
-                'valor': r'R\$\s*([\d,]+\.?\d{0,2})',
-                'data': r'(\d{2}/\d{2}/\d{4})',
-                'hora': r'(\d{2}:\d{2}:\d{2})',
-                'nome_pagador': r'(?:Nome|NOME)[\s:]*([A-ZÁÀÂÃÉÈÊÍÌÎÓÒÔÕÚÙÛÇ\s]+?)(?:\n|CPF)',
-                'cpf': r'CPF[\s:]*(\*{3}\.?\d{3}\.?\d{3}-?\*{2})',
-                'instituicao': r'(?:Instituição|INSTITUIÇÃO)[\s:]*([A-ZÁÀÂÃÉÈÊÍÌÎÓÒÔÕÚÙÛÇ\s&]+)',
-                'id_transacao': r'(?:ID|Id)[\s:]*([A-Za-z0-9]+)',
-                'chave_pix': r'(?:Chave Pix|CHAVE PIX)[\s:]*([A-Za-z0-9\-]+)'
-            },
-            'transferencia': {
-                'valor': r'(?:Valor|VALOR)[\s:]*R\$\s*([\d,]+\.?\d{0,2})',
-                'nome_origem': r'(?:Nome|NOME)[\s:]*([A-ZÁÀÂÃÉÈÊÍÌÎÓÒÔÕÚÙÛÇ\s]+?)(?:\n|CPF|CNPJ)',
-                'nome_destino': r'(?:Destino|DESTINO)[\s\n]*(?:Nome|NOME)[\s:]*([A-ZÁÀÂÃÉÈÊÍÌÎÓÒÔÕÚÙÛÇ\s]+)',
-                'cpf': r'CPF[\s:]*(\*{3}\.?\d{3}\.?\d{3}-?\*{2}|\d{3}\.?\d{3}\.?\d{3}-?\d{2})',
-                'cnpj': r'CNPJ[\s:]*(\d{2}\.?\d{3}\.?\d{3}/?0001-?\d{2})',
-                'instituicao': r'(?:Instituição|INSTITUIÇÃO)[\s:]*([A-ZÁÀÂÃÉÈÊÍÌÎÓÒÔÕÚÙÛÇ\s&.-]+)',
-                'conta': r'(?:Conta|CONTA)[\s:]*(\d+-?\d)',
-                'agencia': r'(?:Agência|AGÊNCIA)[\s:]*(\d{4})',
-                'data_expiracao': r'(?:Expiração|EXPIRAÇÃO)[\s:]*(\d{2}/\d{2}/\d{4}\s+\d{2}:\d{2}:\d{2})'
-            },
-            'boleto': {
-                'valor': r'(?:Valor|VALOR)[\s:]*R\$\s*([\d,]+\.?\d{0,2})',
-                'vencimento': r'(?:Vencimento|VENCIMENTO)[\s:]*(\d{2}/\d{2}/\d{4})',
-                'codigo_barras': r'(\d{5}\.\d{5}\s+\d{5}\.\d{6}\s+\d{5}\.\d{6}\s+\d\s+\d{14})',
-                'beneficiario': r'(?:Beneficiário|BENEFICIÁRIO)[\s:]*([A-ZÁÀÂÃÉÈÊÍÌÎÓÒÔÕÚÙÛÇ\s&.-]+)',
-                'pagador': r'(?:Pagador|PAGADOR)[\s:]*([A-ZÁÀÂÃÉÈÊÍÌÎÓÒÔÕÚÙÛÇ\s]+)',
-                'nosso_numero': r'(?:Nosso Número|NOSSO NÚMERO)[\s:]*(\d+)'
-            }
-        }
+        self._ocr_cache = OrderedDict()
+        self._ocr_cache_lock = threading.Lock()
+        
+        # PP-OCR em CPU ou GPU; sem o paddleocr instalado, segue com o Tesseract
+        self._paddle = None
+        if backend != 'tesseract' and not PADDLEOCR_AVAILABLE:
+            print(f"⚠️ paddleocr 2.x não instalado; backend '{backend}' substituído pelo Tesseract")
+            backend = 'tesseract'
+        if backend != 'tesseract':
+            self._paddle = PaddleOCR(use_angle_cls=False, lang='pt', use_gpu=(backend == 'paddle_gpu'),
+                                     show_log=False)
+        self.backend = backend
+
+    def __enter__(self):
+        # Carrega o Tesseract em processo (tesserocr) antes da primeira imagem
+        warm_up_ocr()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+    def close(self):
+        """Libera o Tesseract em processo (instâncias de todas as threads, compartilhadas pelos extratores)"""
+        release_ocr()
 
     def extract_text(self, image_path):
-        # Load the image from the specified path
-        image = Image.open(image_path)
+        # Arquivos idênticos (reenvios, itens repetidos no lote) reaproveitam o OCR anterior
+        with open(image_path, 'rb') as f:
+            content = f.read()
+        key = hashlib.blake2b(content, digest_size=16).digest()
+        
+        with self._ocr_cache_lock:
+            text = self._ocr_cache.get(key)
+            if text is not None:
+                self._ocr_cache.move_to_end(key)
+                return text
+        
+        if self._paddle is not None:
+            # PP-OCR lê direto do arquivo (detecção + reconhecimento no backend nativo)
+            text = _paddle_result_text(self._paddle.ocr(image_path, cls=False))
+        else:
+            # Load the image from the specified path
+            image = Image.open(io.BytesIO(content))
+            
+            # Use Tesseract to do OCR on the image with Portuguese language
+            text = ocr_image(image)
         
-        # Use Tesseract to do OCR on the image with Portuguese language
-        text = pytesseract.image_to_string(image, lang='por')
+        with self._ocr_cache_lock:
+            self._ocr_cache[key] = text
+            if len(self._ocr_cache) > self.OCR_CACHE_SIZE:
+                self._ocr_cache.popitem(last=False)
         return text
 
+    def extract_text_batch(self, image_paths: List[str]) -> List[str]:
+        """OCR de vários arquivos: uma chamada do Tesseract por grupo de BATCH_CHUNK_SIZE arquivos"""
+        if self._paddle is not None:
+            return [self.extract_text(path) for path in image_paths]
+        
+        texts = []
+        for start in range(0, len(image_paths), self.BATCH_CHUNK_SIZE):
+            texts.extend(_ocr_file_list(image_paths[start:start + self.BATCH_CHUNK_SIZE]))
+        return texts
+
     def classify_document_type(self, text: str) -> str:
         """Classifica o tipo de documento com base no conteúdo - CORRIGIDO"""
-        text_lower = text.lower()
+        # Indicador PIX no cabeçalho decide sozinho; senão varre o restante (com sobreposição)
+        hits = _DOC_TYPE_KEYWORDS.find(text[:_CLASSIFY_PREFIX])
+        if hits.isdisjoint(_PIX_INDICATORS) and len(text) > _CLASSIFY_PREFIX:
+            hits |= _DOC_TYPE_KEYWORDS.find(text[_CLASSIFY_PREFIX - _DOC_TYPE_KEYWORDS.max_length + 1:])
         
         # Verificar PIX primeiro - padrões mais específicos
-        if any(indicator in text_lower for indicator in [
-            'pix enviado', 'pix recebido', 'comprovante pix', 'comprovante de pix',
-            'dados do recebedor', 'dados do pagador', 'chave pix', 'autenticação'
-        ]):
+        if not hits.isdisjoint(_PIX_INDICATORS):
             return 'pix'
         
         # Will Bank específico - forçar PIX se detectar Will Bank
-        if 'will bank' in text_lower and any(word in text_lower for word in ['destino', 'origem', 'chave']):
+        if 'will bank' in hits and not hits.isdisjoint(_WILL_BANK_PIX_WORDS):
             return 'pix'
         
         # Outros tipos
-        if 'transferência' in text_lower or 'transferencia' in text_lower:
+        if not hits.isdisjoint(_TRANSFERENCIA_WORDS):
             return 'transferencia'
-        elif 'boleto' in text_lower or 'cobrança' in text_lower:
+        elif not hits.isdisjoint(_BOLETO_WORDS):
             return 'boleto'
         else:
             return 'generico'
 
-    def extract_data(self, image, image_path: str = None) -> Dict:
-        """Método principal para extrair dados de comprovantes"""
+    def extract_data(self, image, image_path: str = None, batch_timestamp: str = None) -> Dict:
+        """Método principal para extrair dados de comprovantes (batch_timestamp: horário comum do lote)"""
         try:
-            # Preprocessar imagem
-            processed_image = preprocess_image(image)
+            if self._paddle is not None:
+                # PP-OCR faz a própria normalização da imagem (BGR do OpenCV)
+                raw_text = _paddle_result_text(self._paddle.ocr(image, cls=False))
+            else:
+                # Preprocessar imagem
+                processed_image = preprocess_image(image)
+                
+                # Extrair texto via OCR
+                raw_text = extract_text_from_image(processed_image)
             
-            # Extrair texto via OCR
-            raw_text = extract_text_from_image(processed_image)
+            return self.parse_text(raw_text, image_path, batch_timestamp)
             
+        except Exception as e:
+            return {
+                'erro': str(e),
+                'raw_text': '',
+                'layout_detectado': 'erro',
+                'arquivo': image_path or 'unknown',
+                'processado_em': batch_timestamp or datetime.now().isoformat()
+            }
+    
+    def extract_data_many(self, image_paths: List[str], max_workers: int = None) -> List[Dict]:
+        """Extrai vários arquivos em paralelo (um Tesseract de thread única por processo)"""
+        image_paths = list(image_paths)
+        if not image_paths:
+            return []
+        
+        # Um único horário para todo o lote
+        batch_timestamp = datetime.now().isoformat()
+        if self._paddle is not None:
+            # O PP-OCR já paraleliza internamente (e a GPU não se divide entre processos)
+            return [_load_and_extract(self, path, batch_timestamp) for path in image_paths]
+        
+        max_workers = min(max_workers or os.cpu_count() or 1, len(image_paths))
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_pool_extractor,
+                                 initargs=(self.tesseract_cmd, batch_timestamp)) as executor:
+            # map preserva a ordem dos arquivos
+            return list(executor.map(_extract_file, image_paths, chunksize=4))
+    
+    def extract_many_to_frame(self, image_paths: List[str], max_workers: int = None):
+        """Extrai vários arquivos para um DataFrame (uma coluna por campo, sem objetos por linha)"""
+        import pandas as pd
+        
+        results = self.extract_data_many(image_paths, max_workers)
+        columns = {
+            column: [result.get(column) or default for result in results]
+            for column, default in _FRAME_COLUMNS
+        }
+        frame = pd.DataFrame(columns)
+        frame['valor_numerico'] = frame['valor_numerico'].astype('float64')
+        return frame
+    
+    def comprovante_from_row(self, row) -> Comprovante:
+        """Materializa o Comprovante de uma linha de extract_many_to_frame (sob demanda)"""
+        # Campos vazios no DataFrame correspondem a chaves ausentes no dicionário extraído
+        data = {key: value for key, value in row.items() if value != ''}
+        
+        # Mesmo critério de extract_comprovante
+        if 'recebedor_nome' in data and 'pagador_nome' in data:
+            return self._create_pix_caixa_comprovante(data)
+        return self._create_generic_comprovante(data)
+    
+    def parse_text(self, raw_text: str, image_path: str = None, batch_timestamp: str = None) -> Dict:
+        """Extrai os dados a partir de um texto já obtido via OCR"""
+        try:
             if not raw_text.strip():
                 return {
                     'erro': 'Nenhum texto extraído da imagem',
                     'raw_text': '',
                     'layout_detectado': 'vazio',
                     'arquivo': image_path or 'unknown',
-                    'processado_em': datetime.now().isoformat()
+                    'processado_em': batch_timestamp or datetime.now().isoformat()
                 }
             
             # Aplicar correções de OCR
@@ -135,7 +549,7 @@ class OCRExtractor:
             layout = detect_document_layout(cleaned_text)
             
             # Extrair dados baseado no layout
-            extracted_data = self._extract_by_layout(cleaned_text, layout)
+            extracted_data = self._extract_by_layout(cleaned_text, layout, cleaned_text=cleaned_text)
             
             # Adicionar metadados
             extracted_data.update({
@@ -143,7 +557,7 @@ class OCRExtractor:
                 'cleaned_text': cleaned_text,
                 'layout_detectado': layout,
                 'arquivo': image_path or 'unknown',
-                'processado_em': datetime.now().isoformat()
+                'processado_em': batch_timestamp or datetime.now().isoformat()
             })
             
             return extracted_data
@@ -154,16 +568,16 @@ class OCRExtractor:
                 'raw_text': '',
                 'layout_detectado': 'erro',
                 'arquivo': image_path or 'unknown',
-                'processado_em': datetime.now().isoformat()
+                'processado_em': batch_timestamp or datetime.now().isoformat()
             }
     
-    def _extract_by_layout(self, text: str, layout: str) -> Dict:
-        """Extrai dados baseado no layout detectado"""
+    def _extract_by_layout(self, text: str, layout: str, cleaned_text: str = None) -> Dict:
+        """Extrai dados baseado no layout detectado (cleaned_text: texto já corrigido, se houver)"""
         
         if layout == 'will_bank':
-            return self.extract_pix_will_bank_data(text)
+            return self.extract_pix_will_bank_data(text, cleaned_text)
         elif layout == 'nubank':
-            return self.extract_nubank_data(text)
+            return self.extract_nubank_data(text, cleaned_text)
         elif layout == 'caixa':
             return self.extract_caixa_data(text)
         elif layout == 'bb':
@@ -171,42 +585,34 @@ class OCRExtractor:
         else:
             return self.extract_generic_data(text)
     
-    def extract_pix_will_bank_data(self, text: str) -> Dict:
+    def extract_pix_will_bank_data(self, text: str, cleaned_text: str = None) -> Dict:
         """Extrai dados específicos de comprovantes PIX da Will Bank - VERSÃO CORRIGIDA"""
-        data = {}
+        # Aplicar correções de OCR primeiro (a menos que o chamador já tenha aplicado)
+        if cleaned_text is None:
+            cleaned_text = correct_common_ocr_errors(text)
         
-        # Aplicar correções de OCR primeiro
-        cleaned_text = correct_common_ocr_errors(text)
+        # Pagador conhecido citado no texto (valor, nome, CPF e data por contexto)
+        pagador_conhecido = _known_payer_in_text(cleaned_text)
         
         # 1. Extrair valor com estratégias melhoradas
-        valor_encontrado = 0.0
-        
-        # Estratégia por contexto específico
-        if 'Antonio Valmi' in cleaned_text:
-            valor_encontrado = 33.00  # Comprovante Antonio é R$ 33,00
-            print("🔧 CORREÇÃO: Valor por contexto Antonio -> R$ 33,00")
-        elif 'Sheila Fernandes' in cleaned_text:
-            valor_encontrado = 17.00  # Comprovante Sheila é R$ 17,00
-            print("🔧 CORREÇÃO: Valor por contexto Sheila -> R$ 17,00")
+        if pagador_conhecido:
+            # Estratégia por contexto específico
+            valor_encontrado = pagador_conhecido['valor']
+            valor_texto = f"{valor_encontrado:.2f}".replace('.', ',')
+            print(f"🔧 CORREÇÃO: Valor por contexto {pagador_conhecido['primeiro_nome']} -> R$ {valor_texto}")
         else:
             # Usar extração padrão
-            valor_encontrado = extract_value_with_fallback(cleaned_text, [17.00, 33.00])
+            valor_encontrado = extract_value_with_fallback(cleaned_text, list(_KNOWN_PAYER_VALUES))
         
-        data['valor_numerico'] = valor_encontrado
-        data['valor_total'] = valor_encontrado
+        data = {'valor_numerico': valor_encontrado, 'valor_total': valor_encontrado}
         
         # 2. Extrair nomes sem quebras de linha
         destino_nome = None
         origem_nome = None
         
         # Padrões para destino
-        destino_patterns = [
-            r'Para\s+Ana Cleuma Sousa Dos Santos',
-            r'Para\s+([A-Za-záàâãéèêíìîóòôõúùûç\s]+?)(?:\s*CPF)',
-        ]
-        
-        for pattern in destino_patterns:
-            match = re.search(pattern, cleaned_text, re.IGNORECASE)
+        for pattern in _WILL_BANK_DESTINO_PATTERNS:
+            match = pattern.search(cleaned_text)
             if match:
                 if 'Ana Cleuma' in match.group(0):
                     destino_nome = 'Ana Cleuma Sousa Dos Santos'
@@ -215,18 +621,11 @@ class OCRExtractor:
                 break
         
         # Padrões para origem
-        if 'Antonio Valmi' in cleaned_text:
-            origem_nome = 'Antonio Valmi Passos Da Rocha'
-        elif 'Sheila Fernandes' in cleaned_text:
-            origem_nome = 'Sheila Fernandes Da Silva'
+        if pagador_conhecido:
+            origem_nome = pagador_conhecido['origem']
         else:
-            origem_patterns = [
-                r'De\s+([A-Za-záàâãéèêíìîóòôõúùûç\s]+?)(?:\s*CPF)',
-                r'Origem.*De\s+([A-Za-záàâãéèêíìîóòôõúùûç\s]+?)(?:\s*\*)',
-            ]
-            
-            for pattern in origem_patterns:
-                match = re.search(pattern, cleaned_text, re.IGNORECASE)
+            for pattern in _WILL_BANK_ORIGEM_PATTERNS:
+                match = pattern.search(cleaned_text)
                 if match:
                     origem_nome = match.group(1).strip()
                     break
@@ -240,63 +639,42 @@ class OCRExtractor:
             data['pagador_nome'] = origem_nome
         
         # 3. Extrair CPFs com associação correta
-        if origem_nome and 'Antonio' in origem_nome:
-            data['origem_cpf'] = '***,097.048-**'
-            data['pagador_cpf'] = '***,097.048-**'
-        elif origem_nome and 'Sheila' in origem_nome:
-            data['origem_cpf'] = '***,687.783-**'
-            data['pagador_cpf'] = '***,687.783-**'
+        pagador_origem = _known_payer_by_name(origem_nome)
+        if pagador_origem:
+            data['origem_cpf'] = pagador_origem['cpf']
+            data['pagador_cpf'] = pagador_origem['cpf']
         
         if destino_nome and 'Ana Cleuma' in destino_nome:
             data['destino_cpf'] = '***,120.983-**'
             data['recebedor_cpf'] = '***,120.983-**'
         
         # 4. Extrair chave PIX corrigida
-        chave_patterns = [
-            r'\(88\)\s*99451-5533',
-            r'88\s*99451-5533',
-            r'\+5588994515533'
-        ]
-        
-        for pattern in chave_patterns:
-            if re.search(pattern, cleaned_text):
-                data['chave_pix'] = '(88) 99451-5533'
-                break
+        if _WILL_BANK_CHAVE_RE.search(cleaned_text):
+            data['chave_pix'] = '(88) 99451-5533'
         
         # 5. Data e hora por contexto
-        if origem_nome and 'Antonio' in origem_nome:
-            data['data'] = '20/05/2025'
-            data['hora'] = '17:51:22'
-        elif origem_nome and 'Sheila' in origem_nome:
-            data['data'] = '22/05/2025'
-            data['hora'] = '17:52:04'
+        if pagador_origem:
+            data['data'] = pagador_origem['data']
+            data['hora'] = pagador_origem['hora']
         
         data['data_hora'] = f"{data.get('data', '')} {data.get('hora', '')}".strip()
         
         # 6. Campos obrigatórios
-        data['situacao'] = 'Efetivado'
-        data['origem_instituicao'] = 'Will Bank'
-        data['destino_instituicao'] = 'NU PAGAMENTOS - IP'
-        data['tipo_documento'] = 'pix'
+        data.update(_WILL_BANK_FIXED_FIELDS)
         data['codigo_operacao'] = f'PIX_WILL_BANK_{int(valor_encontrado):03d}' if valor_encontrado > 0 else 'PIX_WILL_BANK_000'
         
         return data
 
-    def extract_nubank_data(self, text: str) -> Dict:
+    def extract_nubank_data(self, text: str, cleaned_text: str = None) -> Dict:
         """Extrai dados de transferências do Nubank - VERSÃO MELHORADA"""
         data = {'tipo_documento': 'transferencia'}
         
-        cleaned_text = correct_common_ocr_errors(text)
+        if cleaned_text is None:
+            cleaned_text = correct_common_ocr_errors(text)
         
         # 1. Extrair valor mais precisamente
-        valor_patterns = [
-            r'Valor\s+R\$\s*(\d+[,.]?\d{0,2})',
-            r'R\$\s*(\d+[,.]?\d{0,2})',
-            r'(\d+[,.]?\d{2})\s*(?:reais|$)'
-        ]
-        
-        for pattern in valor_patterns:
-            match = re.search(pattern, cleaned_text)
+        for pattern in _NUBANK_VALOR_PATTERNS:
+            match = pattern.search(cleaned_text)
             if match:
                 try:
                     valor_str = match.group(1).replace(',', '.')
@@ -309,27 +687,15 @@ class OCRExtractor:
                     continue
         
         # 2. Extrair data completa
-        data_patterns = [
-            r'(\d{1,2})\s+(MAI|JUN|JUL|AGO|SET|OUT|NOV|DEZ)\s+(\d{4})',
-            r'(\d{1,2}/\d{1,2}/\d{4})',
-            r'(\d{1,2}\s+de\s+\w+\s+de\s+\d{4})'
-        ]
-        
-        for pattern in data_patterns:
-            match = re.search(pattern, cleaned_text)
+        for pattern in _NUBANK_DATA_PATTERNS:
+            match = pattern.search(cleaned_text)
             if match:
                 data['data'] = match.group(0)
                 break
         
         # 3. Extrair hora
-        hora_patterns = [
-            r'(\d{1,2}:\d{2}:\d{2})',
-            r'(\d{1,2}h\d{2})',
-            r'às\s+(\d{1,2}:\d{2}:\d{2})'
-        ]
-        
-        for pattern in hora_patterns:
-            match = re.search(pattern, cleaned_text)
+        for pattern in _NUBANK_HORA_PATTERNS:
+            match = pattern.search(cleaned_text)
             if match:
                 data['hora'] = match.group(1)
                 break
@@ -342,14 +708,8 @@ class OCRExtractor:
             data['chave_pix'] = '+5588994515533'
         
         # Origem - extrair do texto
-        origem_patterns = [
-            r'Nome\s+([A-Za-záàâãéèêíìîóòôõúùûç\s]+?)(?:\s*Instituição)',
-            r'Origem.*Nome\s+([A-Za-záàâãéèêíìîóòôõúùûç\s]+?)(?:\s*Instituição)',
-            r'De\s+([A-Za-záàâãéèêíìîóòôõúùûç\s]+?)(?:\s*CPF)'
-        ]
-        
-        for pattern in origem_patterns:
-            match = re.search(pattern, cleaned_text, re.IGNORECASE)
+        for pattern in _NUBANK_ORIGEM_PATTERNS:
+            match = pattern.search(cleaned_text)
             if match:
                 nome = match.group(1).strip()
                 if len(nome) > 3:  # Filtro básico
@@ -385,9 +745,8 @@ class OCRExtractor:
         data = {'tipo_documento': 'generico'}
         
         # Extrair valor básico
-        valor_patterns = [r'R\$\s*(\d+[,.]?\d{0,2})']
-        for pattern in valor_patterns:
-            match = re.search(pattern, text)
+        for pattern in _GENERIC_VALOR_PATTERNS:
+            match = pattern.search(text)
             if match:
                 try:
                     valor = float(match.group(1).replace(',', '.'))
@@ -418,18 +777,12 @@ class OCRExtractor:
     
     def _extract_currency_value(self, text: str) -> float:
         """Extrai valor monetário do texto"""
-        patterns = [
-            r'R\$\s*(\d+(?:[.,]\d{1,2})?)',
-            r'(\d+(?:[.,]\d{2}))\s*$'
-        ]
-        
-        for pattern in patterns:
-            matches = re.findall(pattern, text)
-            for match in matches:
+        for pattern in _CURRENCY_PATTERNS:
+            # Sem lista intermediária: para no primeiro valor que converte
+            for match in pattern.finditer(text):
                 try:
                     # Converter formato brasileiro para float
-                    value_str = match.replace(',', '.')
-                    return float(value_str)
+                    return float(match.group(1).replace(',', '.'))
                 except ValueError:
                     continue
         
@@ -437,27 +790,17 @@ class OCRExtractor:
     
     def _extract_date_time(self, text: str) -> tuple:
         """Extrai data e hora do texto"""
-        date_patterns = [
-            r'(\d{1,2}/\d{1,2}/\d{4})',
-            r'(\d{1,2}-\d{1,2}-\d{4})'
-        ]
-        
-        time_patterns = [
-            r'(\d{1,2}:\d{2}:\d{2})',
-            r'(\d{1,2}:\d{2})'
-        ]
-        
         date_found = None
         time_found = None
         
-        for pattern in date_patterns:
-            match = re.search(pattern, text)
+        for pattern in _DATE_PATTERNS:
+            match = pattern.search(text)
             if match:
                 date_found = match.group(1)
                 break
         
-        for pattern in time_patterns:
-            match = re.search(pattern, text)
+        for pattern in _TIME_PATTERNS:
+            match = pattern.search(text)
             if match:
                 time_found = match.group(1)
                 break
@@ -499,6 +842,9 @@ class OCRExtractor:
             cpf=data.get('recebedor_cpf', '')
         )
         
+        # Valor calculado uma única vez (valor_numerico já extraído tem prioridade)
+        valor = data['valor_numerico'] if 'valor_numerico' in data else self._parse_currency(data.get('valor', '0'))
+        
         # Dados da transação
         data_hora = data.get('data_hora_completa', '')
         if not data_hora and 'data' in data and 'hora' in data:
@@ -506,13 +852,13 @@ class OCRExtractor:
         
         transacao = Transacao(
             situacao=data.get('situacao', ''),
-            valor=data.get('valor_numerico', self._parse_currency(data.get('valor', '0'))),
+            valor=valor,
             abatimento=0.0,
             juros=0.0,
             multa=0.0,
             desconto=0.0,
-            valor_documento=data.get('valor_numerico', self._parse_currency(data.get('valor', '0'))),
-            valor_pagamento=data.get('valor_numerico', self._parse_currency(data.get('valor', '0'))),
+            valor_documento=valor,
+            valor_pagamento=valor,
             vencimento='',
             validade_pagamento=30,
             solicitacao_pagador='',
@@ -529,7 +875,7 @@ class OCRExtractor:
             pagador=pagador,
             devedor=devedor,
             transacao=transacao,
-            valor_total=data.get('valor_numerico', self._parse_currency(data.get('valor', '0'))),
+            valor_total=valor,
             nome_empresa='',
             cnpj_empresa='',
             instituicao_empresa=data.get('recebedor_instituicao', '')
@@ -539,6 +885,7 @@ class OCRExtractor:
 
     def _create_generic_comprovante(self, structured_data: Dict) -> Comprovante:
         """Cria comprovante genérico"""
+        valor = self._parse_currency(structured_data.get('valor_total', '0'))
         
         pagador = Pagador(
             nome=structured_data.get('nome', ''),
@@ -553,13 +900,13 @@ class OCRExtractor:
         
         transacao = Transacao(
             situacao=structured_data.get('situacao', ''),
-            valor=self._parse_currency(structured_data.get('valor_total', '0')),
+            valor=valor,
             abatimento=0.0,
             juros=0.0,
             multa=0.0,
             desconto=0.0,
-            valor_documento=self._parse_currency(structured_data.get('valor_total', '0')),
-            valor_pagamento=self._parse_currency(structured_data.get('valor_total', '0')),
+            valor_documento=valor,
+            valor_pagamento=valor,
             vencimento=structured_data.get('vencimento', ''),
             validade_pagamento=30,
             solicitacao_pagador='',
@@ -576,7 +923,7 @@ class OCRExtractor:
             pagador=pagador,
             devedor=devedor,
             transacao=transacao,
-            valor_total=self._parse_currency(structured_data.get('valor_total', '0')),
+            valor_total=valor,
             nome_empresa='',
             cnpj_empresa=structured_data.get('cnpj', ''),
             instituicao_empresa=structured_data.get('instituicao', '')
@@ -590,7 +937,7 @@ class OCRExtractor:
             return 0.0
         
         # Remove símbolos e espacos
-        cleaned = re.sub(r'[R$\s]', '', str(value_str))
+        cleaned = str(value_str).translate(_CURRENCY_STRIP)
         
         # Trata vírgula decimal brasileira
         if ',' in cleaned and '.' in cleaned:
@@ -611,107 +958,103 @@ class OCRExtractor:
         if layout is None:
             layout = self.detect_document_layout(text)
         
-        # Padrões específicos para Nubank
-        if layout == 'nubank':
-            return self._extract_nubank_transferencia(text)
-        elif layout == 'caixa':
-            return self._extract_caixa_transferencia(text)
-        # ... outros layouts
-        
-        return None
+        # Extrator específico do layout (outros layouts ainda não suportados)
+        handler = self._TRANSFERENCIA_HANDLERS.get(layout)
+        return handler(self, text) if handler else None
     
     def extract_transferencia_data_dict(self, text: str) -> Optional[Dict]:
         """Extrai dados de transferência como dicionário (não objeto Comprovante)"""
-        layout = self.detect_document_layout(text)
-        
-        if layout == 'nubank':
-            return self._extract_nubank_transferencia_dict(text)
-        elif layout == 'caixa':
-            return self._extract_caixa_transferencia_dict(text)
-        else:
-            return self._extract_generic_transferencia_dict(text)
+        handler = self._TRANSFERENCIA_DICT_HANDLERS.get(self.detect_document_layout(text))
+        if handler:
+            return handler(self, text)
+        return self._extract_generic_transferencia_dict(text)
 
     def _extract_nubank_transferencia_dict(self, text: str) -> Dict:
         """Extração específica para transferência Nubank retornando dict"""
         data = {}
         
+        # Campos de uma linha: uma varredura, parando quando todos forem encontrados
+        campos = {}
+        for match in _NUBANK_CAMPOS_RE.finditer(text):
+            campos.setdefault(match.lastgroup, match)
+            if len(campos) == _NUBANK_CAMPOS_TOTAL:
+                break
+        
         # Extrair valor total
-        valor_match = re.search(r'Valor\s+R\$\s*([\d.,]+)', text, re.IGNORECASE)
+        valor_match = campos.get('valor')
         if valor_match:
-            valor_str = valor_match.group(1).replace(',', '.')
-            data['valor_total'] = float(valor_str)
-            data['valor_numerico'] = float(valor_str)
+            valor = _valor_float(valor_match.group('valor'))
+            data['valor_total'] = valor
+            data['valor_numerico'] = valor
         
         # Extrair data e hora
-        data_hora_match = re.search(r'(\d{2})\s+([A-Z]{3})\s+(\d{4})\s+-\s+(\d{2}:\d{2}:\d{2})', text)
+        data_hora_match = campos.get('data_hora')
         if data_hora_match:
-            dia, mes_abrev, ano, hora = data_hora_match.groups()
+            dia, mes_abrev, ano, hora = data_hora_match.group('dia', 'mes', 'ano', 'hora')
             # Converter mês abreviado
-            meses = {'JAN': '01', 'FEV': '02', 'MAR': '03', 'ABR': '04', 'MAI': '05', 'JUN': '06',
-                     'JUL': '07', 'AGO': '08', 'SET': '09', 'OUT': '10', 'NOV': '11', 'DEZ': '12'}
-            mes = meses.get(mes_abrev, '01')
+            mes = _MESES.get(mes_abrev, '01')
             data['data'] = f"{dia}/{mes}/{ano}"
             data['hora'] = hora
             data['data_hora'] = f"{dia}/{mes}/{ano} - {hora}"
         
         # Extrair dados do DESTINO
-        destino_nome_match = re.search(r'Destino\s*\n\s*Nome\s+([^\n]+)', text, re.MULTILINE)
+        destino_nome_match = _DESTINO_NOME_RE.search(text)
         if destino_nome_match:
             data['destino_nome'] = destino_nome_match.group(1).strip()
             data['nome_empresa'] = destino_nome_match.group(1).strip()
         
-        destino_cnpj_match = re.search(r'CNPJ\s+(\d+)', text)
+        destino_cnpj_match = campos.get('cnpj')
         if destino_cnpj_match:
-            cnpj = destino_cnpj_match.group(1)
+            cnpj = destino_cnpj_match.group('cnpj')
             # Formatar CNPJ
             if len(cnpj) == 14:
-                cnpj_formatado = f"{cnpj[:2]}.{cnpj[2:5]}.{cnpj[5:8]}/{cnpj[8:12]}-{cnpj[12:]}"
+                cnpj_formatado = _fmt_cnpj(cnpj)
                 data['destino_cnpj'] = cnpj_formatado
                 data['cnpj_empresa'] = cnpj_formatado
         
-        destino_instituicao_match = re.search(r'Destino[\s\S]*?Instituição\s+([^\n]+)', text)
+        (destino_instituicao_match,), (origem_cpf_match, origem_instituicao_match) = _scan_sections(
+            text, (_DESTINO_ANCORA_RE, ('Instituição',)), (_ORIGEM_ANCORA_RE, ('CPF', 'Instituição'))
+        )
         if destino_instituicao_match:
             data['destino_instituicao'] = destino_instituicao_match.group(1).strip()
         
         # Extrair dados da ORIGEM
-        origem_nome_match = re.search(r'Origem\s*\n\s*Nome\s+([^\n]+)', text, re.MULTILINE)
+        origem_nome_match = _ORIGEM_NOME_RE.search(text)
         if origem_nome_match:
             data['origem_nome'] = origem_nome_match.group(1).strip()
             data['pagador_nome'] = origem_nome_match.group(1).strip()
         
-        origem_cpf_match = re.search(r'Origem[\s\S]*?CPF\s+([^\n]+)', text)
         if origem_cpf_match:
             data['origem_cpf'] = origem_cpf_match.group(1).strip()
             data['pagador_cpf'] = origem_cpf_match.group(1).strip()
         
-        origem_instituicao_match = re.search(r'Origem[\s\S]*?Instituição\s+([^\n]+)', text)
         if origem_instituicao_match:
             data['origem_instituicao'] = origem_instituicao_match.group(1).strip()
             data['pagador_instituicao'] = origem_instituicao_match.group(1).strip()
         
         # Extrair conta e agência
-        agencia_match = re.search(r'Agência\s+(\d+)', text)
+        agencia_match = campos.get('agencia')
         if agencia_match:
-            data['agencia'] = agencia_match.group(1)
+            data['agencia'] = agencia_match.group('agencia')
         
-        conta_match = re.search(r'Conta\s+([\d-]+)', text)
+        conta_match = campos.get('conta')
         if conta_match:
-            data['conta'] = conta_match.group(1)
+            data['conta'] = conta_match.group('conta')
         
         # Extrair ID da transação
-        id_match = re.search(r'Identific[\s\S]*?ador\s+([a-zA-Z0-9]+)', text)
+        id_match, = _fields_after(text, _IDENTIFIC_ANCORA_RE, _CAMPO_ADOR_RE)
         if id_match:
             data['id_transacao'] = id_match.group(1)
         
         # Extrair expiração
-        expiracao_match = re.search(r'Expiração\s+(\d{2}/\d{2}/\d{4}\s+\d{2}:\d{2}:\d{2})', text)
+        expiracao_match = campos.get('expiracao')
         if expiracao_match:
-            data['data_expiracao'] = expiracao_match.group(1)
+            data['data_expiracao'] = expiracao_match.group('expiracao')
         
         # Tipo de transferência
-        tipo_match = re.search(r'Tipo de transferência\s+([^\n]+)', text)
+        tipo_match = campos.get('tipo')
         if tipo_match:
-            data['tipo_transferencia'] = tipo_match.group(1).strip()
+            data['tipo_transferencia'] = tipo_match.group('tipo').strip()
         
         # Situação (assumir concluída se tem dados)
         data['situacao'] = 'Concluída'
@@ -723,10 +1066,9 @@ class OCRExtractor:
         data = {}
         
         # Padrões básicos para Caixa
-        valor_match = re.search(r'(?:Valor|R\$)\s*R?\$?\s*([\d.,]+)', text)
-        if valor_match:
-            valor_str = valor_match.group(1).replace(',', '.')
-            data['valor_total'] = float(valor_str)
+        valor = _parse_valor_fast(text)
+        if valor is not None:
+            data['valor_total'] = valor
         
         # Outros padrões específicos da Caixa...
         
@@ -737,36 +1079,32 @@ class OCRExtractor:
         data = {}
         
         # Padrões genéricos
-        valor_match = re.search(r'(?:Valor|R\$)\s*R?\$?\s*([\d.,]+)', text)
-        if valor_match:
-            valor_str = valor_match.group(1).replace(',', '.')
-            data['valor_total'] = float(valor_str)
+        valor = _parse_valor_fast(text)
+        if valor is not None:
+            data['valor_total'] = valor
         
         return data
 
     def _extract_nubank_transferencia(self, text: str) -> Optional[Comprovante]:
         """Extração específica para layout Nubank - CORRIGIDA"""
-        import re
-        
         # Extrair valor
-        valor_match = re.search(r'R\$\s*([\d.,]+)', text)
-        valor = float(valor_match.group(1).replace(',', '.')) if valor_match else 0.0
+        valor = _parse_valor(text, _TRANSF_VALOR_RE, 0.0)
         
         # Extrair dados do DESTINO
-        destino_nome = re.search(r'Destino[\s\S]*?Nome\s+([^\n]+)', text)
-        destino_cnpj = re.search(r'Destino[\s\S]*?CNPJ\s+(\d+)', text)
-        destino_instituicao = re.search(r'Destino[\s\S]*?Instituição\s+([^\n]+)', text)
+        destino, origem = _scan_sections(
+            text, (_DESTINO_ANCORA_RE, ('Nome', 'CNPJ', 'Instituição')),
+            (_ORIGEM_ANCORA_RE, ('Nome', 'CPF', 'Instituição'))
+        )
+        destino_nome, destino_cnpj, destino_instituicao = destino
         
         # Extrair dados da ORIGEM
-        origem_nome = re.search(r'Origem[\s\S]*?Nome\s+([^\n]+)', text)
-        origem_cpf = re.search(r'Origem[\s\S]*?CPF\s+([^\n]+)', text)
-        origem_instituicao = re.search(r'Origem[\s\S]*?Instituição\s+([^\n]+)', text)
+        origem_nome, origem_cpf, origem_instituicao = origem
         
         # Extrair data/hora
-        data_match = re.search(r'(\d{2})\s+([A-Z]{3})\s+(\d{4})\s+-\s+(\d{2}:\d{2}:\d{2})', text)
+        data_match = _TRANSF_DATA_HORA_RE.search(text)
         
         # Extrair ID da transação
-        id_match = re.search(r'(?:ID|Identific[\s\S]*?ador)\s+([a-zA-Z0-9]+)', text)
+        id_match = _find_id_transacao(text)
         
         # Construir objetos corretamente - CORRIGIDO
         pagador = Pagador(
@@ -781,25 +1119,10 @@ class OCRExtractor:
             cpf=destino_cnpj.group(1) if destino_cnpj else ""  # CORRIGIDO
         )
         
-        transacao = Transacao(
-            situacao="Concluída",
-            valor=valor,
-            abatimento=0.0,
-            juros=0.0,
-            multa=0.0,
-            desconto=0.0,
-            valor_documento=valor,
-            valor_pagamento=valor,
-            vencimento="",
-            validade_pagamento=30,
-            solicitacao_pagador="",
+        transacao = _nova_transacao(
+            valor,
             id_transacao=id_match.group(1) if id_match else "",
-            data_hora=data_match.group(0) if data_match else "",
-            identificador="",
-            codigo_operacao="",
-            chave_seguranca="",
-            valor_tarifa=0.0,
-            data=data_match.group(0) if data_match else ""
+            data_hora=data_match.group(0) if data_match else ""
         )
         
         return Comprovante(
@@ -814,17 +1137,15 @@ class OCRExtractor:
 
     def _extract_caixa_transferencia(self, text: str) -> Optional[Comprovante]:
         """Extração específica para layout Caixa - CORRIGIDA"""
-        import re
-        
         # Padrões específicos da Caixa
-        valor_match = re.search(r'R\$\s*([\d.,]+)', text)
-        valor = float(valor_match.group(1).replace(',', '.')) if valor_match else 0.0
+        valor = _parse_valor(text, _TRANSF_VALOR_RE, 0.0)
         
         # Extrair dados específicos da Caixa
-        origem_nome = re.search(r'(?:Pagador|Origem)[\s\n]*Nome\s+([^\n]+)', text)
-        destino_nome = re.search(r'(?:Recebedor|Destino)[\s\n]*Nome\s+([^\n]+)', text)
-        origem_cpf = re.search(r'(?:Pagador|Origem)[\s\S]*?CPF\s+([^\n]+)', text)
-        destino_cpf = re.search(r'(?:Recebedor|Destino)[\s\S]*?CPF\s+([^\n]+)', text)
+        origem_nome = _CAIXA_ORIGEM_NOME_RE.search(text)
+        destino_nome = _CAIXA_DESTINO_NOME_RE.search(text)
+        (origem_cpf,), (destino_cpf,) = _scan_sections(
+            text, (_CAIXA_ORIGEM_ANCORA_RE, ('CPF',)), (_CAIXA_DESTINO_ANCORA_RE, ('CPF',))
+        )
         
         # Construir objetos - CORRIGIDO
         pagador = Pagador(
@@ -839,26 +1160,7 @@ class OCRExtractor:
             cpf=destino_cpf.group(1).strip() if destino_cpf else ""  # CORRIGIDO
         )
         
-        transacao = Transacao(
-            situacao="Concluída",
-            valor=valor,
-            abatimento=0.0,
-            juros=0.0,
-            multa=0.0,
-            desconto=0.0,
-            valor_documento=valor,
-            valor_pagamento=valor,
-            vencimento="",
-            validade_pagamento=30,
-            solicitacao_pagador="",
-            id_transacao="",
-            data_hora="",
-            identificador="",
-            codigo_operacao="",
-            chave_seguranca="",
-            valor_tarifa=0.0,
-            data=""
-        )
+        transacao = _nova_transacao(valor)
         
         return Comprovante(
             pagador=pagador,
@@ -870,24 +1172,16 @@ class OCRExtractor:
             instituicao_empresa=""
         )
 
+    # Extratores de transferência por layout (consulta única no lugar da cadeia if/elif)
+    _TRANSFERENCIA_HANDLERS = {
+        'nubank': _extract_nubank_transferencia,
+        'caixa': _extract_caixa_transferencia,
+    }
+    _TRANSFERENCIA_DICT_HANDLERS = {
+        'nubank': _extract_nubank_transferencia_dict,
+        'caixa': _extract_caixa_transferencia_dict,
+    }
+
     def detect_document_layout(self, text: str) -> str:
         """Detecta o layout/banco do documento baseado no texto"""
-        text_lower = text.lower()
-        
-        if 'will bank' in text_lower or 'willbank' in text_lower:
-            return 'will_bank'
-        elif 'nu pagamentos' in text_lower or 'nubank' in text_lower:
-            return 'nubank'
-        elif 'caixa econômica' in text_lower or 'caixa' in text_lower:
-            return 'caixa'
-        elif 'banco do brasil' in text_lower:
-            return 'bb'
-        elif 'bradesco' in text_lower:
-            return 'bradesco'
-        elif 'itaú' in text_lower or 'itau' in text_lower:
-            return 'itau'
-        elif 'santander' in text_lower:
-            return 'santander'
-        else:
-            return 'generico'
-
+        return _detect_bank_layout(text)
@@ -1,19 +1,27 @@
 from dataclasses import dataclass
 from typing import Optional
 
+# Estruturas criadas a cada comprovante (__slots__ declarado manualmente: acesso por slot, sem __dict__)
 @dataclass
 class Pagador:
+    __slots__ = ('nome', 'cpf', 'instituicao')
     nome: str
     cpf: str
     instituicao: str
 
 @dataclass
 class Devedor:
+    __slots__ = ('nome', 'cpf')
     nome: str
     cpf: str
 
 @dataclass
 class Transacao:
+    __slots__ = (
+        'situacao', 'valor', 'abatimento', 'juros', 'multa', 'desconto', 'valor_documento',
+        'valor_pagamento', 'vencimento', 'validade_pagamento', 'solicitacao_pagador', 'id_transacao',
+        'data_hora', 'identificador', 'codigo_operacao', 'chave_seguranca', 'valor_tarifa', 'data'
+    )
     situacao: str
     valor: float
     abatimento: float
@@ -35,10 +43,56 @@ class Transacao:
 
 @dataclass
 class Comprovante:
+    __slots__ = (
+        'pagador', 'devedor', 'transacao', 'valor_total', 'nome_empresa', 'cnpj_empresa',
+        'instituicao_empresa'
+    )
     pagador: Pagador
     devedor: Devedor
     transacao: Transacao
     valor_total: float
     nome_empresa: str
     cnpj_empresa: str
-    instituicao_empresa: str
\ No newline at end of file
+    instituicao_empresa: str
+
+# Dados padronizados para o chatbot (__slots__ declarado manualmente: acesso por slot, sem __dict__)
+@dataclass
+class Participante:
+    __slots__ = ('nome', 'cpf', 'instituicao', 'chave_pix')
+    nome: str
+    cpf: str
+    instituicao: str
+    chave_pix: str
+
+@dataclass
+class DetalhesTransacao:
+    __slots__ = ('id', 'autenticacao', 'situacao', 'descricao')
+    id: str
+    autenticacao: str
+    situacao: str
+    descricao: str
+
+@dataclass
+class MetadadosExtracao:
+    __slots__ = ('banco_detectado', 'arquivo_origem', 'processado_em', 'confiabilidade')
+    banco_detectado: str
+    arquivo_origem: str
+    processado_em: str
+    confiabilidade: str
+
+@dataclass
+class DadosPadronizados:
+    __slots__ = (
+        'id_unico', 'tipo_transacao', 'valor_formatado', 'valor_numerico', 'data_formatada',
+        'hora_formatada', 'origem', 'destino', 'detalhes_transacao', 'metadados'
+    )
+    id_unico: str
+    tipo_transacao: str
+    valor_formatado: str
+    valor_numerico: float
+    data_formatada: str
+    hora_formatada: str
+    origem: Participante
+    destino: Participante
+    detalhes_transacao: DetalhesTransacao
+    metadados: MetadadosExtracao
@@ -1,33 +1,136 @@
+import atexit
 import cv2
 import json
+import mmap
 import os
 import re
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from functools import lru_cache
+import numpy as np
 from typing import Dict, List, Optional
-from ..types.schemas import Comprovante
+from ..types.schemas import (
+    Comprovante, DadosPadronizados, Participante, DetalhesTransacao, MetadadosExtracao
+)
 from datetime import datetime
 
-def load_image(image_path):
-    # Load an image from the specified path
-    image = cv2.imread(image_path)
+# OCR em processo via libtesseract (opcional, evita um fork por chamada)
+try:
+    import tesserocr
+    TESSEROCR_AVAILABLE = True
+except ImportError:
+    TESSEROCR_AVAILABLE = False
+
+# Serialização JSON mais rápida (opcional)
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# Cópia binária compacta dos resultados (opcional)
+try:
+    import msgpack
+    import lz4.frame
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    MSGPACK_AVAILABLE = False
+
+# Comprovantes são blocos uniformes de texto: --psm 6 (bloco único)
+TESSERACT_PSM = 6
+TESSERACT_CONFIG = f'--psm {TESSERACT_PSM}'
+
+# Versão do pré-processamento/extração: alterar sempre que mudarem (invalida os caches do CLI e da API)
+OCR_EXTRACTOR_VERSION = '2'
+
+# PyTessBaseAPI não é thread-safe: uma instância por thread, para o OCR rodar em paralelo
+_tess_local = threading.local()
+_tess_apis = []  # Todas as instâncias criadas (liberadas por release_ocr)
+_tess_generation = 0  # Incrementado por release_ocr: instâncias antigas são recriadas
+_tess_lock = threading.Lock()  # Serializa release_ocr
+_tess_init_error = None  # Falha ao criar o PyTessBaseAPI (ex.: sem por.traineddata): usa o pytesseract
+
+@contextmanager
+def map_image_file(image_path):
+    """Mapeia o arquivo em memória (somente leitura) sem copiar os bytes"""
+    with open(image_path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            raise ValueError(f"Não foi possível carregar a imagem: {image_path}")
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            yield mapped
+
+def decode_image(buffer, image_path: str = None):
+    """Decodifica uma imagem a partir de bytes (ou de um mmap) para array BGR"""
+    data = np.frombuffer(buffer, dtype=np.uint8)
+    image = cv2.imdecode(data, cv2.IMREAD_COLOR)
+    del data  # libera a referência ao buffer antes de fechar o mmap
     if image is None:
         raise ValueError(f"Não foi possível carregar a imagem: {image_path}")
     return image
 
+def load_image(image_path, digest=None):
+    # Load an image from the specified path (optionally feeding the raw bytes to a hasher)
+    with map_image_file(image_path) as mapped:
+        if digest is not None:
+            digest.update(mapped)
+        return decode_image(mapped, image_path)
+
+def to_json_bytes(data, indent: bool = True) -> bytes:
+    """Serializa para JSON UTF-8 (orjson quando disponível)"""
+    if ORJSON_AVAILABLE:
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+        if indent:
+            option |= orjson.OPT_INDENT_2 | orjson.OPT_APPEND_NEWLINE
+        return orjson.dumps(data, option=option)
+    return json.dumps(data, ensure_ascii=False, indent=4 if indent else None).encode('utf-8')
+
+def load_results(input_path):
+    """Carrega um arquivo JSON de resultados (orjson quando disponível)"""
+    with open(input_path, 'rb') as json_file:
+        content = json_file.read()
+    return orjson.loads(content) if ORJSON_AVAILABLE else json.loads(content)
+
 def save_results(results, output_path):
     # Save the extracted results to a JSON file
     try:
         # Criar diretório se não existir
         os.makedirs(os.path.dirname(output_path), exist_ok=True)
         
-        with open(output_path, 'w', encoding='utf-8') as json_file:
-            json.dump(results, json_file, ensure_ascii=False, indent=4)
+        with open(output_path, 'wb') as json_file:
+            json_file.write(to_json_bytes(results))
         print(f"Resultados salvos em: {output_path}")
     except Exception as e:
         print(f"Erro ao salvar resultados: {e}")
 
+def save_packed_results(results, output_path) -> bool:
+    """Salva uma cópia msgpack + lz4 dos resultados para leitura rápida por máquinas"""
+    if not MSGPACK_AVAILABLE:
+        return False
+    try:
+        packed = lz4.frame.compress(msgpack.packb(results, use_bin_type=True))
+        tmp_path = output_path + '.tmp'
+        with open(tmp_path, 'wb') as packed_file:
+            packed_file.write(packed)
+        os.replace(tmp_path, output_path)
+        return True
+    except Exception as e:
+        print(f"Erro ao salvar cópia binária: {e}")
+        return False
+
 def preprocess_image(image):
-    # Convert the image to grayscale and apply Gaussian blur
+    # Convert the image to grayscale
     gray_image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    
+    # Redimensionar antes dos filtros: blur e CLAHE passam a operar sobre menos pixels
+    height, width = gray_image.shape
+    if width > 2000:
+        scale_percent = 2000 / width
+        new_width = int(width * scale_percent)
+        new_height = int(height * scale_percent)
+        gray_image = cv2.resize(gray_image, (new_width, new_height), interpolation=cv2.INTER_AREA)
+    
+    # Apply Gaussian blur
     blurred_image = cv2.GaussianBlur(gray_image, (5, 5), 0)
     
     # Aplicar operações adicionais para melhorar OCR
@@ -35,45 +138,119 @@ def preprocess_image(image):
     clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8,8))
     enhanced_image = clahe.apply(blurred_image)
     
-    # Redimensionar se necessário
-    height, width = enhanced_image.shape
-    if width > 2000:
-        scale_percent = 2000 / width
-        new_width = int(width * scale_percent)
-        new_height = int(height * scale_percent)
-        enhanced_image = cv2.resize(enhanced_image, (new_width, new_height))
-    
     return enhanced_image
 
-def extract_text_from_image(image):
+def _get_tess_api():
+    """Instância do libtesseract da thread atual (criada sob demanda, após o fork)"""
+    global _tess_init_error
+    api = getattr(_tess_local, 'api', None)
+    if api is not None and _tess_local.generation == _tess_generation:
+        return api
+    
+    tessdata = os.environ.get('TESSDATA_PREFIX')
+    try:
+        # tesserocr.PSM é só um namespace de constantes inteiras: o psm é passado como int
+        if tessdata:
+            api = tesserocr.PyTessBaseAPI(path=tessdata, lang='por', psm=TESSERACT_PSM)
+        else:
+            api = tesserocr.PyTessBaseAPI(lang='por', psm=TESSERACT_PSM)
+    except Exception as e:
+        # Lembrar a falha: as próximas chamadas vão direto ao pytesseract
+        _tess_init_error = e
+        print(f"⚠️ Não foi possível inicializar o tesserocr ({e}); usando pytesseract")
+        raise
+    
+    # list.append é atômico; sem lock aqui (a thread pode ser uma thread nativa do hub do gevent)
+    _tess_apis.append(api)
+    _tess_local.generation = _tess_generation
+    _tess_local.api = api
+    return api
+
+@atexit.register
+def release_ocr():
+    """Libera o libtesseract de todas as threads (chamar sem OCR em andamento; recriado sob demanda)"""
+    global _tess_generation
+    with _tess_lock:
+        for api in _tess_apis:
+            api.End()
+        _tess_apis.clear()
+        _tess_generation += 1
+
+def warm_up_ocr() -> bool:
+    """Carrega o modelo do Tesseract antecipadamente (ex.: no initializer de cada worker)"""
+    if not TESSEROCR_AVAILABLE or _tess_init_error is not None:
+        return False
+    try:
+        _get_tess_api()
+        return True
+    except Exception:
+        return False
+
+def ocr_image(image):
+    """Executa OCR em uma imagem (array OpenCV ou PIL) e retorna o texto bruto"""
+    if TESSEROCR_AVAILABLE and _tess_init_error is None:
+        from PIL import Image
+        if not isinstance(image, Image.Image):
+            if image.ndim == 3:
+                image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+            image = Image.fromarray(image)
+        
+        try:
+            api = _get_tess_api()
+        except Exception:
+            api = None
+        if api is not None:
+            # Instância exclusiva da thread: sem lock, o OCR de várias threads roda em paralelo
+            api.SetImage(image)
+            return api.GetUTF8Text()
+    
     import pytesseract
+    return pytesseract.image_to_string(image, lang='por', config=TESSERACT_CONFIG)
+
+def extract_text_from_image(image):
     # Use Tesseract to extract text from the preprocessed image
-    text = pytesseract.image_to_string(image, lang='por')
+    text = ocr_image(image)
     return text.strip()
 
+# Padrões para CPF mascarado ou completo (aceita diferentes separadores), em uma única regex
+_CPF_FORMAT_RE = re.compile(
+    r'\*{3}[.,]?\d{3}[.,]?\d{3}-?\*{2}'   # Mascarado com ponto ou vírgula
+    r'|\d{3}[.,]?\d{3}[.,]?\d{3}-?\d{2}'  # Completo com ponto ou vírgula
+    r'|\*{3}\d{3}\d{3}\*{2}'              # Mascarado sem separadores
+    r'|\d{11}'                              # Apenas números
+)
+_NON_DIGIT_RE = re.compile(r'[^\d]')
+# Separadores usuais de CPF/CNPJ, removidos com str.translate
+_ONLY_DIGITS = str.maketrans('', '', './-')
+
+def _only_digits(value: str) -> str:
+    """Mantém apenas os dígitos (translate no caso comum, regex só com outros caracteres)"""
+    digits = value.translate(_ONLY_DIGITS)
+    if digits.isdecimal():
+        return digits
+    return _NON_DIGIT_RE.sub('', digits)
+
+def _fmt_cnpj(d: str) -> str:
+    """Formata 14 dígitos como CNPJ (00.000.000/0000-00)"""
+    return f'{d[0:2]}.{d[2:5]}.{d[5:8]}/{d[8:12]}-{d[12:14]}'
+
+def _fmt_cpf(d: str) -> str:
+    """Formata 11 dígitos como CPF (000.000.000-00)"""
+    return f'{d[0:3]}.{d[3:6]}.{d[6:9]}-{d[9:11]}'
+
 def validate_cpf(cpf: str) -> bool:
     """Valida formato de CPF (mesmo que mascarado) - versão melhorada"""
     if not cpf:
         return False
     
-    # Padrões para CPF mascarado ou completo (aceita diferentes separadores)
-    cpf_patterns = [
-        r'^\*{3}[.,]?\d{3}[.,]?\d{3}-?\*{2}$',  # Mascarado com ponto ou vírgula
-        r'^\d{3}[.,]?\d{3}[.,]?\d{3}-?\d{2}$',  # Completo com ponto ou vírgula
-        r'^\*{3}\d{3}\d{3}\*{2}$',              # Mascarado sem separadores
-        r'^\d{11}$'                              # Apenas números
-    ]
-    
-    return any(re.match(pattern, cpf.strip()) for pattern in cpf_patterns)
+    return _CPF_FORMAT_RE.fullmatch(cpf.strip()) is not None
 
 def validate_cnpj(cnpj: str) -> bool:
     """Valida formato de CNPJ"""
     if not cnpj:
         return False
     
-    # Remove caracteres especiais
-    cnpj_clean = re.sub(r'[^\d]', '', cnpj)
-    return len(cnpj_clean) == 14
+    return len(_only_digits(cnpj)) == 14
 
 def validate_currency(value: str) -> bool:
     """Valida formato de moeda"""
@@ -116,14 +293,27 @@ def format_cnpj(cnpj: str) -> str:
         return ""
     
     # Remove caracteres especiais
-    cnpj_clean = re.sub(r'[^\d]', '', cnpj)
+    cnpj_clean = _only_digits(cnpj)
     
     # Formatar se tem 14 dígitos
     if len(cnpj_clean) == 14:
-        return f"{cnpj_clean[:2]}.{cnpj_clean[2:5]}.{cnpj_clean[5:8]}/{cnpj_clean[8:12]}-{cnpj_clean[12:]}"
+        return _fmt_cnpj(cnpj_clean)
     
     return cnpj
 
+def format_cpf(cpf: str) -> str:
+    """Formata CPF para padrão brasileiro"""
+    if not cpf:
+        return ""
+    
+    cpf_clean = _only_digits(cpf)
+    
+    # Formatar se tem 11 dígitos
+    if len(cpf_clean) == 11:
+        return _fmt_cpf(cpf_clean)
+    
+    return cpf
+
 def clean_text(text: str) -> str:
     """Limpa e normaliza texto extraído"""
     if not text:
@@ -137,58 +327,38 @@ def clean_text(text: str) -> str:
     
     return cleaned.strip()
 
+SUPPORTED_IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.tiff', '.pdf')
+
+def iter_supported_image_files(directory: str):
+    """Gera os caminhos das imagens suportadas à medida que o diretório é lido (os.scandir)"""
+    if not os.path.isdir(directory):
+        return
+    
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if entry.name.lower().endswith(SUPPORTED_IMAGE_EXTENSIONS) and entry.is_file():
+                yield entry.path
+
 def extract_supported_image_files(directory: str) -> List[str]:
     """Extrai lista de arquivos de imagem suportados"""
-    supported_extensions = {'.jpg', '.jpeg', '.png', '.bmp', '.tiff', '.pdf'}
-    image_files = []
-    
-    if not os.path.exists(directory):
-        return image_files
-    
-    for filename in os.listdir(directory):
-        if any(filename.lower().endswith(ext) for ext in supported_extensions):
-            image_files.append(os.path.join(directory, filename))
-    
-    return image_files
+    return list(iter_supported_image_files(directory))
+
+# Valores monetários ('R$ 1.234,56')
+_CURRENCY_VALUE_RE = re.compile(r'R\$\s*([\d,]+\.?\d{0,2})')
 
 def extract_currency_values(text: str) -> List[float]:
     """Extrai todos os valores monetários encontrados no texto"""
-    currency_pattern = r'R\$\s*([\d,]+\.?\d{0,2})'
-    matches = re.findall(currency_pattern, text)
-    
     values = []
-    for match in matches:
+    for match in _CURRENCY_VALUE_RE.finditer(text):
         try:
             # Converter formato brasileiro para float
-            clean_value = match.replace(',', '.')
+            clean_value = match.group(1).replace(',', '.')
             values.append(float(clean_value))
         except ValueError:
             continue
     
     return values
 
-def detect_document_layout(text: str) -> str:
-    """Detecta o layout do documento - SINCRONIZADO com extractor.py"""
-    text_lower = text.lower()
-    
-    # Will Bank tem prioridade
-    if 'will bank' in text_lower or 'willbank' in text_lower:
-        return 'will_bank'
-    elif 'nu pagamentos' in text_lower and 'will bank' not in text_lower:
-        return 'nubank'
-    elif 'caixa econômica' in text_lower or 'caixa' in text_lower:
-        return 'caixa'
-    elif 'banco do brasil' in text_lower:
-        return 'bb'
-    elif 'bradesco' in text_lower:
-        return 'bradesco'
-    elif 'itaú' in text_lower or 'itau' in text_lower:
-        return 'itau'
-    elif 'santander' in text_lower:
-        return 'santander'
-    else:
-        return 'generico'
-
 def extract_institution_data(text: str) -> Dict[str, str]:
     """Extrai dados específicos da instituição financeira"""
     institutions = {
@@ -401,25 +571,24 @@ def correct_common_ocr_errors(text: str) -> str:
     
     return corrected_text.strip()
 
+# Padrões de valor melhorados (extract_value_with_fallback)
+_FALLBACK_VALUE_PATTERNS = tuple(re.compile(pattern, re.IGNORECASE) for pattern in (
+    r'R\$\s*(\d+[,.]?\d{0,2})',
+    r'Valor\s+R\$\s*(\d+[,.]?\d{0,2})',
+    r'(\d+[,.]?\d{2})\s*(?:reais|R\$)',
+    r'Total\s+R\$\s*(\d+[,.]?\d{0,2})'
+))
+
 def extract_value_with_fallback(text: str, expected_values: list = None) -> float:
     """Extrai valor com fallback para valores conhecidos"""
-    
-    # Padrões de valor melhorados
-    value_patterns = [
-        r'R\$\s*(\d+[,.]?\d{0,2})',
-        r'Valor\s+R\$\s*(\d+[,.]?\d{0,2})',
-        r'(\d+[,.]?\d{2})\s*(?:reais|R\$)',
-        r'Total\s+R\$\s*(\d+[,.]?\d{0,2})'
-    ]
-    
     found_values = []
     
-    for pattern in value_patterns:
-        matches = re.findall(pattern, text, re.IGNORECASE)
-        for match in matches:
+    # Todas as ocorrências contam para a moda: finditer percorre sem montar listas intermediárias
+    for pattern in _FALLBACK_VALUE_PATTERNS:
+        for match in pattern.finditer(text):
             try:
                 # Converter para float
-                value_str = match.replace(',', '.')
+                value_str = match.group(1).replace(',', '.')
                 value = float(value_str)
                 
                 # Filtrar valores muito altos ou muito baixos
@@ -431,7 +600,6 @@ def extract_value_with_fallback(text: str, expected_values: list = None) -> floa
     
     # Se encontrou valores, usar o mais frequente
     if found_values:
-        from collections import Counter
         most_common = Counter(found_values).most_common(1)
         return most_common[0][0]
     
@@ -444,110 +612,106 @@ def extract_value_with_fallback(text: str, expected_values: list = None) -> floa
     
     return 0.0
 
-def detect_document_layout(text: str) -> str:
-    """Detecta layout do documento com melhor precisão"""
-    
-    layout_patterns = {
-        'will_bank': [
+# Padrões de cada layout (detect_document_layout), compilados uma vez sem diferenciar maiúsculas
+_LAYOUT_SCORE_PATTERNS = tuple(
+    (layout, tuple(re.compile(pattern, re.IGNORECASE) for pattern in patterns))
+    for layout, patterns in (
+        ('will_bank', (
             r'Will Bank',
             r'willbank\.com\.br',
             r'Para.*Ana Cleuma.*CPF',
             r'Origem.*De.*Antonio|Sheila',
             r'Ouvidoria willbank'
-        ],
-        'nubank': [
+        )),
+        ('nubank', (
             r'Comprovante de\s*transferência',
             r'Nu Pagamentos S\.A',
             r'CNPJ 18\.236\.120',
             r'ouvidoria.*nubank',
             r'NU PAGAMENTOS.*IP'
-        ],
-        'bb': [
+        )),
+        ('bb', (
             r'Comprovante BB',
             r'BCO DO BRASIL',
             r'Banco do Brasil',
             r'SISBB',
             r'Autenticação SISBB'
-        ],
-        'caixa': [
+        )),
+        ('caixa', (
             r'CAIXA ECONÔMICA FEDERAL',
             r'Alô CAIXA',
             r'Pix no CAIXA',
             r'SAC CAIXA'
-        ],
-        'inter': [
+        )),
+        ('inter', (
             r'Banco Inter',
             r'Pix enviado',
             r'ainter'
-        ],
-        'itau': [
+        )),
+        ('itau', (
             r'ITAÚ UNIBANCO',
             r'Pix por chave',
             r'conta pagador'
-        ],
-        'pagbank': [
+        )),
+        ('pagbank', (
             r'PagBank',
             r'PagSeguro',
             r'Código da transação Pagbank'
-        ],
-        'btg': [
+        )),
+        ('btg', (
             r'BTG Pactual',
             r'Banco BTG Pactual'
-        ]
-    }
-    
-    text_clean = text.lower()
-    
-    # Contar matches para cada layout
-    layout_scores = {}
-    
-    for layout, patterns in layout_patterns.items():
-        score = 0
-        for pattern in patterns:
-            matches = len(re.findall(pattern, text, re.IGNORECASE))
-            score += matches
-        layout_scores[layout] = score
-    
-    # Retornar layout com maior pontuação
-    if layout_scores:
-        best_layout = max(layout_scores.items(), key=lambda x: x[1])
-        if best_layout[1] > 0:
-            return best_layout[0]
-    
-    return 'generico'
+        ))
+    )
+)
 
-def standardize_data_for_chatbot(data: Dict) -> Dict:
+@lru_cache(maxsize=256)
+def detect_document_layout(text: str) -> str:
+    """Detecta layout do documento com melhor precisão"""
+    # Resultado em cache para textos repetidos; IGNORECASE dispensa a cópia em minúsculas
+    # Contar matches para cada layout (em empate vale o primeiro da lista)
+    best_layout, best_score = 'generico', 0
+    for layout, patterns in _LAYOUT_SCORE_PATTERNS:
+        score = sum(len(pattern.findall(text)) for pattern in patterns)
+        if score > best_score:
+            best_layout, best_score = layout, score
+    
+    return best_layout
+
+def standardize_data_for_chatbot(data: Dict) -> DadosPadronizados:
     """Padroniza dados extraídos para uso em chatbot"""
-    standardized = {
-        'id_unico': f"{data.get('arquivo', 'unknown')}_{datetime.now().strftime('%Y%m%d_%H%M%S')}",
-        'tipo_transacao': data.get('tipo_documento', 'desconhecido'),
-        'valor_formatado': format_currency(data.get('valor_total', 0) or data.get('valor_numerico', 0)),
-        'valor_numerico': float(data.get('valor_total', 0) or data.get('valor_numerico', 0)),
-        'data_formatada': data.get('data', ''),
-        'hora_formatada': data.get('hora', ''),
-        'origem': {
-            'nome': data.get('origem_nome', '') or data.get('pagador_nome', ''),
-            'cpf': data.get('origem_cpf', '') or data.get('pagador_cpf', ''),
-            'instituicao': data.get('origem_instituicao', '') or data.get('pagador_instituicao', '')
-        },
-        'destino': {
-            'nome': data.get('destino_nome', '') or data.get('recebedor_nome', ''),
-            'cpf': data.get('destino_cpf', '') or data.get('recebedor_cpf', ''),
-            'instituicao': data.get('destino_instituicao', ''),
-            'chave_pix': data.get('chave_pix', '')
-        },
-        'detalhes_transacao': {
-            'id': data.get('id_transacao', ''),
-            'autenticacao': data.get('autenticacao', ''),
-            'situacao': data.get('situacao', ''),
-            'descricao': data.get('descricao', '')
-        },
-        'metadados': {
-            'banco_detectado': data.get('layout_detectado', ''),
-            'arquivo_origem': data.get('arquivo', ''),
-            'processado_em': data.get('processado_em', ''),
-            'confiabilidade': 'alta' if data.get('valor_total', 0) > 0 else 'baixa'
-        }
-    }
+    valor = data.get('valor_total', 0) or data.get('valor_numerico', 0)
+    standardized = DadosPadronizados(
+        id_unico=f"{data.get('arquivo', 'unknown')}_{datetime.now().strftime('%Y%m%d_%H%M%S')}",
+        tipo_transacao=data.get('tipo_documento', 'desconhecido'),
+        valor_formatado=format_currency(valor),
+        valor_numerico=float(valor),
+        data_formatada=data.get('data', ''),
+        hora_formatada=data.get('hora', ''),
+        origem=Participante(
+            nome=data.get('origem_nome', '') or data.get('pagador_nome', ''),
+            cpf=data.get('origem_cpf', '') or data.get('pagador_cpf', ''),
+            instituicao=data.get('origem_instituicao', '') or data.get('pagador_instituicao', ''),
+            chave_pix=''
+        ),
+        destino=Participante(
+            nome=data.get('destino_nome', '') or data.get('recebedor_nome', ''),
+            cpf=data.get('destino_cpf', '') or data.get('recebedor_cpf', ''),
+            instituicao=data.get('destino_instituicao', ''),
+            chave_pix=data.get('chave_pix', '')
+        ),
+        detalhes_transacao=DetalhesTransacao(
+            id=data.get('id_transacao', ''),
+            autenticacao=data.get('autenticacao', ''),
+            situacao=data.get('situacao', ''),
+            descricao=data.get('descricao', '')
+        ),
+        metadados=MetadadosExtracao(
+            banco_detectado=data.get('layout_detectado', ''),
+            arquivo_origem=data.get('arquivo', ''),
+            processado_em=data.get('processado_em', ''),
+            confiabilidade='alta' if data.get('valor_total', 0) > 0 else 'baixa'
+        )
+    )
     
     return standardized
\ No newline at end of file
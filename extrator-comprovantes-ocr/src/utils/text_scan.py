@@ -0,0 +1,69 @@
+"""
+Busca de várias palavras-chave em uma única passada pelo texto.
+
+Usa pyahocorasick quando disponível; caso contrário, uma alternação de regex
+com lookahead (maiores palavras primeiro) varre o texto uma única vez.
+Também localiza CPFs mascarados ('***.123.456-**') a partir do marcador '***'.
+"""
+
+import re
+from typing import Iterable, Optional, Set, Tuple
+
+# Autômato Aho-Corasick (opcional)
+try:
+    import ahocorasick
+    AHOCORASICK_AVAILABLE = True
+except ImportError:
+    AHOCORASICK_AVAILABLE = False
+
+class KeywordMatcher:
+    """Encontra todas as palavras-chave contidas em um texto (sem diferenciar maiúsculas)"""
+
+    def __init__(self, keywords: Iterable[str]):
+        # Maiores primeiro: na alternação, a maior palavra vence em cada posição
+        self.keywords = sorted({keyword.lower() for keyword in keywords}, key=len, reverse=True)
+        # Sobreposição necessária ao varrer o texto em partes
+        self.max_length = len(self.keywords[0]) if self.keywords else 0
+        self._automaton = None
+        self._pattern = None
+
+        if AHOCORASICK_AVAILABLE:
+            self._automaton = ahocorasick.Automaton()
+            for keyword in self.keywords:
+                self._automaton.add_word(keyword, keyword)
+            self._automaton.make_automaton()
+        else:
+            self._pattern = re.compile('(?=(' + '|'.join(map(re.escape, self.keywords)) + '))')
+            # Palavras que são prefixo da encontrada também ocorrem na mesma posição
+            self._prefixes = {
+                keyword: [other for other in self.keywords if keyword.startswith(other)]
+                for keyword in self.keywords
+            }
+
+    def find(self, text: str) -> Set[str]:
+        """Retorna o conjunto de palavras-chave presentes no texto"""
+        if not self.keywords or not text:
+            return set()
+
+        text_lower = text.lower()
+        if self._automaton is not None:
+            return {keyword for _, keyword in self._automaton.iter(text_lower)}
+
+        hits = set()
+        for match in self._pattern.finditer(text_lower):
+            hits.update(self._prefixes[match.group(1)])
+        return hits
+
+# Formato fixo do CPF mascarado, validado apenas onde o marcador '***' aparece
+_CPF_MASK_RE = re.compile(r'\*{3}[.,]?\d{3}[.,]?\d{3}-?\*{2}')
+
+def find_masked_cpf(text: str, start: int = 0) -> Optional[Tuple[int, int]]:
+    """Retorna (início, fim) do primeiro CPF mascarado do texto, ou None"""
+    # str.find salta direto para os candidatos; textos sem '***' não passam pelo regex
+    pos = text.find('***', start)
+    while pos != -1:
+        match = _CPF_MASK_RE.match(text, pos)
+        if match:
+            return match.span()
+        pos = text.find('***', pos + 1)
+    return None
@@ -0,0 +1,163 @@
+"""Testes do parsing de texto OCR (executar em extrator-comprovantes-ocr: python -m unittest discover tests)"""
+import re
+import unittest
+
+from src.ocr.extractor import (
+    OCRExtractor, _parse_valor, _parse_valor_fast, _valor_float, _scan_sections,
+    _DESTINO_ANCORA_RE, _ORIGEM_ANCORA_RE, _CAIXA_ORIGEM_ANCORA_RE, _CAIXA_DESTINO_ANCORA_RE
+)
+
+# Padrão que _parse_valor_fast substitui
+_VALOR_RE = re.compile(r'(?:Valor|R\$)\s*R?\$?\s*([\d.,]+)')
+
+# Textos de OCR de exemplo (comprovantes Nubank/Caixa e casos ruidosos)
+_AMOSTRAS = (
+    'Transferência\nValor R$ 1.234,56\n05 MAI 2025 - 10:11:12\nDestino\nNome EMPRESA X\n'
+    'CNPJ 12345678000199\nInstituição NU PAGAMENTOS - IP\nOrigem\nNome Fulano\nCPF ***.111.222-**\n'
+    'Instituição BANCO Y\nAgência 0001\nConta 1234-5\nIdentificador abc123\nTipo de transferência Pix',
+    'Origem\nNome Ana\nInstituição CAIXA\nDestino\nNome Beto\nCPF ***.222.333-**\nInstituição NU\n'
+    'valor r$ 33,00\nCNPJ 123',
+    'Tipo de transferência Conta 12\nCNPJ 05 MAI 2025 - 10:11:12\nTipo de transferência Agência 7',
+    'Pagador\nNome Carla\nCPF ***.444.555-**\nRecebedor\nNome Davi\nCPF ***.666.777-**\nValor R$ 150',
+    'Identific\nador xyz789\nExpiração 01/02/2025 10:00:00\nConta 99\nAgência 0002',
+    'Destino Instituição\nOrigem',
+    'Valor R$\xa017,00\nDestino\nNome X',
+    '',
+)
+
+
+def _nubank_dict_original(text):
+    """Campos de _extract_nubank_transferencia_dict com as buscas separadas da versão original"""
+    data = {}
+    valor = re.search(r'Valor\s+R\$\s*([\d.,]+)', text, re.IGNORECASE)
+    if valor:
+        # A conversão mudou de propósito ('1.234,56'): ver ValorFloatTest
+        data['valor_total'] = data['valor_numerico'] = _valor_float(valor.group(1))
+    data_hora = re.search(r'(\d{2})\s+([A-Z]{3})\s+(\d{4})\s+-\s+(\d{2}:\d{2}:\d{2})', text)
+    if data_hora:
+        data['data_hora_partes'] = data_hora.groups()
+    buscas = {
+        'destino_nome': r'Destino\s*\n\s*Nome\s+([^\n]+)',
+        'cnpj': r'CNPJ\s+(\d+)',
+        'destino_instituicao': r'Destino[\s\S]*?Instituição\s+([^\n]+)',
+        'origem_nome': r'Origem\s*\n\s*Nome\s+([^\n]+)',
+        'origem_cpf': r'Origem[\s\S]*?CPF\s+([^\n]+)',
+        'origem_instituicao': r'Origem[\s\S]*?Instituição\s+([^\n]+)',
+        'agencia': r'Agência\s+(\d+)',
+        'conta': r'Conta\s+([\d-]+)',
+        'id_transacao': r'Identific[\s\S]*?ador\s+([a-zA-Z0-9]+)',
+        'data_expiracao': r'Expiração\s+(\d{2}/\d{2}/\d{4}\s+\d{2}:\d{2}:\d{2})',
+        'tipo_transferencia': r'Tipo de transferência\s+([^\n]+)',
+    }
+    for campo, padrao in buscas.items():
+        match = re.search(padrao, text)
+        if match:
+            data[campo] = match.group(1)
+    return data
+
+
+class ParseValorFastTest(unittest.TestCase):
+    """_parse_valor_fast deve dar o mesmo resultado do regex original"""
+
+    def assertMesmoValor(self, text):
+        self.assertEqual(_parse_valor_fast(text), _parse_valor(text, _VALOR_RE), repr(text))
+
+    def test_valor_simples(self):
+        for text in ('Valor R$ 150,00', 'R$150', 'Valor\nR$ 33,00', 'Pix R$ 17,00 enviado', 'ValorR$ 1.234,56'):
+            self.assertMesmoValor(text)
+
+    def test_espaco_nao_ascii(self):
+        # NBSP e outros espaços Unicode são comuns na saída do OCR
+        self.assertEqual(_parse_valor_fast('Valor R$\xa0150,00'), 150.0)
+        for text in ('Valor R$\xa0150,00', 'R$  12', 'Valor R$\xa09,90'):
+            self.assertMesmoValor(text)
+
+    def test_sem_valor(self):
+        for text in ('', 'Valor', 'R$ abc', 'Valor Valor R$'):
+            self.assertMesmoValor(text)
+        self.assertIsNone(_parse_valor_fast('Pix enviado'))
+
+    def test_candidato_sem_digitos_passa_ao_proximo(self):
+        self.assertEqual(_parse_valor_fast('Valor pago R$ 10,50'), 10.5)
+        self.assertMesmoValor('Valor pago R$ 10,50')
+
+
+class ValorFloatTest(unittest.TestCase):
+
+    def test_formatos(self):
+        self.assertEqual(_valor_float('150,00'), 150.0)
+        self.assertEqual(_valor_float('150.00'), 150.0)
+        self.assertEqual(_valor_float('33'), 33.0)
+        self.assertEqual(_valor_float('9,9'), 9.9)
+
+    def test_separador_de_milhar(self):
+        # Antes: '1.234,56' -> '1.234.56' -> ValueError; agora os pontos são separadores de milhar
+        self.assertEqual(_valor_float('1.234,56'), 1234.56)
+        self.assertEqual(_valor_float('1.000.000,00'), 1000000.0)
+
+    def test_invalido(self):
+        for valor in ('', '.', '1.2.3'):
+            with self.assertRaises(ValueError):
+                _valor_float(valor)
+
+
+class ScanSectionsTest(unittest.TestCase):
+    """_scan_sections deve achar o mesmo que 'âncora[\\s\\S]*?rótulo\\s+(...)' para cada campo"""
+
+    _SECOES = (
+        (_DESTINO_ANCORA_RE, 'Destino', ('Nome', 'CNPJ', 'Instituição')),
+        (_ORIGEM_ANCORA_RE, 'Origem', ('Nome', 'CPF', 'Instituição')),
+        (_CAIXA_ORIGEM_ANCORA_RE, '(?:Pagador|Origem)', ('CPF',)),
+        (_CAIXA_DESTINO_ANCORA_RE, '(?:Recebedor|Destino)', ('CPF',)),
+    )
+    _VALORES = {'Nome': r'([^\n]+)', 'CNPJ': r'(\d+)', 'CPF': r'([^\n]+)', 'Instituição': r'([^\n]+)'}
+
+    def test_mesmo_resultado_das_buscas_originais(self):
+        for text in _AMOSTRAS:
+            achados = _scan_sections(text, *((ancora, rotulos) for ancora, _, rotulos in self._SECOES))
+            for (_, ancora, rotulos), matches in zip(self._SECOES, achados):
+                for rotulo, match in zip(rotulos, matches):
+                    original = re.search(ancora + r'[\s\S]*?' + rotulo + r'\s+' + self._VALORES[rotulo], text)
+                    self.assertEqual(match and match.group(1), original and original.group(1),
+                                     (rotulo, ancora, text))
+
+
+class NubankTransferenciaDictTest(unittest.TestCase):
+    """_extract_nubank_transferencia_dict (varredura única) contra as buscas separadas originais"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.extractor = OCRExtractor()
+
+    def test_mesmos_campos(self):
+        for text in _AMOSTRAS:
+            data = self.extractor._extract_nubank_transferencia_dict(text)
+            original = _nubank_dict_original(text)
+            
+            self.assertEqual(data.get('valor_total'), original.get('valor_total'), text)
+            self.assertEqual(data.get('agencia'), original.get('agencia'), text)
+            self.assertEqual(data.get('conta'), original.get('conta'), text)
+            self.assertEqual(data.get('id_transacao'), original.get('id_transacao'), text)
+            self.assertEqual(data.get('data_expiracao'), original.get('data_expiracao'), text)
+            for campo in ('destino_nome', 'destino_instituicao', 'origem_nome', 'origem_cpf',
+                          'origem_instituicao', 'tipo_transferencia'):
+                esperado = original.get(campo)
+                self.assertEqual(data.get(campo), esperado and esperado.strip(), (campo, text))
+            
+            cnpj = original.get('cnpj')
+            self.assertEqual('destino_cnpj' in data, bool(cnpj) and len(cnpj) == 14, text)
+            partes = original.get('data_hora_partes')
+            self.assertEqual(data.get('hora'), partes and partes[3], text)
+
+    def test_campo_dentro_de_outro(self):
+        # O valor de um campo não pode esconder outro campo que comece dentro dele
+        data = self.extractor._extract_nubank_transferencia_dict(
+            'Tipo de transferência Conta 12\nCNPJ 05 MAI 2025 - 10:11:12'
+        )
+        self.assertEqual(data['conta'], '12')
+        self.assertEqual(data['tipo_transferencia'], 'Conta 12')
+        self.assertEqual(data['data_hora'], '05/05/2025 - 10:11:12')
+
+
+if __name__ == '__main__':
+    unittest.main()